@@ -1,14 +1,46 @@
 import os
-import subprocess
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse, PlainTextResponse
+import stat
+import asyncio
+import mimetypes
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 
 # Assuming 'run_task' is the function from 'app/agent.py' that will process the task.
 from agent import run_task  
+from llm_handler import llm_client
+from model_registry import model_registry
+from embedding_cache import embedding_cache
+from dependency_manager import DEPENDENCY_PREFLIGHT, preflight, dependency_status
+from executors import executor_stats, shutdown_executors
+from job_queue import JobQueue, JobStore, QueueFull
+from security import is_within_data_dir
+from dataset_registry import dataset_registry, RESERVED_PARAMETERS
+from intent_router import intent_router
+from plan_cache import plan_cache
 
 app = FastAPI()
+job_queue = JobQueue(JobStore(), run_task)
+
+@app.on_event("startup")
+async def startup_event():
+    """Resolves task dependencies and preloads the models listed in PRELOAD_MODELS."""
+    if DEPENDENCY_PREFLIGHT:
+        await asyncio.to_thread(preflight)
+    await asyncio.to_thread(model_registry.preload)
+    try:
+        await job_queue.start()
+    except Exception as e:
+        print(f"Job queue disabled: {e}")  # /run keeps working without it
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stops the job workers, closes pooled LLM connections and stops the task worker pools."""
+    await job_queue.stop()
+    await llm_client.aclose()
+    shutdown_executors()
 
 # Define a Pydantic model for request validation
 class RunTaskRequest(BaseModel):
@@ -32,25 +64,144 @@ async def run_endpoint(task: str):  # Using query parameter for simplicity
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 
-@app.get("/read")
-async def read_endpoint(path: str):
+@app.post("/jobs", status_code=202)
+async def create_job_endpoint(task: str, priority: int = 0):
     """
-    Returns the content of the specified file.
+    Queues a task for background execution and returns its job id immediately.
     """
     try:
-        # Security: Ensure the file path is within the allowed directory
-        if not path.startswith("/data/"):
-            raise HTTPException(status_code=400, detail="Path must be within /data/")
+        job = await job_queue.submit(task, priority)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"job_id": job["id"], "status": job["status"]}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job_endpoint(job_id: str):
+    """
+    Returns the status, per-step timings and errors of a queued task.
+    """
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def _file_validators(stat_result: os.stat_result) -> dict:
+    # Cheap validators from stat alone, so polling clients never cost a file read.
+    return {
+        "ETag": f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"',
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": "no-cache",  # Always revalidate; unchanged files get a 304
+    }
 
-        # Check if file exists before reading
-        if not os.path.exists(path):
+
+def _not_modified(request: Request, validators: dict, stat_result: os.stat_result) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:  # Takes precedence over If-Modified-Since (RFC 9110)
+        tags = [tag[2:] if tag.startswith("W/") else tag for tag in (part.strip() for part in if_none_match.split(","))]
+        return "*" in tags or validators["ETag"] in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(stat_result.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _media_type(path: str) -> str:
+    media_type = mimetypes.guess_type(path)[0]
+    if media_type:
+        return media_type
+    # Unknown extension: serve text as before, anything containing NUL bytes as binary.
+    with open(path, "rb") as f:
+        return "application/octet-stream" if b"\0" in f.read(1024) else "text/plain; charset=utf-8"
+
+
+@app.get("/read")
+async def read_endpoint(path: str, request: Request):
+    """
+    Streams the specified file. Supports Range requests and ETag/Last-Modified revalidation.
+    """
+    # Security: Ensure the file path is within the allowed directory
+    if not path.startswith("/data/") or not is_within_data_dir(path):
+        raise HTTPException(status_code=400, detail="Path must be within /data/")
+
+    try:
+        stat_result = os.stat(path)
+        if not stat.S_ISREG(stat_result.st_mode):
             raise HTTPException(status_code=404, detail="File not found")
 
-        # Open the file and read its content
-        with open(path, "r") as f:
-            content = f.read()
-        return PlainTextResponse(content, media_type="text/plain")
+        validators = _file_validators(stat_result)
+        if _not_modified(request, validators, stat_result):
+            return Response(status_code=304, headers=validators)
+
+        # FileResponse streams in chunks, serves Range requests and uses
+        # the server's zero-copy path send when it offers one.
+        return FileResponse(path, media_type=_media_type(path), headers=validators, stat_result=stat_result)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+
+@app.get("/datasets")
+async def list_datasets_endpoint():
+    """
+    Lists the CSV datasets registered by create_api_endpoint.
+    """
+    return {"datasets": dataset_registry.names()}
+
+
+@app.get("/datasets/{name}")
+async def query_dataset_endpoint(name: str, request: Request, fields: Optional[str] = None,
+                                 sort: Optional[str] = None, limit: Optional[int] = None, offset: int = 0):
+    """
+    Queries a registered CSV dataset. Other query parameters filter rows, e.g.
+    ?city=Pune&age__gte=30&fields=name,age&sort=-age&limit=50. Rows are streamed as JSON.
+    """
+    filters = {key: value for key, value in request.query_params.items() if key not in RESERVED_PARAMETERS}
+    try:
+        dataset = dataset_registry.get(name)
+        # Refreshing the store or building an index can take a while; keep it off the event loop.
+        query = await asyncio.to_thread(dataset.prepare_query, filters, fields, sort, limit, offset)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Dataset CSV file not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+    return StreamingResponse(dataset.stream(query), media_type="application/json")
+
+
+@app.get("/models")
+async def models_endpoint():
+    """
+    Returns load time and resident memory of the loaded models, and embedding cache stats.
+    """
+    return {**model_registry.stats(), "embedding_cache": await asyncio.to_thread(embedding_cache.stats)}
+
+
+@app.get("/health")
+async def health_endpoint():
+    """
+    Reports whether the task dependencies are installed, worker pool queue depths,
+    how many tasks the local intent router planned without the LLM, plan cache hits and
+    misses, and LLM token usage.
+    """
+    dependencies = dependency_status()
+    return {
+        "status": "degraded" if dependencies["failed"] else "ok",
+        "dependencies": dependencies,
+        "executors": executor_stats(),
+        "router": intent_router.stats(),
+        "plan_cache": plan_cache.stats(),
+        "llm": llm_client.stats(),
+    }
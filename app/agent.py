@@ -6,13 +6,9 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 #import os
 import json
 import subprocess
-import requests
 
 # Constants
 DATA_DIR = "/data/"
-AIPROXY_TOKEN = os.environ.get("AIPROXY_TOKEN")
-
-LLM_MODEL = "gpt-4o-mini" # Enforce model use.
 
 # Import Task Executor Functions
 from task_executor import (
@@ -27,124 +23,132 @@ from task_executor import (
     extract_credit_card_from_llm,
     find_similar_comments,
     calculate_gold_ticket_sales,
+    aggregate_by_filter,
     # Phase B functions:
     fetch_data_from_api,
     clone_git_repo,
     run_sql_query,
     scrape_website,
     compress_resize_image,
+    compress_resize_images,
     transcribe_audio,
     convert_markdown_to_html,
+    convert_markdown_dir,
     create_api_endpoint,
 )
+from llm_handler import call_llm, LLM_MODEL
+from plan_cache import plan_cache, make_key
+from intent_router import intent_router
+from tool_registry import ToolRegistry
+from scheduler import run_steps
+from executors import offload
+from tasks.data_processing import SORT_MEMORY_BUDGET_MB
 
 
-def call_llm(prompt: str) -> str:
-    """Calls the LLM with the given prompt and returns the response."""
-    if not AIPROXY_TOKEN:
-        raise ValueError("AIPROXY_TOKEN environment variable not set.")
-
-    url = "http://aiproxy.sanand.workers.dev/openai/v1/chat/completions"  # Replace with the actual AI Proxy URL
-    headers = {
-        "Authorization": f"Bearer {AIPROXY_TOKEN}",
-        "Content-Type": "application/json",
-    }
-    data = {
-        "model": LLM_MODEL,
-        "messages": [{"role": "user", "content": prompt}],
-    }
-    try:
-        response = requests.post(url, headers=headers, json=data, timeout=10)  # Set a reasonable timeout
-        response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
-        return response.json()["result"]  # Assuming the response structure
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"LLM API Error: {e}")
+PLANNING_PROMPT_PREFIX = """You are an autonomous agent designed to parse task descriptions and generate a JSON-formatted instruction set to perform the task.
+The environment is a sandboxed Linux environment. You have access to standard shell commands and specific pre-installed tools.
+Follow the instructions precisely.
+
+Each step is one of these actions:
+- {"action": "call_function", "name": <function name>, "parameters": {...}} calls one of the functions listed after these instructions.
+- {"action": "install_package", "package": <package name>} installs a Python package.
+- {"action": "run_shell_command", "command": <command>} runs a shell command.
+
+Here are some known useful shell tools and their usages:
+
+- `uv`: A fast package installer and resolver for Python.  Use to install packages such as prettifier.
+- `prettier`: A code formatter. Run like so: `prettier --write <file_path>`
+- `python`: A python interpretter. Write the output of python scripts directly to files.
+- `sqlite3`: A command-line interface for interacting with SQLite databases.
+
+Security Constraints:
+1.  Never access or exfiltrate data outside the /data directory.
+2.  Never delete any files or directories.
+3.  Only write to files within the /data directory.
+
+Output: JSON formatted instruction set.  Example:
+
+```json
+{"steps": [
+    {"action": "call_function", "name": "run_datagen", "parameters": {"user_email": "test@example.com"}},
+    {"action": "call_function", "name": "format_markdown", "parameters": {"file_path": "/data/format.md", "prettier_version": "3.4.2"}}
+]}
+```
+
+Steps may have an optional "id" and a "depends_on" list of step ids that must finish first.
+Steps that do not depend on each other may run in parallel.
 
+Make your instruction set simple and efficient as possible. Return ONLY valid JSON.  Do not add commentary or explainations.
+"""
 
-async def run_task(task_description: str):
+# Functions the planner may call; call_task_function dispatches each of them.
+tool_registry = ToolRegistry([
+    run_datagen,
+    format_markdown,
+    count_wednesdays,
+    sort_contacts,
+    write_recent_logs,
+    create_markdown_index,
+    extract_email_from_llm,
+    extract_credit_card_from_llm,
+    find_similar_comments,
+    calculate_gold_ticket_sales,
+    aggregate_by_filter,
+    fetch_data_from_api,
+    clone_git_repo,
+    run_sql_query,
+    scrape_website,
+    compress_resize_image,
+    compress_resize_images,
+    transcribe_audio,
+    convert_markdown_to_html,
+    convert_markdown_dir,
+    create_api_endpoint,
+])
+
+async def run_task(task_description: str, on_update=None):
     """
     Main function to orchestrate task execution. Parses the task description
-    and calls the appropriate functions.
-    """
-    prompt = f"""
-    You are an autonomous agent designed to parse task descriptions and generate a JSON-formatted instruction set to perform the task.
-    The environment is a sandboxed Linux environment. You have access to standard shell commands and specific pre-installed tools.
-    Follow the instructions precisely.
-
-    You have access to the following functions.  Use them as needed:
-    - install_package(package_name: str)
-    - run_datagen(user_email: str)
-    - format_markdown(file_path: str, prettier_version: str = "3.4.2")
-    - count_wednesdays(file_path: str)
-    - sort_contacts(file_path: str)
-    - write_recent_logs(log_dir: str)
-    - create_markdown_index(docs_dir: str)
-    - extract_email_from_llm(email_file: str)
-    - extract_credit_card_from_llm(image_file: str)
-    - find_similar_comments(comments_file: str)
-    - calculate_gold_ticket_sales(db_file: str)
-    - fetch_data_from_api(api_url: str, output_file: str)
-    - clone_git_repo(repo_url: str, destination_dir: str)
-    - run_sql_query(db_file: str, query: str, output_file: str)
-    - scrape_website(url: str, output_file: str)
-    - compress_resize_image(image_file: str, output_file: str)
-    - transcribe_audio(audio_file: str, output_file: str)
-    - convert_markdown_to_html(markdown_file: str, output_file: str)
-    - create_api_endpoint(csv_file: str, output_file: str)
-
-    Here are some known useful shell tools and their usages:
-
-    - `uv`: A fast package installer and resolver for Python.  Use to install packages such as prettifier.
-    - `prettier`: A code formatter. Run like so: `prettier --write <file_path>`
-    - `python`: A python interpretter. Write the output of python scripts directly to files.
-    - `sqlite3`: A command-line interface for interacting with SQLite databases.
-
-    Security Constraints:
-    1.  Never access or exfiltrate data outside the /data directory.
-    2.  Never delete any files or directories.
-    3.  Only write to files within the /data directory.
-
-    Input: {task_description}
-
-    Output: JSON formatted instruction set.  Example:
-
-    ```json
-    {{
-        "steps": [
-            {{
-                "action": "call_function",
-                "name": "run_datagen",
-                "parameters": {{
-                    "user_email": "test@example.com"
-                }}
-            }},
-            {{
-                "action": "call_function",
-                "name": "format_markdown",
-                "parameters": {{
-                    "file_path": "/data/format.md",
-                    "prettier_version": "3.4.2"
-                }}
-            }}
-        ]
-    }}
-    ```
-
-    Make your instruction set simple and efficient as possible. Return ONLY valid JSON.  Do not add commentary or explainations.
+    and calls the appropriate functions. on_update receives the per-step
+    records as steps start and finish.
     """
-
-    llm_response = call_llm(prompt)
+    # Known tasks are routed locally; repeated tasks reuse the plan that last executed
+    # successfully. Either way the LLM is skipped.
+    instructions = intent_router.route(task_description)
+    cache_key = make_key(task_description, LLM_MODEL) if instructions is None else None
+    if cache_key is not None:
+        instructions = plan_cache.get(cache_key)
+        if instructions is None:
+            instructions = await plan_task(task_description)
+
+    # Independent steps run concurrently; dependent ones wait for the steps they need.
+    step_results = await run_steps(instructions["steps"], execute_step, on_update=on_update)
+
+    if cache_key is not None:
+        plan_cache.put(cache_key, instructions)
+    return step_results
+
+async def plan_task(task_description: str) -> dict:
+    """Asks the LLM for a JSON instruction set for the task and validates it."""
+    names = tool_registry.select(task_description)
+    # The static prefix comes first and never changes, so the provider's prompt cache can reuse it.
+    prompt = (
+        f"{PLANNING_PROMPT_PREFIX}\n"
+        f"Functions relevant to this task:\n{tool_registry.render(names)}\n\n"
+        f"Input: {task_description}\n"
+    )
+
+    llm_response = await call_llm(prompt)
 
     try:
         instructions = json.loads(llm_response)
     except json.JSONDecodeError:
         raise ValueError(f"Invalid JSON received from LLM: {llm_response}")
 
-    if not isinstance(instructions, dict) or "steps" not in instructions:
+    if not isinstance(instructions, dict) or not isinstance(instructions.get("steps"), list):
         raise ValueError("Invalid instruction format from LLM.  Must be a dict with a 'steps' key.")
 
-    for step in instructions["steps"]:
-        await execute_step(step)  # Await execution of each step
+    return instructions
 
 async def execute_step(step: dict):
     """Executes a single step from the instruction set."""
@@ -164,7 +168,7 @@ async def execute_step(step: dict):
 
     elif action == "install_package":
         package = step.get("package")
-        await install_package(package)
+        await offload(install_package, package)
 
     elif action == "call_function":
         function_name = step.get("name")
@@ -174,68 +178,96 @@ async def execute_step(step: dict):
     else:
         raise ValueError(f"Unknown action: {action}")
 
+def parse_flag(value) -> bool:
+    """Parses a boolean parameter; LLM plans may send "false" or "0" as strings."""
+    if isinstance(value, str):
+        if value.strip().lower() in ("true", "1", "yes"):
+            return True
+        if value.strip().lower() in ("false", "0", "no", ""):
+            return False
+        raise ValueError(f"Invalid boolean value: {value}")
+    return bool(value)
+
 async def call_task_function(function_name: str, parameters: dict):
     """Calls the task function based on the function name."""
     if function_name == "run_datagen":
         user_email = parameters.get("user_email")
         if not user_email:
             raise ValueError("Missing 'user_email' in parameters for run_datagen.")
-        run_datagen(user_email)
+        await offload(run_datagen, user_email)
 
     elif function_name == "format_markdown":
         file_path = parameters.get("file_path")
         prettier_version = parameters.get("prettier_version", "3.4.2")  # Default version
         if not file_path:
             raise ValueError("Missing 'file_path' in parameters for format_markdown.")
-        format_markdown(file_path, prettier_version)
+        await offload(format_markdown, file_path, prettier_version)
 
     elif function_name == "count_wednesdays":
         file_path = parameters.get("file_path")
         if not file_path:
              raise ValueError("Missing 'file_path' in parameters for count_wednesdays")
-        count_wednesdays(file_path)
+        await offload(count_wednesdays, file_path)
 
     elif function_name == "sort_contacts":
         file_path = parameters.get("file_path")
         if not file_path:
             raise ValueError("Missing 'file_path' in parameters for sort_contacts")
-        sort_contacts(file_path)
+        sort_keys = parameters.get("sort_keys", ("last_name", "first_name"))
+        sort_keys = (sort_keys,) if isinstance(sort_keys, str) else tuple(sort_keys)  # A single key name
+        memory_budget_mb = float(parameters.get("memory_budget_mb", SORT_MEMORY_BUDGET_MB))
+        await offload(sort_contacts, file_path, sort_keys, memory_budget_mb)
 
     elif function_name == "write_recent_logs":
         log_dir = parameters.get("log_dir")
         if not log_dir:
             raise ValueError("Missing 'log_dir' in parameters for write_recent_logs")
-        write_recent_logs(log_dir)
+        k = int(parameters.get("k", 10))
+        pattern = parameters.get("pattern", "*.log")
+        await offload(write_recent_logs, log_dir, k, pattern)
 
     elif function_name == "create_markdown_index":
         docs_dir = parameters.get("docs_dir")
         if not docs_dir:
             raise ValueError("Missing 'docs_dir' in parameters for create_markdown_index")
-        create_markdown_index(docs_dir)
+        await offload(create_markdown_index, docs_dir)
 
     elif function_name == "extract_email_from_llm":
         email_file = parameters.get("email_file")
         if not email_file:
             raise ValueError("Missing 'email_file' in parameters for extract_email_from_llm")
-        extract_email_from_llm(email_file)
+        await extract_email_from_llm(email_file)
 
     elif function_name == "extract_credit_card_from_llm":
         image_file = parameters.get("image_file")
         if not image_file:
             raise ValueError("Missing 'image_file' in parameters for extract_credit_card_from_llm")
-        extract_credit_card_from_llm(image_file)
+        await extract_credit_card_from_llm(image_file)
 
     elif function_name == "find_similar_comments":
         comments_file = parameters.get("comments_file")
         if not comments_file:
             raise ValueError("Missing 'comments_file' in parameters for find_similar_comments")
-        find_similar_comments(comments_file)
+        await offload(find_similar_comments, comments_file)
 
     elif function_name == "calculate_gold_ticket_sales":
         db_file = parameters.get("db_file")
         if not db_file:
             raise ValueError("Missing 'db_file' in parameters for calculate_gold_ticket_sales")
-        calculate_gold_ticket_sales(db_file)
+        await offload(calculate_gold_ticket_sales, db_file)
+
+    elif function_name == "aggregate_by_filter":
+        db_file = parameters.get("db_file")
+        table = parameters.get("table")
+        value_expr = parameters.get("value_expr")
+        filter_column = parameters.get("filter_column")
+        filter_values = parameters.get("filter_values")
+        output_file = parameters.get("output_file")
+        if not db_file or not table or not value_expr or not filter_column or not filter_values or not output_file:
+            raise ValueError("Missing 'db_file', 'table', 'value_expr', 'filter_column', 'filter_values' or 'output_file' in parameters for aggregate_by_filter")
+        aggregate = parameters.get("aggregate", "SUM")
+        create_index = parse_flag(parameters.get("create_index", False))
+        await offload(aggregate_by_filter, db_file, table, value_expr, filter_column, filter_values, output_file, aggregate, create_index)
 
     # Phase B Tasks (Placeholders)
     elif function_name == "fetch_data_from_api":
@@ -243,14 +275,21 @@ async def call_task_function(function_name: str, parameters: dict):
         output_file = parameters.get("output_file")
         if not api_url or not output_file:
             raise ValueError("Missing 'api_url' or 'output_file' in parameters for fetch_data_from_api")
-        fetch_data_from_api(api_url, output_file)
+        await offload(fetch_data_from_api, api_url, output_file)
 
     elif function_name == "clone_git_repo":
         repo_url = parameters.get("repo_url")
         destination_dir = parameters.get("destination_dir")
         if not repo_url or not destination_dir:
             raise ValueError("Missing 'repo_url' or 'destination_dir' in parameters for clone_git_repo")
-        clone_git_repo(repo_url, destination_dir)
+        depth = parameters.get("depth")
+        branch = parameters.get("branch")
+        single_branch = parse_flag(parameters.get("single_branch", False))
+        sparse_paths = parameters.get("sparse_paths")
+        blob_filter = parameters.get("blob_filter")
+        use_mirror = parse_flag(parameters.get("use_mirror", True))
+        await offload(clone_git_repo, repo_url, destination_dir, depth, branch, single_branch, sparse_paths, blob_filter,
+                      use_mirror)
 
     elif function_name == "run_sql_query":
         db_file = parameters.get("db_file")
@@ -258,42 +297,70 @@ async def call_task_function(function_name: str, parameters: dict):
         output_file = parameters.get("output_file")
         if not db_file or not query or not output_file:
             raise ValueError("Missing 'db_file' or 'query' or 'output_file' in parameters for run_sql_query")
-        run_sql_query(db_file, query, output_file)
+        output_format = parameters.get("output_format")  # csv, jsonl or arrow; default from the extension
+        await offload(run_sql_query, db_file, query, output_file, output_format)
 
     elif function_name == "scrape_website":
         url = parameters.get("url")
         output_file = parameters.get("output_file")
         if not url or not output_file:
             raise ValueError("Missing 'url' or 'output_file' in parameters for scrape_website")
-        scrape_website(url, output_file)
+        parser = parameters.get("parser", "html.parser")
+        selector = parameters.get("selector")
+        await offload(scrape_website, url, output_file, parser, selector)
 
     elif function_name == "compress_resize_image":
         image_file = parameters.get("image_file")
         output_file = parameters.get("output_file")
         if not image_file or not output_file:
             raise ValueError("Missing 'image_file' or 'output_file' in parameters for compress_resize_image")
-        compress_resize_image(image_file, output_file)
+        width = int(parameters.get("width", 200))
+        height = int(parameters.get("height", 200))
+        quality = int(parameters.get("quality", 60))
+        output_format = parameters.get("output_format")
+        await offload(compress_resize_image, image_file, output_file, width, height, quality, output_format)
+
+    elif function_name == "compress_resize_images":
+        source = parameters.get("source")
+        output_dir = parameters.get("output_dir")
+        if not source or not output_dir:
+            raise ValueError("Missing 'source' or 'output_dir' in parameters for compress_resize_images")
+        max_dimension = int(parameters.get("max_dimension", 200))
+        quality = int(parameters.get("quality", 60))
+        output_format = parameters.get("output_format")
+        await offload(compress_resize_images, source, output_dir, max_dimension, output_format, quality)
 
     elif function_name == "transcribe_audio":
         audio_file = parameters.get("audio_file")
         output_file = parameters.get("output_file")
         if not audio_file or not output_file:
             raise ValueError("Missing 'audio_file' or 'output_file' in parameters for transcribe_audio")
-        transcribe_audio(audio_file, output_file)
+        chunked = parse_flag(parameters.get("chunked", False))
+        timestamps = parse_flag(parameters.get("timestamps", False))
+        await offload(transcribe_audio, audio_file, output_file, chunked, timestamps)
 
     elif function_name == "convert_markdown_to_html":
         markdown_file = parameters.get("markdown_file")
         output_file = parameters.get("output_file")
         if not markdown_file or not output_file:
             raise ValueError("Missing 'markdown_file' or 'output_file' in parameters for convert_markdown_to_html")
-        convert_markdown_to_html(markdown_file, output_file)
+        await offload(convert_markdown_to_html, markdown_file, output_file)
+
+    elif function_name == "convert_markdown_dir":
+        source_dir = parameters.get("source_dir")
+        output_dir = parameters.get("output_dir")
+        if not source_dir or not output_dir:
+            raise ValueError("Missing 'source_dir' or 'output_dir' in parameters for convert_markdown_dir")
+        extensions = parameters.get("extensions")
+        await offload(convert_markdown_dir, source_dir, output_dir, extensions)
 
     elif function_name == "create_api_endpoint":
         csv_file = parameters.get("csv_file")
         output_file = parameters.get("output_file")
         if not csv_file or not output_file:
             raise ValueError("Missing 'csv_file' or 'output_file' in parameters for create_api_endpoint")
-        create_api_endpoint(csv_file, output_file)
+        name = parameters.get("name")
+        await offload(create_api_endpoint, csv_file, output_file, name)
 
     else:
         raise ValueError(f"Unknown function name: {function_name}")
@@ -312,7 +379,7 @@ async def run_shell_command(command: str):
         raise ValueError("Output redirection must be within the /data directory.")
 
     try:
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True, cwd=DATA_DIR)
+        result = await offload(subprocess.run, command, shell=True, check=True, capture_output=True, text=True, cwd=DATA_DIR)
         print(f"Command output: {result.stdout}")  # Log the output for debugging
     except subprocess.CalledProcessError as e:
         raise Exception(f"Command failed: {e.stderr}")
@@ -322,7 +389,7 @@ async def call_python_script(script: str):
     Executes a python script.
     """
     try:
-        result = subprocess.run(["python", "-c", script], capture_output=True, text=True, check=True, cwd=DATA_DIR)
+        result = await offload(subprocess.run, ["python", "-c", script], capture_output=True, text=True, check=True, cwd=DATA_DIR)
         print(f"Script output: {result.stdout}")
     except subprocess.CalledProcessError as e:
         raise Exception(f"Python script failed: {e.stderr}")
\ No newline at end of file
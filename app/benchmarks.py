@@ -0,0 +1,414 @@
+# app/benchmarks.py
+# Usage: python benchmarks.py <benchmark> [key=value ...]
+#   e.g. python benchmarks.py similar_pairs sizes=1000,10000,100000
+#        python benchmarks.py dates lines=10000000
+#        python benchmarks.py sort_contacts records=2000000 budget_mb=64
+#        python benchmarks.py aggregate rows=100000000
+#        python benchmarks.py images count=3000
+#        python benchmarks.py transcribe minutes=30
+#        python benchmarks.py markdown docs=100000
+#        python benchmarks.py recent_logs files=100000
+
+import sys
+import os
+import time
+import random
+import json
+import datetime
+import sqlite3
+import tempfile
+import resource
+import multiprocessing
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from tasks.data_processing import (
+    normalize_rows, _dense_most_similar_pair, _blockwise_most_similar_pair, analyze_dates, DATE_FORMATS,
+    external_sort_json_array,
+)
+from tasks.database_operations import aggregate_totals
+from tasks.image_processing import batch_shrink_images
+from tasks.audio_processing import transcribe_chunked
+from tasks.markdown_processing import build_html
+from tasks.file_operations import recent_files, read_first_lines
+
+
+def timed(func, *args, **kwargs):
+    """Runs func once and returns (result, seconds)."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _loop_most_similar_pair(scores):
+    # The original find_similar_comments scan: element-by-element over a full N x N matrix.
+    max_score = -1
+    best = (-1, -1)
+    n = len(scores)
+    for i in range(n):
+        for j in range(i + 1, n):
+            score = scores[i][j]
+            if score > max_score:
+                max_score = score
+                best = (i, j)
+    return best
+
+
+def bench_similar_pairs(sizes="1000,10000,100000", dim=384, loop_limit=2000, dense_limit_gb=4):
+    """
+    Compares the original double loop with the vectorized and blockwise searches.
+    Inputs above loop_limit time the loop on a loop_limit sample and scale it by (n / loop_limit)^2.
+    """
+    rng = np.random.default_rng(0)
+    print(f"{'n':>8} {'loop (s)':>14} {'dense (s)':>12} {'blockwise (s)':>14}")
+    for n in [int(size) for size in str(sizes).split(",")]:
+        vectors = normalize_rows(rng.standard_normal((n, dim), dtype=np.float32))
+
+        sample = min(n, loop_limit)
+        _, loop_seconds = timed(_loop_most_similar_pair, vectors[:sample] @ vectors[:sample].T)
+        loop_label = f"{loop_seconds * (n / sample) ** 2:.2f}" + ("" if sample == n else " est.")
+
+        if n * n * 4 <= dense_limit_gb * 1024 ** 3:
+            dense, dense_seconds = timed(_dense_most_similar_pair, vectors)
+            dense_label = f"{dense_seconds:.2f}"
+        else:
+            dense, dense_label = None, f"n/a ({n * n * 4 / 1024 ** 3:.0f} GB)"
+
+        blockwise, block_seconds = timed(_blockwise_most_similar_pair, vectors, 2048)
+        if dense is not None and dense[:2] != blockwise[:2]:
+            print(f"Mismatch at n={n}: dense {dense} vs blockwise {blockwise}")
+        print(f"{n:>8} {loop_label:>14} {dense_label:>12} {block_seconds:>14.2f}")
+
+
+def _write_dates(path: str, lines: int):
+    # Same mix of formats as datagen's get_dates, written in 100k-line chunks.
+    rng = random.Random(0)
+    start = int(datetime.datetime(2000, 1, 1).timestamp())
+    end = int(datetime.datetime(2024, 12, 31).timestamp())
+    with open(path, "w") as f:
+        for offset in range(0, lines, 100_000):
+            f.write("\n".join(
+                datetime.datetime.fromtimestamp(rng.randint(start, end)).strftime(rng.choice(DATE_FORMATS))
+                for _ in range(min(100_000, lines - offset))
+            ) + "\n")
+
+
+def _strptime_weekdays(path: str):
+    # The original count_wednesdays approach, extended to try every format per line.
+    weekdays = [0] * 7
+    with open(path, "r") as f:
+        for line in f:
+            for fmt in DATE_FORMATS:
+                try:
+                    weekdays[datetime.datetime.strptime(line.strip(), fmt).weekday()] += 1
+                    break
+                except ValueError:
+                    continue
+    return weekdays
+
+
+def bench_dates(lines=10_000_000, baseline_limit=1_000_000):
+    """
+    Times analyze_dates on a generated file of mixed-format dates against a per-line strptime loop.
+    The loop runs on the first baseline_limit lines and is scaled linearly.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dates.txt")
+        _write_dates(path, lines)
+        stats, seconds = timed(analyze_dates, path, ranges=[("2000-01-01", "2009-12-31")])
+        print(f"analyze_dates: {lines} lines in {seconds:.2f}s ({lines / seconds:,.0f} lines/s), invalid={stats['invalid']}")
+
+        sample = min(lines, baseline_limit)
+        sample_path = os.path.join(tmp, "sample.txt")
+        with open(path, "r") as src, open(sample_path, "w") as dst:
+            for _, line in zip(range(sample), src):
+                dst.write(line)
+        _, loop_seconds = timed(_strptime_weekdays, sample_path)
+        estimate = loop_seconds * lines / sample
+        print(f"strptime loop: {estimate:.2f}s{'' if sample == lines else ' est.'} ({sample / loop_seconds:,.0f} lines/s)")
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # ru_maxrss is in KB on Linux
+
+
+def _in_subprocess(func, *args):
+    # Fresh process per measurement so peak RSS is not inherited from earlier runs.
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_measure, (func, *args))
+
+
+def _measure(func, *args):
+    result, seconds = timed(func, *args)
+    return result, seconds, _peak_rss_mb()
+
+
+def _sort_in_memory(input_file: str, output_file: str):
+    # The original sort_contacts path.
+    with open(input_file, "r") as f:
+        contacts = json.load(f)
+    contacts.sort(key=lambda x: (x["last_name"], x["first_name"]))
+    with open(output_file, "w") as f:
+        json.dump(contacts, f, indent=4)
+
+
+def bench_sort_contacts(records=2_000_000, budget_mb=64):
+    """Compares the in-memory sort_contacts path with the out-of-core sort on generated contacts."""
+    rng = random.Random(0)
+    names = [f"name{i:05d}" for i in range(20_000)]
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, "contacts.json")
+        with open(input_file, "w") as f:
+            f.write("[")
+            for i in range(records):
+                contact = {"first_name": rng.choice(names), "last_name": rng.choice(names), "email": f"user{i}@example.com"}
+                f.write(("," if i else "") + json.dumps(contact))
+            f.write("]")
+        size_mb = os.path.getsize(input_file) / 1024 ** 2
+        print(f"{records} contacts, {size_mb:.0f} MB of JSON")
+
+        _, seconds, rss = _in_subprocess(_sort_in_memory, input_file, os.path.join(tmp, "a.json"))
+        print(f"in-memory:   {seconds:7.2f}s  peak RSS {rss:7.0f} MB")
+        runs, seconds, rss = _in_subprocess(
+            external_sort_json_array, input_file, os.path.join(tmp, "b.json"), ("last_name", "first_name"), budget_mb, tmp
+        )
+        print(f"out-of-core: {seconds:7.2f}s  peak RSS {rss:7.0f} MB  ({runs} runs, {budget_mb} MB budget)")
+
+
+def _write_tickets(path: str, rows: int):
+    # Same schema and value ranges as datagen's ticket-sales.db, inserted in 1M-row transactions.
+    rng = random.Random(0)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("CREATE TABLE tickets (type TEXT NOT NULL, units INTEGER NOT NULL, price DECIMAL(10,2) NOT NULL)")
+    for offset in range(0, rows, 1_000_000):
+        conn.executemany(
+            "INSERT INTO tickets VALUES (?, ?, ?)",
+            ((rng.choice(("Gold", "Silver", "Bronze")), rng.randint(1, 10), round(rng.uniform(50, 150), 2))
+             for _ in range(min(1_000_000, rows - offset))),
+        )
+        conn.commit()
+    conn.close()
+
+
+def _separate_sums(path: str, types: tuple) -> dict:
+    # The original calculate_gold_ticket_sales query, run once per ticket type.
+    conn = sqlite3.connect(path)
+    try:
+        return {t: conn.execute("SELECT SUM(units * price) FROM tickets WHERE type = ?", (t,)).fetchone()[0] for t in types}
+    finally:
+        conn.close()
+
+
+def bench_aggregate(rows=10_000_000):
+    """
+    Times Gold/Silver/Bronze totals on a generated ticket-sales.db: one query per type,
+    one conditional-aggregate pass, the same with a covering index, and a cached repeat.
+    """
+    types = ("Gold", "Silver", "Bronze")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ticket-sales.db")
+        _, seconds = timed(_write_tickets, path, rows)
+        print(f"{rows} rows, {os.path.getsize(path) / 1024 ** 2:.0f} MB, generated in {seconds:.1f}s")
+
+        _, seconds = timed(_separate_sums, path, types)
+        print(f"per-type queries:   {seconds:8.3f}s")
+        _, seconds = timed(aggregate_totals, path, "tickets", "units * price", "type", types)
+        print(f"one pass:           {seconds:8.3f}s")
+        _, seconds = timed(aggregate_totals, path, "tickets", "units * price", "type", types)
+        print(f"cached:             {seconds:8.6f}s")
+        _, seconds = timed(aggregate_totals, path, "tickets", "units * price", "type", types, "SUM", True)
+        print(f"index build + pass: {seconds:8.3f}s")
+        _, seconds = timed(aggregate_totals, path, "tickets", "units * price", "type", ("Gold",), "SUM", True)
+        print(f"indexed, Gold only: {seconds:8.3f}s")
+
+
+def _write_images(directory: str, count: int, size=(1600, 1200)):
+    # Photo-sized JPEGs: a gradient with random rectangles so no two encode identically.
+    from PIL import Image, ImageDraw
+    rng = random.Random(0)
+    base = Image.linear_gradient("L").resize(size).convert("RGB")
+    for i in range(count):
+        image = base.copy()
+        draw = ImageDraw.Draw(image)
+        for _ in range(20):
+            x, y = rng.randrange(size[0]), rng.randrange(size[1])
+            draw.rectangle((x, y, x + rng.randrange(50, 400), y + rng.randrange(50, 400)),
+                           fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        image.save(os.path.join(directory, f"image{i:05d}.jpg"), quality=90)
+
+
+def _resize_one_by_one(source: str, output_dir: str):
+    # The original compress_resize_image: full decode and a fixed 200x200 resize per file.
+    from PIL import Image
+    for name in sorted(os.listdir(source)):
+        image = Image.open(os.path.join(source, name))
+        image.resize((200, 200)).save(os.path.join(output_dir, name), optimize=True, quality=60)
+
+
+def bench_images(count=3000):
+    """Compares the one-file-at-a-time resize with the batch pipeline, cold and with every output up to date."""
+    with tempfile.TemporaryDirectory() as tmp:
+        source, naive_dir, batch_dir = (os.path.join(tmp, name) for name in ("source", "naive", "batch"))
+        for directory in (source, naive_dir, batch_dir):
+            os.makedirs(directory)
+        _, seconds = timed(_write_images, source, count)
+        print(f"{count} images, {sum(e.stat().st_size for e in os.scandir(source)) / 1024 ** 2:.0f} MB, generated in {seconds:.1f}s")
+
+        _, seconds = timed(_resize_one_by_one, source, naive_dir)
+        print(f"one by one: {seconds:7.2f}s  {count / seconds:8.1f} images/s")
+        report = batch_shrink_images(source, batch_dir)
+        print(f"batch:      {report['seconds']:7.2f}s  {report['images_per_second']:8.1f} images/s  "
+              f"{report['bytes_saved'] / 1024 ** 2:.0f} MB saved")
+        report = batch_shrink_images(source, batch_dir)
+        print(f"up to date: {report['seconds']:7.2f}s  ({report['skipped']} skipped)")
+
+
+def _write_speech_like(path: str, minutes: int):
+    # Bursts of tones separated by pauses, so the silence splitter has something to cut.
+    from pydub import AudioSegment
+    from pydub.generators import Sine
+    rng = random.Random(0)
+    audio = AudioSegment.silent(500, frame_rate=16000)
+    while len(audio) < minutes * 60_000:
+        audio += Sine(rng.randrange(200, 800)).to_audio_segment(duration=rng.randrange(2000, 12000)).apply_gain(-6)
+        audio += AudioSegment.silent(rng.randrange(800, 2000), frame_rate=16000)
+    audio.export(path, format="mp3")
+
+
+def _transcribe_whole(audio_file: str, output_file: str):
+    # The single-shot transcribe_audio path.
+    from model_registry import model_registry, WHISPER_MODEL
+    with model_registry.use(WHISPER_MODEL) as model:
+        result = model.transcribe(audio_file)
+    with open(output_file, "w") as f:
+        f.write(result["text"])
+
+
+def bench_transcribe(minutes=30, audio_file=None, workers=os.cpu_count() or 2):
+    """
+    Compares single-shot and chunked transcription throughput, model loading included
+    in both. Pass audio_file=... to use a real recording instead of generated tones.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        if audio_file is None:
+            audio_file = os.path.join(tmp, "audio.mp3")
+            _write_speech_like(audio_file, minutes)
+        _, seconds, _ = _in_subprocess(_transcribe_whole, audio_file, os.path.join(tmp, "whole.txt"))
+        report, _, _ = _in_subprocess(transcribe_chunked, audio_file, os.path.join(tmp, "chunked.txt"), False, workers)
+        audio_seconds = report["audio_seconds"]
+        print(f"{audio_seconds / 60:.1f} min of audio")
+        print(f"single-shot: {seconds:8.1f}s  {audio_seconds / seconds:6.1f}x real time")
+        print(f"chunked:     {report['seconds']:8.1f}s  {report['realtime_factor']:6.1f}x real time  "
+              f"({report['chunks']} chunks, {workers} workers)")
+
+
+def _write_docs(root: str, docs: int, per_dir: int = 1000):
+    rng = random.Random(0)
+    words = ["alpha", "beta", "gamma", "delta", "*emphasis*", "`code`", "[link](http://example.com)"]
+    for i in range(docs):
+        directory = os.path.join(root, f"section{i // per_dir:03d}")
+        os.makedirs(directory, exist_ok=True)
+        paragraphs = "\n\n".join(" ".join(rng.choice(words) for _ in range(60)) for _ in range(4))
+        with open(os.path.join(directory, f"doc{i:06d}.md"), "w") as f:
+            f.write(f"# Document {i}\n\n{paragraphs}\n\n- one\n- two\n")
+
+
+def _convert_one_by_one(root: str, output_dir: str, limit: int):
+    # The original convert_markdown_to_html: a fresh markdown.markdown() per file.
+    import markdown
+    converted = 0
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if converted == limit:
+                return converted
+            with open(os.path.join(directory, name), "r") as f:
+                html = markdown.markdown(f.read())
+            with open(os.path.join(output_dir, f"{converted}.html"), "w") as f:
+                f.write(html)
+            converted += 1
+    return converted
+
+
+def bench_markdown(docs=100_000, baseline_limit=5000):
+    """
+    Times a cold build, a no-op rebuild and a rebuild after editing 1% of the files,
+    against per-file conversion timed on baseline_limit files and scaled linearly.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        source, output, naive = (os.path.join(tmp, name) for name in ("docs", "html", "naive"))
+        os.makedirs(naive)
+        _, seconds = timed(_write_docs, source, docs)
+        print(f"{docs} docs generated in {seconds:.1f}s")
+
+        converted, seconds = timed(_convert_one_by_one, source, naive, baseline_limit)
+        print(f"one by one:  {seconds * docs / converted:8.2f}s est.  {converted / seconds:9.0f} files/s")
+        report = build_html(source, output)
+        print(f"cold build:  {report['seconds']:8.2f}s       {report['files_per_second']:9.0f} files/s")
+        report = build_html(source, output)
+        print(f"no changes:  {report['seconds']:8.2f}s       {report['files_per_second']:9.0f} files/s")
+        for i in range(0, docs, 100):
+            with open(os.path.join(source, f"section{i // 1000:03d}", f"doc{i:06d}.md"), "a") as f:
+                f.write("\nEdited.\n")
+        report = build_html(source, output)
+        print(f"1% edited:   {report['seconds']:8.2f}s       {report['files_per_second']:9.0f} files/s  "
+              f"({report['converted']} converted)")
+
+
+def _write_logs(directory: str, files: int):
+    os.makedirs(directory)
+    now = time.time()
+    for i in range(files):
+        path = os.path.join(directory, f"app-{i:06d}.log")
+        with open(path, "w") as f:
+            f.write(f"log {i} first line\nsecond line\n")
+        os.utime(path, (now - i, now - i))
+
+
+def _listdir_sort_recent(log_dir: str, k: int):
+    # The original write_recent_logs: getmtime on every .log file, a full sort, then sequential reads.
+    paths = [os.path.join(log_dir, name) for name in os.listdir(log_dir) if name.endswith(".log")]
+    recent = sorted(((path, os.path.getmtime(path)) for path in paths), key=lambda x: x[1], reverse=True)[:k]
+    lines = []
+    for path, _ in recent:
+        with open(path, "r") as f:
+            lines.append(f.readline().strip())
+    return lines
+
+
+def _scandir_heap_recent(log_dir: str, k: int):
+    return read_first_lines(recent_files(log_dir, k, "*.log"))
+
+
+def bench_recent_logs(files=100_000, k=10, repeat=5):
+    """Compares the original listdir, getmtime and sort with the scandir and heap top-k selection."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = os.path.join(tmp, "logs")
+        _, seconds = timed(_write_logs, log_dir, files)
+        print(f"{files} log files generated in {seconds:.1f}s")
+        for label, func in (("listdir + sort", _listdir_sort_recent), ("scandir + heap", _scandir_heap_recent)):
+            runs = [timed(func, log_dir, k) for _ in range(repeat)]
+            if runs[0][0] != [f"log {i} first line" for i in range(k)]:
+                print(f"{label}: unexpected result {runs[0][0]}")
+            print(f"{label}: best of {repeat} {min(seconds for _, seconds in runs) * 1000:8.1f} ms")
+
+
+BENCHMARKS = {
+    "similar_pairs": bench_similar_pairs,
+    "dates": bench_dates,
+    "sort_contacts": bench_sort_contacts,
+    "aggregate": bench_aggregate,
+    "images": bench_images,
+    "transcribe": bench_transcribe,
+    "markdown": bench_markdown,
+    "recent_logs": bench_recent_logs,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"Usage: python benchmarks.py <{'|'.join(BENCHMARKS)}> [key=value ...]")
+        sys.exit(1)
+    options = dict(arg.split("=", 1) for arg in sys.argv[2:])
+    BENCHMARKS[sys.argv[1]](**{key: int(value) if value.isdigit() else value for key, value in options.items()})
@@ -0,0 +1,282 @@
+# app/dataset_registry.py
+import os
+import re
+import csv
+import json
+import fcntl
+import sqlite3
+import hashlib
+import tempfile
+from itertools import chain
+from contextlib import contextmanager
+
+# Constants
+DATA_DIR = "/data/"
+DATASET_DIR = os.environ.get("DATASET_DIR", os.path.join(DATA_DIR, ".cache", "datasets"))
+DATASET_DEFAULT_LIMIT = int(os.environ.get("DATASET_DEFAULT_LIMIT", "100"))
+DATASET_MAX_LIMIT = int(os.environ.get("DATASET_MAX_LIMIT", "10000"))
+
+TYPE_SAMPLE_ROWS = 1000  # Rows used to infer column types
+INSERT_BATCH = 50_000
+FETCH_BATCH = 1000
+OPERATORS = {"eq": "=", "ne": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=", "contains": "LIKE"}
+RESERVED_PARAMETERS = {"fields", "sort", "limit", "offset"}
+_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _infer_type(values: list) -> str:
+    values = [value for value in values if value != ""]
+    if not values:
+        return "TEXT"
+    for sql_type, parse in (("INTEGER", int), ("REAL", float)):
+        try:
+            for value in values:
+                parse(value)
+            return sql_type
+        except ValueError:
+            continue
+    return "TEXT"
+
+
+@contextmanager
+def _file_lock(path: str):
+    # Held across processes, so concurrent API workers build a store only once.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class CsvDataset:
+    """
+    A CSV file mirrored into a typed SQLite table. The table is rebuilt when the CSV's
+    mtime or size changes, and single-column indexes are created the first time a
+    query filters or sorts on a column.
+    """
+
+    def __init__(self, csv_file: str, directory: str = DATASET_DIR):
+        self.csv_file = os.path.realpath(csv_file)
+        key = hashlib.sha256(self.csv_file.encode("utf-8")).hexdigest()[:16]
+        stem = os.path.splitext(os.path.basename(self.csv_file))[0]
+        self.path = os.path.join(directory, f"{key}-{stem}.db")
+        self.columns = {}  # Header name -> SQL type
+        self._version = None
+        self._indexes = set()  # Columns known to be indexed in the current store
+
+    def _stored_version(self):
+        try:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        except sqlite3.Error:
+            return None, {}
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            return (int(meta["mtime_ns"]), int(meta["size"])), json.loads(meta["columns"])
+        except (sqlite3.Error, KeyError, ValueError):
+            return None, {}
+        finally:
+            conn.close()
+
+    def refresh(self) -> bool:
+        """Makes sure the store matches the CSV file, rebuilding it if needed. Returns True if it was rebuilt."""
+        stat_result = os.stat(self.csv_file)
+        version = (stat_result.st_mtime_ns, stat_result.st_size)
+        if version == self._version:
+            return False
+        with _file_lock(self.path + ".lock"):
+            stored, columns = self._stored_version()  # Another worker may have rebuilt it already
+            rebuilt = stored != version
+            if rebuilt:
+                columns = self._build(version)
+        self._version, self.columns = version, columns
+        self._indexes = set()
+        return rebuilt
+
+    def _build(self, version: tuple) -> dict:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        os.close(fd)
+        try:
+            conn = sqlite3.connect(tmp_path)
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            with open(self.csv_file, "r", newline="") as f:
+                reader = csv.reader(f)
+                header = next(reader, [])
+                if not header:
+                    raise ValueError("CSV file has no header row")
+                sample = [row for _, row in zip(range(TYPE_SAMPLE_ROWS), reader)]
+                columns = {
+                    name: _infer_type([row[i] for row in sample if i < len(row)]) for i, name in enumerate(header)
+                }
+                definitions = ", ".join(f"{_quote(name)} {sql_type}" for name, sql_type in columns.items())
+                conn.execute(f"CREATE TABLE rows ({definitions})")
+                # Numeric text is stored as numbers by the declared column affinity, without parsing in Python.
+                insert = f"INSERT INTO rows VALUES ({','.join('?' * len(header))})"
+                width = len(header)
+                rows = (row[:width] + [""] * (width - len(row)) for row in chain(sample, reader))
+                while True:
+                    batch = [row for _, row in zip(range(INSERT_BATCH), rows)]
+                    if not batch:
+                        break
+                    conn.executemany(insert, batch)
+            for name, sql_type in columns.items():
+                if sql_type != "TEXT":
+                    conn.execute(f"UPDATE rows SET {_quote(name)} = NULL WHERE {_quote(name)} = ''")
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [("mtime_ns", str(version[0])), ("size", str(version[1])), ("columns", json.dumps(columns))],
+            )
+            conn.commit()
+            conn.close()
+            os.replace(tmp_path, self.path)  # Open readers keep the old file until they finish
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return columns
+
+    def _ensure_index(self, column: str):
+        if column in self._indexes:
+            return
+        conn = sqlite3.connect(self.path, timeout=60)  # Waits while another worker builds the same index
+        try:
+            name = "idx_" + hashlib.sha256(column.encode("utf-8")).hexdigest()[:12]
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON rows ({_quote(column)})")
+            conn.commit()
+        finally:
+            conn.close()
+        self._indexes.add(column)
+
+    def _parse_sort(self, sort: str) -> list:
+        order = []
+        for item in (sort or "").split(","):
+            item = item.strip()
+            if not item:
+                continue
+            column = item.lstrip("-")
+            if column not in self.columns:
+                raise ValueError(f"Unknown sort column: {column}")
+            order.append((column, "DESC" if item.startswith("-") else "ASC"))
+        return order
+
+    def prepare_query(self, filters: dict, fields: str = None, sort: str = None, limit: int = None,
+                      offset: int = 0) -> dict:
+        """
+        Builds the SQL for filters like {"age__gte": "30", "city": "Pune"},
+        a comma-separated projection, a sort spec like "-age,name" and limit/offset.
+        Creates the indexes the query needs.
+        """
+        self.refresh()
+        selected = [name.strip() for name in fields.split(",") if name.strip()] if fields else list(self.columns)
+        unknown = [name for name in selected if name not in self.columns]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+        conditions, parameters, indexed = [], [], []
+        for key, value in filters.items():
+            column, _, operator = key.rpartition("__") if "__" in key else (key, "", "eq")
+            if column not in self.columns or operator not in OPERATORS:
+                raise ValueError(f"Unknown filter: {key}")
+            if operator == "contains":
+                conditions.append(f"{_quote(column)} LIKE ? ESCAPE '\\'")
+                parameters.append("%" + re.sub(r"([%_\\])", r"\\\1", value) + "%")
+            else:
+                conditions.append(f"{_quote(column)} {OPERATORS[operator]} ?")
+                parameters.append(value)
+                indexed.append(column)
+        order = self._parse_sort(sort)
+        indexed.extend(column for column, _ in order[:1])
+        for column in dict.fromkeys(indexed):
+            self._ensure_index(column)
+
+        limit = DATASET_DEFAULT_LIMIT if limit is None else limit
+        if not 0 <= limit <= DATASET_MAX_LIMIT or offset < 0:
+            raise ValueError(f"limit must be between 0 and {DATASET_MAX_LIMIT} and offset non-negative")
+        sql = f"SELECT {', '.join(_quote(name) for name in selected)} FROM rows"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if order:
+            sql += " ORDER BY " + ", ".join(f"{_quote(column)} {direction}" for column, direction in order)
+        sql += " LIMIT ? OFFSET ?"
+        return {"sql": sql, "parameters": parameters + [limit, offset], "fields": selected, "limit": limit, "offset": offset}
+
+    def stream(self, query: dict):
+        """Yields a prepared query's JSON page {"offset", "limit", "rows": [...]} in pieces while rows are fetched."""
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            cursor = conn.execute(query["sql"], query["parameters"])
+            yield f'{{"offset": {query["offset"]}, "limit": {query["limit"]}, "rows": ['
+            first = True
+            while True:
+                batch = cursor.fetchmany(FETCH_BATCH)
+                if not batch:
+                    break
+                chunk = ",".join(json.dumps(dict(zip(query["fields"], row))) for row in batch)
+                yield chunk if first else "," + chunk
+                first = False
+            yield "]}"
+        finally:
+            conn.close()
+
+
+class DatasetRegistry:
+    """
+    Maps dataset names to CSV files. The mapping is a JSON file under DATASET_DIR,
+    so every API worker process sees datasets registered by any task.
+    """
+
+    def __init__(self, directory: str = DATASET_DIR):
+        self.directory = directory
+        self.path = os.path.join(directory, "registry.json")
+        self._datasets = {}  # Name -> CsvDataset, per process
+        self._entries = {}
+        self._mtime_ns = None
+
+    def _load(self) -> dict:
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if mtime_ns != self._mtime_ns:
+            with open(self.path, "r") as f:
+                self._entries = json.load(f)
+            self._mtime_ns = mtime_ns
+        return self._entries
+
+    def register(self, name: str, csv_file: str) -> CsvDataset:
+        """Registers (or re-points) a dataset name and builds its store."""
+        if not _NAME.match(name):
+            raise ValueError(f"Invalid dataset name: {name}")
+        dataset = CsvDataset(csv_file, self.directory)
+        dataset.refresh()
+        with _file_lock(self.path + ".lock"):
+            self._mtime_ns = None  # Re-read under the lock
+            entries = dict(self._load())
+            entries[name] = {"csv_file": dataset.csv_file}
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        self._datasets[name] = dataset
+        return dataset
+
+    def get(self, name: str) -> CsvDataset:
+        """Returns the named dataset. Raises KeyError if it is not registered."""
+        entry = self._load()[name]
+        dataset = self._datasets.get(name)
+        if dataset is None or dataset.csv_file != entry["csv_file"]:
+            dataset = self._datasets[name] = CsvDataset(entry["csv_file"], self.directory)
+        return dataset
+
+    def names(self) -> list:
+        """Returns the registered dataset names."""
+        return sorted(self._load())
+
+
+dataset_registry = DatasetRegistry()
@@ -0,0 +1,76 @@
+# app/dependency_manager.py
+import os
+import time
+import threading
+import subprocess
+import importlib
+import importlib.util
+
+# Constants
+DEPENDENCY_PREFLIGHT = os.environ.get("DEPENDENCY_PREFLIGHT", "0") == "1"  # Resolve everything at startup
+
+# Packages the task functions install on demand, mapped to the module they provide.
+TASK_DEPENDENCIES = {
+    "Pillow": "PIL",
+    "sentence-transformers": "sentence_transformers",
+    "openai-whisper": "whisper",
+    "markdown": "markdown",
+}
+
+_satisfied = {}  # package -> "preinstalled" or "installed"
+_failed = {}  # package -> last error message
+_lock = threading.Lock()
+
+
+def install_package(package: str):
+    """Installs a package using uv."""
+    try:
+        subprocess.run(["uv", "pip", "install", package], check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        raise Exception(f"Package installation failed for {package}: {e.stderr}")
+    _satisfied[package] = "installed"
+    _failed.pop(package, None)
+
+
+def ensure_package(package: str, module_name: str = None):
+    """
+    Makes sure a package is importable, installing it only if it is missing.
+    Satisfied packages are remembered, so repeated calls do no subprocess work.
+    """
+    if package in _satisfied:
+        return
+    with _lock:
+        if package in _satisfied:  # Another thread resolved it while we waited
+            return
+        module_name = module_name or TASK_DEPENDENCIES.get(package, package)
+        if importlib.util.find_spec(module_name) is not None:
+            _satisfied[package] = "preinstalled"
+            _failed.pop(package, None)
+            return
+        try:
+            install_package(package)
+        except Exception as e:
+            _failed[package] = str(e)
+            raise
+        importlib.invalidate_caches()  # Let the import system see the new package
+
+
+def preflight(packages=None) -> dict:
+    """Resolves every task dependency once. Failures are recorded instead of raised."""
+    start = time.perf_counter()
+    for package in packages if packages is not None else TASK_DEPENDENCIES:
+        try:
+            ensure_package(package)
+        except Exception as e:
+            print(f"Dependency preflight failed for {package}: {e}")  # Log and continue
+    print(f"Dependency preflight finished in {time.perf_counter() - start:.2f}s")
+    return dependency_status()
+
+
+def dependency_status() -> dict:
+    """Returns which task dependencies are satisfied, failed or not yet checked."""
+    return {
+        "satisfied": dict(_satisfied),
+        "failed": dict(_failed),
+        "unchecked": [package for package in TASK_DEPENDENCIES if package not in _satisfied and package not in _failed],
+    }
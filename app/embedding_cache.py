@@ -0,0 +1,152 @@
+# app/embedding_cache.py
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+
+# Constants
+DATA_DIR = "/data/"
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", os.path.join(DATA_DIR, ".cache", "embeddings.db"))
+EMBEDDING_CACHE_MAX_MB = float(os.environ.get("EMBEDDING_CACHE_MAX_MB", "512"))
+
+_LOOKUP_BATCH = 500  # Stay well below SQLite's bound-parameter limit
+
+
+class EmbeddingCache:
+    """
+    Persistent SQLite cache of embeddings keyed by model name and the SHA-256 of each text.
+    Only texts that are not cached yet are encoded. Least recently used rows are evicted
+    once the stored vectors exceed the size budget.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_mb: float = EMBEDDING_CACHE_MAX_MB):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.rows = 0
+        self.bytes = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    hash BLOB NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, hash)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+            # Counted once here and kept up to date by _store and _evict.
+            self.rows, self.bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()
+            self._conn = conn
+        return self._conn
+
+    def encode(self, model_name: str, texts: list, encode) -> np.ndarray:
+        """
+        Returns a float32 (len(texts), dim) matrix of embeddings.
+        encode is called once with the list of texts that were not cached.
+        """
+        hashes = [hashlib.sha256(text.encode("utf-8")).digest() for text in texts]
+        unique = dict(zip(hashes, texts))  # Identical lines are looked up and encoded once
+
+        # The lock covers SQLite only; encoding can take seconds and must not stall stats() or other lookups.
+        with self._lock:
+            try:
+                conn = self._connect()
+                vectors = self._lookup(conn, model_name, list(unique))
+            except (sqlite3.Error, OSError) as e:
+                print(f"Embedding cache unavailable, encoding without it: {e}")  # Log and continue
+                conn, vectors = None, {}
+
+            missing = [digest for digest in unique if digest not in vectors]
+            missed = sum(1 for digest in hashes if digest not in vectors)
+            self.hits += len(hashes) - missed
+            self.misses += missed
+
+        if missing:
+            encoded = np.asarray(encode([unique[digest] for digest in missing]), dtype=np.float32)
+            vectors.update(zip(missing, encoded))
+            if conn is not None:
+                with self._lock:
+                    try:
+                        self._store(conn, model_name, missing, encoded)
+                    except sqlite3.Error as e:
+                        print(f"Could not store embeddings: {e}")  # Log and continue
+
+        return np.stack([vectors[digest] for digest in hashes]) if hashes else np.empty((0, 0), dtype=np.float32)
+
+    def _lookup(self, conn: sqlite3.Connection, model_name: str, hashes: list) -> dict:
+        vectors = {}
+        now = time.time()
+        for start in range(0, len(hashes), _LOOKUP_BATCH):
+            batch = hashes[start:start + _LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                [model_name, *batch],
+            ).fetchall()
+            # frombuffer views the stored bytes directly instead of deserializing them.
+            vectors.update((digest, np.frombuffer(blob, dtype=np.float32)) for digest, blob in rows)
+            if rows:
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND hash = ?",
+                    [(now, model_name, digest) for digest, _ in rows],
+                )
+        conn.commit()
+        return vectors
+
+    def _store(self, conn: sqlite3.Connection, model_name: str, hashes: list, encoded: np.ndarray):
+        now = time.time()
+        # Another thread may have stored the same text meanwhile; its vector is identical, so keep it.
+        inserted = conn.executemany(
+            "INSERT OR IGNORE INTO embeddings (model, hash, vector, last_used) VALUES (?, ?, ?, ?)",
+            [(model_name, digest, vector.tobytes(), now) for digest, vector in zip(hashes, encoded)],
+        ).rowcount
+        conn.commit()
+        self.rows += inserted
+        self.bytes += inserted * encoded[0].nbytes
+        self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        if self.max_bytes <= 0 or self.bytes <= self.max_bytes:
+            return
+        # Drop the least recently used rows, sized from the average row to land under budget.
+        excess_rows = int((self.bytes - self.max_bytes) / (self.bytes / self.rows)) + 1
+        evicted = conn.execute(
+            "SELECT rowid, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT ?", (excess_rows,)
+        ).fetchall()
+        conn.executemany("DELETE FROM embeddings WHERE rowid = ?", [(rowid,) for rowid, _ in evicted])
+        conn.commit()
+        self.rows -= len(evicted)
+        self.bytes -= sum(size for _, size in evicted)
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the stored size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "max_bytes": self.max_bytes,
+            }
+            if self._conn is not None:
+                stats["rows"], stats["bytes"] = self.rows, self.bytes
+            return stats
+
+
+embedding_cache = EmbeddingCache()
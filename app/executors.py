@@ -0,0 +1,133 @@
+# app/executors.py
+import os
+import sys
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Constants
+IO_POOL_SIZE = int(os.environ.get("IO_POOL_SIZE", "8"))
+CPU_POOL_SIZE = int(os.environ.get("CPU_POOL_SIZE", str(os.cpu_count() or 2)))
+
+# Task functions dominated by Python-level computation. Everything else waits on
+# disk, network or a subprocess and runs in the thread pool. Model-backed functions
+# (find_similar_comments, transcribe_audio) stay on the thread pool: their models are
+# preloaded into and reported by the API process, and inference releases the GIL.
+CPU_BOUND_FUNCTIONS = {
+    "count_wednesdays",
+    "sort_contacts",
+    "compress_resize_image",
+}
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _init_worker():
+    # Spawned workers start with a fresh sys.path; task modules are imported flat from app/.
+    if APP_DIR not in sys.path:
+        sys.path.append(APP_DIR)
+
+
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    """Returns a spawn-context process pool whose workers can import the task modules."""
+    # spawn rather than fork: the API process runs threads and may hold loaded models.
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker)
+
+
+class OffloadPool:
+    """
+    Runs blocking callables on an executor without blocking the event loop.
+    Submissions beyond the pool size wait on the loop, which makes the queue depth observable.
+    """
+
+    def __init__(self, name: str, size: int, processes: bool = False):
+        self.name = name
+        self.size = max(1, size)
+        self.processes = processes
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self._executor = None
+        self._slots = None
+        self._loop = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.processes:
+                self._executor = process_pool(self.size)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix=self.name)
+        return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        """Runs func(*args, **kwargs) on the pool and returns its result."""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            self._slots = asyncio.Semaphore(self.size)
+            self._loop = loop
+
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            result = await loop.run_in_executor(self._get_executor(), functools.partial(func, *args, **kwargs))
+            self.completed += 1
+            return result
+        except BrokenProcessPool as e:
+            self._executor = None  # A worker died (e.g. out of memory); start a fresh pool next time
+            self.failed += 1
+            raise Exception(f"{self.name} worker crashed: {e}")
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Returns pool size, queue depth and succeeded and failed call counts."""
+        return {
+            "size": self.size,
+            "queued": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    def shutdown(self):
+        """Stops the worker threads or processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+io_pool = OffloadPool("io-pool", IO_POOL_SIZE)
+cpu_pool = OffloadPool("cpu-pool", CPU_POOL_SIZE, processes=True)
+
+
+async def offload(func, *args, **kwargs):
+    """
+    Runs a blocking task function off the event loop: CPU-bound task functions in
+    the process pool, everything else in the thread pool. Coroutine functions are awaited directly.
+    """
+    if asyncio.iscoroutinefunction(func):
+        return await func(*args, **kwargs)
+    pool = cpu_pool if getattr(func, "__name__", "") in CPU_BOUND_FUNCTIONS else io_pool
+    return await pool.run(func, *args, **kwargs)
+
+
+def executor_stats() -> dict:
+    """Returns queue-depth metrics for both pools."""
+    return {"io": io_pool.stats(), "cpu": cpu_pool.stats()}
+
+
+def shutdown_executors():
+    """Stops both pools."""
+    io_pool.shutdown()
+    cpu_pool.shutdown()
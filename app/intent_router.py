@@ -0,0 +1,261 @@
+# app/intent_router.py
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+from scheduler import FIXED_OUTPUTS
+
+# Constants
+DATA_DIR = "/data/"
+ROUTER_ENABLED = os.environ.get("ROUTER_ENABLED", "1") == "1"
+
+EMAIL_PATTERN = r"[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}"
+# Template slots. Paths stop at characters a /data path never contains, so "/data/x.txt में" splits cleanly.
+SLOTS = {
+    "input": r"/data(?:/[A-Za-z0-9_.+@-]*)*",
+    "output": r"/data(?:/[A-Za-z0-9_.+@-]*)*",
+    "k": r"[1-9][0-9]{0,3}",
+    "email": EMAIL_PATTERN,
+}
+TEMPLATE_TOKENS = re.compile(r"(\{(?:%s)\}|\[|\])" % "|".join(SLOTS))
+QUOTES = str.maketrans({"“": None, "”": None, '"': None, "‘": "'", "’": "'"})
+TRAILING_PUNCTUATION = re.compile(r"[\s.?!。？！।]+$")
+
+
+def _normalize(text: str) -> str:
+    """Folds Unicode forms, quotes and whitespace so templates need not spell out variants."""
+    text = unicodedata.normalize("NFKC", text).translate(QUOTES)
+    return TRAILING_PUNCTUATION.sub("", " ".join(text.split()))
+
+
+def _template(template: str):
+    """
+    Compiles a canonical task template. "{input}", "{output}", "{k}" and "{email}" are
+    slots, "[...]" is optional text, and everything else must match literally (ignoring case).
+    """
+    parts = []
+    for token in TEMPLATE_TOKENS.split(_normalize(template)):
+        if token == "[":
+            parts.append("(?:")
+        elif token == "]":
+            parts.append(")?")
+        elif token.startswith("{") and token[1:-1] in SLOTS:
+            parts.append(f"(?P<{token[1:-1]}>{SLOTS[token[1:-1]]})")
+        else:
+            parts.append(re.escape(token))
+    return re.compile("".join(parts), re.IGNORECASE)
+
+
+# The fixed task catalog. A task is routed only when its whole text matches one of the
+# templates; "parameter" receives the {input} path (else "default"), which must be of the
+# right "kind", and an {output} path must be one the function actually writes.
+INTENTS = {
+    "count_wednesdays": {
+        "templates": [
+            "The file {input} contains a list of dates, one per line. Count the number of Wednesdays[ in the list][,] and write just the number to {output}",
+            "Count the[ number of] Wednesdays in {input}[ and write[ just] the number to {output}]",
+            "How many Wednesdays are[ there] in {input}",
+            "{input} में कितने बुधवार हैं[?[ केवल] संख्या {output} में लिखो]",
+            "Cuenta los miércoles en {input}[ y escribe el número en {output}]",
+            "Compte le nombre de mercredis dans {input}",
+            "Zähle die Mittwoche in {input}",
+        ],
+        "parameter": "file_path", "default": "/data/dates.txt", "kind": ".txt",
+    },
+    "sort_contacts": {
+        "templates": [
+            "Sort the array of contacts in {input} by last_name, then first_name[,] and write the result to {output}",
+            "Sort the contacts[ in {input}] by last_name, then first_name",
+            "Order the contacts by last name and first name",
+            "{input} में संपर्कों को last_name और first_name के क्रम में लगाओ",
+            "Ordena los contactos de {input} por apellido y nombre",
+            "Trie les contacts par nom puis prénom",
+            "Sortiere die Kontakte nach Nachname und Vorname",
+        ],
+        "parameter": "file_path", "default": "/data/contacts.json", "kind": ".json",
+    },
+    "write_recent_logs": {
+        "templates": [
+            "Write the first line of the {k} most recent .log file[s] in {input} to {output}[, most recent first]",
+            "Get the first lines of the latest log files",
+            "{input} की {k} सबसे हाल की .log फाइलों की पहली पंक्ति {output} में लिखो",
+            "Escribe la primera línea de los {k} archivos .log más recientes de {input}",
+            "Écris la première ligne des {k} fichiers journaux les plus récents",
+            "Schreibe die erste Zeile der {k} neuesten Logdateien",
+        ],
+        "parameter": "log_dir", "default": "/data/logs/", "kind": "dir",
+    },
+    "create_markdown_index": {
+        "templates": [
+            "Find all Markdown (.md) files in {input}. For each file, extract the first occurrence of each H1[ (i.e. a line starting with # )]. "
+            "Create an index file {output} that maps each filename[ (without the /data/docs/ prefix)] to its title",
+            "Build an index of markdown titles",
+            "{input} की सभी .md फाइलों के पहले H1 शीर्षक से {output} इंडेक्स बनाओ",
+            "Crea un índice de los títulos H1 de los archivos Markdown en {input}",
+            "Crée un index des titres des fichiers Markdown",
+            "Erstelle einen Index der Überschriften aller Markdown-Dateien",
+        ],
+        "parameter": "docs_dir", "default": "/data/docs/", "kind": "dir",
+    },
+    "extract_email_from_llm": {
+        "templates": [
+            "{input} contains an email message. Pass the content to an LLM with instructions to extract the sender's email address, "
+            "and write just the email address to {output}",
+            "Extract the sender's email address from {input}",
+            "Extract the sender's email address from the email",
+            "{input} से ईमेल भेजने वाले का पता निकालो",
+            "Extrae la dirección del remitente del correo en {input}",
+            "Extrais l'adresse de l'expéditeur du courriel",
+            "Extrahiere die Adresse des Absenders aus der E-Mail",
+        ],
+        "parameter": "email_file", "default": "/data/email.txt", "kind": ".txt",
+    },
+    "extract_credit_card_from_llm": {
+        "templates": [
+            "{input} contains a credit card number. Pass the image to an LLM, have it extract the card number, and write it without spaces to {output}",
+            "Extract the credit card number from {input}",
+            "Extract the credit card number from the image",
+            "{input} से क्रेडिट कार्ड नंबर निकालो",
+            "Extrae el número de la tarjeta de crédito de la imagen",
+            "Extrais le numéro de carte de crédit de l'image",
+            "Lies die Kreditkartennummer aus dem Bild",
+        ],
+        "parameter": "image_file", "default": "/data/credit-card.png", "kind": ".png",
+    },
+    "find_similar_comments": {
+        "templates": [
+            "{input} contains a list of comments, one per line. Using embeddings, find the most similar pair of comments and write them to {output}, one per line",
+            "Find the[ two] most similar[ pair of] comments[ in {input}]",
+            "{input} में सबसे समान टिप्पणियों की जोड़ी खोजो",
+            "Encuentra los dos comentarios más parecidos",
+            "Trouve les deux commentaires les plus similaires",
+            "Finde die zwei ähnlichsten Kommentare",
+        ],
+        "parameter": "comments_file", "default": "/data/comments.txt", "kind": ".txt",
+    },
+    "calculate_gold_ticket_sales": {
+        "templates": [
+            "The SQLite database file {input} has a tickets[ table] with columns type, units, and price.[ Each row is a customer bid for a concert ticket.] "
+            "What is the total sales of all the items in the Gold ticket type? Write the number in {output}",
+            "Total sales of Gold tickets[ in {input}]",
+            "{input} में Gold टिकट की कुल बिक्री कितनी है",
+            "¿Cuáles son las ventas totales de los boletos Gold",
+            "Quel est le total des ventes des billets Gold",
+            "Wie hoch ist der Gesamtumsatz der Gold-Tickets",
+        ],
+        "parameter": "db_file", "default": "/data/ticket-sales.db", "kind": ".db",
+    },
+    "format_markdown": {
+        "templates": [
+            "Format the contents of {input} using prettier@3.4.2[, updating the file in-place]",
+            "Format the markdown file with prettier",
+            "{input} को prettier@3.4.2 से फ़ॉर्मेट करो",
+            "Formatea {input} con prettier",
+            "Formate le fichier {input} avec prettier",
+            "Formatiere {input} mit prettier",
+        ],
+        "parameter": "file_path", "default": "/data/format.md", "kind": ".md",
+        "fixed": {"prettier_version": "3.4.2"},
+    },
+    "run_datagen": {
+        "templates": [
+            "Install uv (if required) and run https://raw.githubusercontent.com/sanand0/tools-in-data-science-public/tds-2025-01/project-1/datagen.py "
+            "with {email} as the only argument",
+            "Run datagen.py with {email}",
+            "datagen.py को {email} के साथ चलाओ",
+            "Ejecuta datagen.py con {email}",
+        ],
+        "parameter": None,
+    },
+}
+
+
+class IntentRouter:
+    """
+    Maps task descriptions from the fixed task catalog straight to a one-step plan.
+    A task is routed only when it matches a canonical template of exactly one intent
+    from start to end, with slots for nothing but paths, the log count and the datagen
+    email; any other wording returns None and goes to the LLM.
+    """
+
+    def __init__(self, intents: dict = INTENTS, enabled: bool = ROUTER_ENABLED):
+        self.intents = intents
+        self.enabled = enabled
+        self.templates = {name: [_template(text) for text in intent["templates"]] for name, intent in intents.items()}
+        self.requests = 0
+        self.hits = 0
+        self.seconds = 0.0
+        self.routed = Counter()
+
+    def route(self, task: str):
+        """Returns {"steps": [...]} for a recognized task, or None."""
+        if not self.enabled:
+            return None
+        start = time.perf_counter()
+        try:
+            plan = self._route(task)
+        except Exception as e:
+            print(f"Intent router failed, falling back to the LLM: {e}")  # Log and continue
+            plan = None
+        self.requests += 1
+        self.seconds += time.perf_counter() - start
+        if plan is not None:
+            self.hits += 1
+            self.routed[plan["steps"][0]["name"]] += 1
+        return plan
+
+    def _route(self, task: str):
+        text = _normalize(task)
+        plans = []
+        for name, templates in self.templates.items():
+            for template in templates:
+                match = template.fullmatch(text)
+                if match is None:
+                    continue
+                parameters = self._parameters(name, self.intents[name], match.groupdict())
+                if parameters is not None:
+                    plans.append({"steps": [{"action": "call_function", "name": name, "parameters": parameters}]})
+                break
+        return plans[0] if len(plans) == 1 else None
+
+    def _parameters(self, name: str, intent: dict, slots: dict):
+        output = slots.get("output")
+        if output is not None and os.path.normpath(output) not in map(os.path.normpath, FIXED_OUTPUTS.get(name, [])):
+            return None  # An output path the function cannot write to
+        parameters = {}
+
+        if intent["parameter"]:
+            # Checked from the text alone: routing runs on the event loop, so it never stats files.
+            # A missing input fails in the task function, as it would with an LLM plan.
+            path = slots.get("input") or intent["default"]
+            if not os.path.normpath(path).startswith(DATA_DIR):
+                return None
+            if intent["kind"] == "dir":
+                if os.path.splitext(path.rstrip("/"))[1]:
+                    return None  # Names a file, not a directory
+                path = path.rstrip("/") + "/"
+            elif not path.endswith(intent["kind"]):
+                return None
+            parameters[intent["parameter"]] = path
+        parameters.update(intent.get("fixed", {}))
+
+        if name == "write_recent_logs":
+            parameters["k"] = int(slots.get("k") or 10)
+        elif name == "run_datagen":
+            parameters["user_email"] = slots["email"]
+        return parameters
+
+    def stats(self) -> dict:
+        """Returns the hit rate, mean routing latency and hits per intent."""
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.requests if self.requests else 0.0,
+            "mean_ms": self.seconds * 1000 / self.requests if self.requests else 0.0,
+            "routed": dict(self.routed),
+        }
+
+
+intent_router = IntentRouter()
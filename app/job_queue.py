@@ -0,0 +1,189 @@
+# app/job_queue.py
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+import itertools
+
+# Constants
+DATA_DIR = "/data/"
+JOBS_DB_PATH = os.environ.get("JOBS_DB_PATH", os.path.join(DATA_DIR, "jobs.db"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", "100"))  # Queued jobs before POST /jobs returns 429
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobStore:
+    """SQLite-backed job records, so queued jobs survive a restart."""
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    task TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    started REAL,
+                    finished REAL,
+                    steps TEXT,
+                    error TEXT
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status)")
+            self._conn = conn
+        return self._conn
+
+    def create(self, task: str, priority: int) -> dict:
+        """Inserts a new queued job and returns it."""
+        job = {"id": uuid.uuid4().hex, "task": task, "priority": priority, "status": "queued", "created": time.time()}
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO jobs (id, task, priority, status, created) VALUES (:id, :task, :priority, :status, :created)",
+                job,
+            )
+            conn.commit()
+        return job
+
+    def update(self, job_id: str, **fields):
+        """Updates the given columns of a job; steps is stored as JSON."""
+        if "steps" in fields:
+            fields["steps"] = json.dumps(fields["steps"])
+        assignments = ", ".join(f"{column} = :{column}" for column in fields)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = :id", {**fields, "id": job_id})
+            conn.commit()
+
+    def get(self, job_id: str):
+        """Returns the job as a dict, or None if it does not exist."""
+        with self._lock:
+            row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["steps"] = json.loads(job["steps"]) if job["steps"] else []
+        return job
+
+    def unfinished(self) -> list:
+        """Returns queued and interrupted jobs, highest priority and oldest first."""
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT id, priority FROM jobs WHERE status IN ('queued', 'running') ORDER BY priority DESC, created"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+class JobQueue:
+    """
+    Bounded priority queue of tasks processed by a pool of background workers.
+    Higher priority values run first; equal priorities run in submission order.
+    """
+
+    def __init__(self, store: JobStore, runner, workers: int = JOB_WORKERS, max_size: int = JOB_QUEUE_SIZE):
+        self.store = store
+        self.runner = runner
+        self.workers = workers
+        self.max_size = max_size
+        self._queue = None
+        self._tasks = []
+        self._sequence = itertools.count()
+        self._admitting = 0
+
+    async def start(self):
+        """Re-enqueues jobs left over from a previous run and starts the workers."""
+        self._queue = asyncio.PriorityQueue()
+        for job in await asyncio.to_thread(self.store.unfinished):  # Recovered jobs are admitted even above max_size
+            await asyncio.to_thread(self.store.update, job["id"], status="queued", started=None)
+            self._queue.put_nowait((-job["priority"], next(self._sequence), job["id"]))
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Cancels the workers. Jobs they were running stay 'running' and are retried on the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, task: str, priority: int = 0) -> dict:
+        """Stores and enqueues a job. Raises QueueFull when max_size jobs are already waiting."""
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running.")
+        if self._queue.qsize() + self._admitting >= self.max_size:
+            raise QueueFull(f"Job queue is full ({self.max_size} jobs waiting).")
+        self._admitting += 1  # Holds the slot while the insert runs off the event loop
+        try:
+            job = await asyncio.to_thread(self.store.create, task, priority)
+        finally:
+            self._admitting -= 1
+        self._queue.put_nowait((-priority, next(self._sequence), job["id"]))
+        return job
+
+    async def get(self, job_id: str):
+        """Returns the stored job, or None if it does not exist."""
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    def depth(self) -> int:
+        """Returns the number of jobs waiting for a worker."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self):
+        while True:
+            _, _, job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"Error processing job {job_id}: {e}")  # Log and continue with the next job
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        # The store is synchronous SQLite, so every call runs in a thread to keep the event loop free.
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None:
+            return
+        await asyncio.to_thread(self.store.update, job_id, status="running", started=time.time())
+        steps = []
+        flush = None
+
+        async def save_steps():
+            # Writes the latest snapshot; updates arriving meanwhile are folded into the next write.
+            written = None
+            while written != steps:
+                written = [dict(record) for record in steps]
+                await asyncio.to_thread(self.store.update, job_id, steps=written)
+
+        def on_update(records):
+            nonlocal flush
+            steps[:] = [dict(record) for record in records]
+            if flush is None or flush.done():
+                flush = asyncio.get_running_loop().create_task(save_steps())
+
+        try:
+            await self.runner(job["task"], on_update=on_update)
+            fields = {"status": "done"}
+        except Exception as e:
+            fields = {"status": "failed", "error": str(e)}
+        if flush is not None:
+            await asyncio.gather(flush, return_exceptions=True)  # A later write must not be overtaken
+        await asyncio.to_thread(self.store.update, job_id, finished=time.time(), steps=steps, **fields)
@@ -0,0 +1,198 @@
+# app/llm_handler.py
+import os
+import json
+import random
+import asyncio
+import httpx
+
+# Constants
+AIPROXY_URL = os.environ.get("AIPROXY_URL", "http://aiproxy.sanand.workers.dev/openai/v1/chat/completions")
+LLM_MODEL = "gpt-4o-mini" # Enforce model use.
+
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "10"))  # Keep-alive pool size
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))  # In-flight requests
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "3"))
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "30"))  # Seconds per attempt
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", "0.5"))  # Seconds
+LLM_BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", "8"))  # Seconds
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+CHARS_PER_TOKEN = 4  # Rough estimate when a response carries no usage
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximates the token count of text."""
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+async def _aclose_quietly(client: httpx.AsyncClient):
+    try:
+        await client.aclose()
+    except Exception as e:  # Transports of a closed loop may fail to shut down cleanly
+        print(f"Error closing stale LLM client: {e}")  # Log and continue
+
+
+class LLMClient:
+    """
+    Async chat-completions client sharing one keep-alive connection pool.
+    Retries 429/5xx responses and transport errors with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        url: str = AIPROXY_URL,
+        token: str = None,
+        model: str = LLM_MODEL,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_retries: int = LLM_MAX_RETRIES,
+        timeout: float = LLM_TIMEOUT,
+        backoff_base: float = LLM_BACKOFF_BASE,
+        backoff_max: float = LLM_BACKOFF_MAX,
+    ):
+        self.url = url
+        self.token = token
+        self.model = model
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.requests = 0
+        self.bytes_sent = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self._client = None
+        self._semaphore = None
+        self._loop = None
+        self._closing = set()  # Close tasks for clients of a previous loop, kept until they finish
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        # httpx clients and semaphores are bound to the event loop they were first used on.
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            if self._client is not None:
+                self._close_stale(self._client, self._loop)
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                timeout=self.timeout,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client
+
+    def _close_stale(self, client: httpx.AsyncClient, loop):
+        # The old pool's connections belong to the old loop; close them there while it still runs.
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(_aclose_quietly(client), loop)
+            return
+        task = asyncio.get_running_loop().create_task(_aclose_quietly(client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def _backoff(self, attempt: int, response: httpx.Response = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        # Full jitter keeps concurrent callers from retrying in lockstep.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def request_body(self, prompt: str, images: list = None) -> bytes:
+        """Returns the JSON request body for a prompt, with images (URLs or data URLs) as extra content parts."""
+        content = prompt
+        if images:
+            content = [{"type": "text", "text": prompt}]
+            content += [{"type": "image_url", "image_url": {"url": url}} for url in images]
+        data = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": content}],
+        }
+        return json.dumps(data).encode()
+
+    async def complete(self, prompt: str, timeout: float = None, images: list = None) -> str:
+        """Sends the prompt (and optional images) as a single user message and returns the response text."""
+        token = self.token or os.environ.get("AIPROXY_TOKEN")
+        if not token:
+            raise ValueError("AIPROXY_TOKEN environment variable not set.")
+
+        client = self._ensure_client()
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+        }
+        body = self.request_body(prompt, images)
+
+        attempt = 0
+        while True:
+            response = None
+            try:
+                async with self._semaphore:
+                    self.requests += 1
+                    self.bytes_sent += len(body)
+                    response = await client.post(self.url, headers=headers, content=body, timeout=timeout or self.timeout)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()  # Raise HTTPStatusError for other 4xx responses
+                    payload = response.json()
+                    text = self._parse(payload)
+                    self._record_usage(payload, prompt, text)
+                    return text
+                error = httpx.HTTPStatusError(
+                    f"LLM returned HTTP {response.status_code}", request=response.request, response=response
+                )
+            except httpx.HTTPStatusError as e:
+                raise Exception(f"LLM API Error: {e}")
+            except httpx.TransportError as e:  # Timeouts, refused and dropped connections
+                error = e
+
+            if attempt >= self.max_retries:
+                raise Exception(f"LLM API Error: {error}")
+            await asyncio.sleep(self._backoff(attempt, response))
+            attempt += 1
+
+    @staticmethod
+    def _parse(payload: dict) -> str:
+        if "choices" in payload:  # OpenAI chat-completions shape
+            return payload["choices"][0]["message"]["content"]
+        return payload["result"]
+
+    def _record_usage(self, payload: dict, prompt: str, text: str):
+        usage = payload.get("usage") or {}
+        estimated = "prompt_tokens" not in usage
+        prompt_tokens = usage.get("prompt_tokens", estimate_tokens(prompt))  # Image tokens are not estimated
+        completion_tokens = usage.get("completion_tokens", estimate_tokens(text))
+        cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cached_tokens += cached_tokens
+        print(f"LLM usage{' (estimated)' if estimated else ''}: {prompt_tokens} prompt tokens "
+              f"({cached_tokens} cached), {completion_tokens} completion tokens")
+
+    def stats(self) -> dict:
+        """Returns the requests sent (including retries), their total body size and token usage."""
+        return {
+            "requests": self.requests,
+            "bytes_sent": self.bytes_sent,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+        }
+
+    async def aclose(self):
+        """Closes the pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+llm_client = LLMClient()
+
+
+async def call_llm(prompt: str, timeout: float = None, images: list = None) -> str:
+    """Calls the LLM with the given prompt and returns the response."""
+    return await llm_client.complete(prompt, timeout=timeout, images=images)
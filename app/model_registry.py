@@ -0,0 +1,136 @@
+# app/model_registry.py
+import os
+import gc
+import time
+import threading
+from contextlib import contextmanager
+from utils import get_rss_bytes
+
+# Constants
+MODEL_MEMORY_BUDGET_MB = float(os.environ.get("MODEL_MEMORY_BUDGET_MB", "0"))  # 0 disables eviction
+PRELOAD_MODELS = [name for name in os.environ.get("PRELOAD_MODELS", "").split(",") if name.strip()]
+
+SENTENCE_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+WHISPER_MODEL = "whisper/tiny"
+
+
+class ModelRegistry:
+    """
+    Loads each registered model once per process and shares it across requests.
+    Idle models are evicted least recently used first when the memory budget is exceeded.
+    """
+
+    def __init__(self, memory_budget_mb: float = MODEL_MEMORY_BUDGET_MB):
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self._loaders = {}
+        self._models = {}  # name -> entry dict
+        self._lock = threading.Lock()  # Guards _models
+        self._load_lock = threading.Lock()  # One load at a time keeps RSS deltas meaningful
+
+    def register(self, name: str, loader):
+        """Registers a zero-argument callable that loads the named model."""
+        self._loaders[name] = loader
+
+    def get(self, name: str):
+        """Returns the named model, loading it on first use."""
+        with self.use(name) as model:
+            return model
+
+    @contextmanager
+    def use(self, name: str):
+        """Yields the named model and protects it from eviction while the block runs."""
+        entry = self._acquire(name)
+        try:
+            yield entry["model"]
+        finally:
+            with self._lock:
+                entry["in_use"] -= 1
+                entry["last_used"] = time.time()
+
+    def _acquire(self, name: str) -> dict:
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is not None:
+                entry["in_use"] += 1
+                return entry
+        if name not in self._loaders:
+            raise ValueError(f"Unknown model: {name}")
+
+        with self._load_lock:
+            with self._lock:  # Another thread may have finished loading while we waited
+                entry = self._models.get(name)
+                if entry is not None:
+                    entry["in_use"] += 1
+                    return entry
+            rss_before = get_rss_bytes()
+            start = time.perf_counter()
+            model = self._loaders[name]()
+            entry = {
+                "model": model,
+                "load_seconds": time.perf_counter() - start,
+                "rss_bytes": max(get_rss_bytes() - rss_before, 0),
+                "last_used": time.time(),
+                "in_use": 1,
+            }
+            with self._lock:
+                self._models[name] = entry
+                self._evict_over_budget()
+            print(f"Loaded model {name} in {entry['load_seconds']:.2f}s (+{entry['rss_bytes'] // (1024 * 1024)} MB RSS)")
+            return entry
+
+    def _evict_over_budget(self):
+        # Caller holds self._lock.
+        if self.memory_budget_bytes <= 0:
+            return
+        total = sum(entry["rss_bytes"] for entry in self._models.values())
+        idle = sorted(
+            (entry["last_used"], name) for name, entry in self._models.items() if entry["in_use"] == 0
+        )
+        for _, name in idle:
+            if total <= self.memory_budget_bytes:
+                break
+            total -= self._models.pop(name)["rss_bytes"]
+            print(f"Evicted idle model {name} to stay within the memory budget")
+        gc.collect()
+
+    def evict(self, name: str) -> bool:
+        """Drops the named model if it is loaded and idle."""
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is None or entry["in_use"]:
+                return False
+            del self._models[name]
+        gc.collect()
+        return True
+
+    def preload(self, names=None):
+        """Loads the given models (default: PRELOAD_MODELS) ahead of the first request."""
+        for name in names if names is not None else PRELOAD_MODELS:
+            self.get(name.strip())
+
+    def stats(self) -> dict:
+        """Returns load time, resident memory and usage for every loaded model."""
+        with self._lock:
+            return {
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "process_rss_bytes": get_rss_bytes(),
+                "models": {
+                    name: {key: value for key, value in entry.items() if key != "model"}
+                    for name, entry in self._models.items()
+                },
+            }
+
+
+def _load_sentence_transformer():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(SENTENCE_MODEL.split("/", 1)[1])
+
+
+def _load_whisper():
+    import whisper
+    return whisper.load_model(WHISPER_MODEL.split("/", 1)[1])
+
+
+model_registry = ModelRegistry()
+model_registry.register(SENTENCE_MODEL, _load_sentence_transformer)
+model_registry.register(WHISPER_MODEL, _load_whisper)
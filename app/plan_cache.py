@@ -0,0 +1,124 @@
+# app/plan_cache.py
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# Constants
+PLAN_CACHE_SIZE = int(os.environ.get("PLAN_CACHE_SIZE", "256"))  # Max number of cached plans
+PLAN_CACHE_TTL = float(os.environ.get("PLAN_CACHE_TTL", "86400"))  # Seconds, 0 disables expiry
+PLAN_CACHE_PATH = os.environ.get("PLAN_CACHE_PATH")  # Optional JSON file, e.g. /data/plan-cache.json
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_task(task_description: str) -> str:
+    """
+    Normalizes a task description for use as a cache key.
+    Case is preserved on purpose: file paths under /data are case sensitive.
+    """
+    text = unicodedata.normalize("NFKC", task_description)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def make_key(task_description: str, model: str) -> str:
+    """Builds the cache key for a task description planned by the given model."""
+    normalized = normalize_task(task_description)
+    return hashlib.sha256(f"{model}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """Thread-safe LRU cache of validated {"steps": [...]} plans with TTL and optional persistence."""
+
+    def __init__(self, max_size: int = PLAN_CACHE_SIZE, ttl: float = PLAN_CACHE_TTL, path: str = PLAN_CACHE_PATH):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (stored_at, plan)
+        self._lock = threading.Lock()
+        if self.path:
+            self._load()
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl > 0 and time.time() - stored_at > self.ttl
+
+    def get(self, key: str):
+        """Returns the cached plan for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry[0]):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, plan: dict):
+        """Stores a validated plan, evicting the least recently used entries over max_size."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time(), plan)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            if self.path:
+                self._save()
+
+    def clear(self):
+        """Drops every cached plan and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            if self.path:
+                self._save()
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable plan cache {self.path}: {e}")  # Log and start empty
+            return
+        for key, stored_at, plan in stored:
+            if not self._expired(stored_at):
+                self._entries[key] = (stored_at, plan)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _save(self):
+        # Write to a temp file first so a crash never leaves a truncated cache behind.
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump([[key, stored_at, plan] for key, (stored_at, plan) in self._entries.items()], f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Failed to persist plan cache {self.path}: {e}")  # Log and keep serving from memory
+
+
+plan_cache = PlanCache()
@@ -0,0 +1,175 @@
+# app/scheduler.py
+import os
+import glob
+import time
+import asyncio
+
+# Constants
+DATA_DIR = "/data/"
+MAX_PARALLEL_STEPS = int(os.environ.get("MAX_PARALLEL_STEPS", "4"))
+
+# Task functions that write to a hardcoded path instead of an output parameter.
+FIXED_OUTPUTS = {
+    "count_wednesdays": ["/data/dates-wednesdays.txt"],
+    "sort_contacts": ["/data/contacts-sorted.json"],
+    "write_recent_logs": ["/data/logs-recent.txt"],
+    "create_markdown_index": ["/data/docs/index.json", "/data/docs/index.manifest.json"],
+    "extract_email_from_llm": ["/data/email-sender.txt"],
+    "extract_credit_card_from_llm": ["/data/credit-card.txt"],
+    "find_similar_comments": ["/data/comments-similar.txt"],
+    "calculate_gold_ticket_sales": ["/data/ticket-sales-gold.txt"],
+}
+OUTPUT_PARAMETERS = {"output_file", "output_dir", "destination_dir"}
+IN_PLACE_FUNCTIONS = {"format_markdown"}  # Rewrite their input file
+BARRIER_FUNCTIONS = {"run_datagen"}  # Rewrite the whole /data tree
+
+
+def step_id(step: dict, index: int) -> str:
+    """Returns the step's explicit id, or its position in the plan."""
+    return str(step.get("id", index))
+
+
+def step_files(step: dict):
+    """
+    Infers (reads, writes) path sets for a step. Shell commands, scripts, package
+    installs and datagen can touch anything, so they read and write the whole filesystem.
+    """
+    everything = {"/"}
+    if step.get("action") != "call_function" or step.get("name") in BARRIER_FUNCTIONS:
+        return everything, everything
+
+    name = step.get("name")
+    reads, writes = set(), set(FIXED_OUTPUTS.get(name, []))
+    for key, value in (step.get("parameters") or {}).items():
+        if not isinstance(value, str) or not value.startswith("/"):
+            continue  # URLs, queries and other non-path parameters
+        if glob.has_magic(value):
+            value = value[:min(value.find(c) for c in "*?[" if c in value)].rsplit("/", 1)[0] or "/"  # Fixed prefix of a glob
+        path = os.path.normpath(value)
+        if key in OUTPUT_PARAMETERS:
+            writes.add(path)
+        else:
+            reads.add(path)
+            if name in IN_PLACE_FUNCTIONS:
+                writes.add(path)
+    return reads, writes
+
+
+def _overlaps(paths_a: set, paths_b: set) -> bool:
+    # Two paths conflict when they are equal or one is a directory containing the other.
+    for a in paths_a:
+        for b in paths_b:
+            if a == b or b.startswith(a.rstrip("/") + "/") or a.startswith(b.rstrip("/") + "/"):
+                return True
+    return False
+
+
+def build_dependencies(steps: list) -> dict:
+    """
+    Maps each step index to the set of step indexes it waits for. Explicit
+    depends_on lists are used as given; other steps depend on every earlier
+    step they have a read/write or write/write file conflict with.
+    """
+    if not all(isinstance(step, dict) for step in steps):
+        raise ValueError("Every step must be a JSON object.")
+    ids = {}
+    for index, step in enumerate(steps):
+        sid = step_id(step, index)
+        if sid in ids:
+            raise ValueError(f"Duplicate step id: {sid}")
+        ids[sid] = index
+
+    files = [step_files(step) for step in steps]
+    dependencies = {}
+    for index, step in enumerate(steps):
+        if "depends_on" in step:
+            depends_on = step["depends_on"]
+            if not isinstance(depends_on, list):
+                raise ValueError(f"'depends_on' of step {step_id(step, index)} must be a list of step ids.")
+            unknown = [str(sid) for sid in depends_on if str(sid) not in ids]
+            if unknown:
+                raise ValueError(f"Step {step_id(step, index)} depends on unknown steps: {', '.join(unknown)}")
+            dependencies[index] = {ids[str(sid)] for sid in depends_on}
+            continue
+        reads, writes = files[index]
+        dependencies[index] = {
+            earlier for earlier in range(index)
+            if _overlaps(files[earlier][1], reads | writes) or _overlaps(files[earlier][0], writes)
+        }
+    return dependencies
+
+
+def execution_order(dependencies: dict) -> list:
+    """Topologically sorts step indexes, preferring plan order among ready steps."""
+    remaining = {index: set(deps) for index, deps in dependencies.items()}
+    order = []
+    while remaining:
+        ready = sorted(index for index, deps in remaining.items() if not deps)
+        if not ready:
+            raise ValueError("Plan steps have circular dependencies.")
+        index = ready[0]
+        order.append(index)
+        del remaining[index]
+        for deps in remaining.values():
+            deps.discard(index)
+    return order
+
+
+async def run_steps(steps: list, execute, max_parallel: int = MAX_PARALLEL_STEPS, on_update=None) -> list:
+    """
+    Runs plan steps with execute(step), starting independent steps concurrently
+    with at most max_parallel in flight. After a failure no new steps start, the
+    running ones are allowed to finish and the first error is re-raised.
+    With max_parallel=1 steps run one at a time in a deterministic order.
+    Returns one record per step with its status, duration and error; on_update,
+    if given, is called with the records whenever a step starts or finishes.
+    """
+    dependencies = build_dependencies(steps)
+    order = execution_order(dependencies)
+    records = [
+        {"id": step_id(step, index), "status": "pending", "seconds": None, "error": None}
+        for index, step in enumerate(steps)
+    ]
+    errors = []
+
+    async def run(index: int):
+        record = records[index]
+        if errors or any(records[dep]["status"] != "done" for dep in dependencies[index]):
+            record["status"] = "skipped"
+            return
+        record["status"] = "running"
+        if on_update:
+            on_update(records)
+        start = time.perf_counter()
+        try:
+            await execute(steps[index])
+            record["status"] = "done"
+        except Exception as e:
+            record["status"] = "failed"
+            record["error"] = str(e)
+            errors.append(e)
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            if on_update:
+                on_update(records)
+
+    if max_parallel <= 1:
+        for index in order:
+            await run(index)
+    else:
+        semaphore = asyncio.Semaphore(max_parallel)
+        tasks = {}
+
+        async def schedule(index: int):
+            # Dependencies are waited for outside the semaphore so waiting steps never hold a slot.
+            await asyncio.gather(*(tasks[dep] for dep in dependencies[index]))
+            async with semaphore:
+                await run(index)
+
+        for index in order:  # Dependencies are always created before their dependents
+            tasks[index] = asyncio.ensure_future(schedule(index))
+        await asyncio.gather(*tasks.values())
+
+    if errors:
+        raise errors[0]
+    return records
@@ -0,0 +1,11 @@
+# app/security.py
+import os
+
+# Constants
+DATA_DIR = "/data/"
+
+
+def is_within_data_dir(path: str) -> bool:
+    """Returns True if path, after resolving '..' and symlinks, lies inside /data."""
+    resolved = os.path.realpath(path)
+    return resolved.startswith(os.path.realpath(DATA_DIR).rstrip("/") + "/")
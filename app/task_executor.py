@@ -3,29 +3,32 @@ import os
 import subprocess
 import re
 import json
-from datetime import datetime
 import sqlite3
-from typing import List, Tuple
-import hashlib
-import base64
 import requests
 import git
-from bs4 import BeautifulSoup
-from PIL import Image
-import io
-import csv
+import shutil
 import tempfile
+from dependency_manager import install_package, ensure_package
+from llm_handler import call_llm, llm_client
+from executors import offload
+from model_registry import model_registry, SENTENCE_MODEL, WHISPER_MODEL
+from embedding_cache import embedding_cache
+from tasks.data_processing import most_similar_pair, analyze_dates, external_sort_json_array, SORT_MEMORY_BUDGET_MB
+from tasks.file_operations import recent_files, read_first_lines, build_markdown_index
+from tasks.database_operations import export_query, aggregate_totals
+from tasks.audio_processing import transcribe_chunked
+from tasks.web_interaction import fetch_to_file, extract_text
+from tasks.git_operations import clone_repo
+from tasks.markdown_processing import markdown_to_html, build_html
+from dataset_registry import dataset_registry, DATASET_MAX_LIMIT
+from security import is_within_data_dir
+from tasks.image_processing import (
+    prepare_image, luhn_valid, shrink_image, batch_shrink_images, CARD_IMAGE_WIDTHS, CARD_IMAGE_MAX_BYTES,
+)
 
 # Constants
 DATA_DIR = "/data/"
 
-def install_package(package: str):
-    """Installs a package using uv."""
-    try:
-        subprocess.run(["uv", "pip", "install", package], check=True, capture_output=True, text=True)
-    except subprocess.CalledProcessError as e:
-        raise Exception(f"Package installation failed for {package}: {e.stderr}")
-
 def run_datagen(user_email: str):
     """Runs datagen.py with the given user email."""
     datagen_url = "https://raw.githubusercontent.com/sanand0/tools-in-data-science-public/tds-2025-01/project-1/datagen.py"
@@ -42,9 +45,7 @@ def format_markdown(file_path: str, prettier_version: str = "3.4.2"):
     """Formats the markdown file using prettier."""
     try:
         # Check if prettier is installed. If not, install it
-        try:
-            subprocess.run(["prettier", "--version"], check=True, capture_output=True, text=True)
-        except FileNotFoundError:
+        if shutil.which("prettier") is None:
             install_package(f"prettier@{prettier_version}")  # Install if not found
 
         subprocess.run(["prettier", "--write", file_path], check=True, capture_output=True, text=True)
@@ -53,53 +54,36 @@ def format_markdown(file_path: str, prettier_version: str = "3.4.2"):
 
 def count_wednesdays(file_path: str):
     """Counts the number of Wednesdays in the given file."""
-    wednesday_count = 0
     try:
-        with open(file_path, "r") as f:
-            for line in f:
-                try:
-                    date_obj = datetime.strptime(line.strip(), "%Y-%m-%d")  # Adjust format if necessary
-                    if date_obj.weekday() == 2:  # Wednesday is 2
-                        wednesday_count += 1
-                except ValueError:
-                    print(f"Invalid date format: {line.strip()}") # Log the error, don't stop
+        stats = analyze_dates(file_path)  # Handles every format datagen emits, in one streaming pass
+        wednesday_count = stats["weekdays"][2]  # Wednesday is 2
+        if stats["invalid"]:
+            print(f"Skipped {stats['invalid']} lines with an unrecognized date format") # Log the error, don't stop
         output_file = os.path.join(DATA_DIR, "dates-wednesdays.txt") # Hardcoded for now
         with open(output_file, "w") as outfile:
             outfile.write(str(wednesday_count))
     except FileNotFoundError:
         raise FileNotFoundError("dates.txt not found")
 
-def sort_contacts(file_path: str):
-    """Sorts the contacts in the JSON file by last_name, then first_name."""
+def sort_contacts(file_path: str, sort_keys: tuple = ("last_name", "first_name"),
+                  memory_budget_mb: float = SORT_MEMORY_BUDGET_MB):
+    """
+    Sorts the contacts in the JSON file by sort_keys (default last_name, then first_name).
+    Files that fit memory_budget_mb are sorted in memory and pretty-printed; larger ones
+    are sorted out of core with temporary runs under /data and written as compact JSON.
+    """
     try:
-        with open(file_path, 'r') as f:
-            contacts = json.load(f)
-
-        sorted_contacts = sorted(contacts, key=lambda x: (x['last_name'], x['first_name']))
-
         output_file = os.path.join(DATA_DIR, "contacts-sorted.json")
-        with open(output_file, 'w') as outfile:
-            json.dump(sorted_contacts, outfile, indent=4)
+        external_sort_json_array(file_path, output_file, sort_keys, memory_budget_mb, tmp_dir=DATA_DIR, indent=4)
 
     except FileNotFoundError:
         raise FileNotFoundError("contacts.json not found")
 
-def write_recent_logs(log_dir: str):
-    """Writes the first line of the 10 most recent .log files to a file, most recent first."""
+def write_recent_logs(log_dir: str, k: int = 10, pattern: str = "*.log"):
+    """Writes the first line of the k most recent files matching pattern to a file, most recent first."""
     try:
-        log_files = [f for f in os.listdir(log_dir) if f.endswith(".log")]
-        log_files_with_paths = [os.path.join(log_dir, f) for f in log_files] # full path
-        log_files_with_mtime = [(f, os.path.getmtime(f)) for f in log_files_with_paths]
-        recent_logs = sorted(log_files_with_mtime, key=lambda x: x[1], reverse=True)[:10]
-
-        output_lines = []
-        for file_path, _ in recent_logs:
-            try:
-                with open(file_path, "r") as f:
-                    first_line = f.readline().strip()
-                    output_lines.append(first_line)
-            except Exception as e:
-                print(f"Error reading {file_path}: {e}") # log and continue
+        recent_logs = recent_files(log_dir, k, pattern)
+        output_lines = read_first_lines(recent_logs)
 
         output_file = os.path.join(DATA_DIR, "logs-recent.txt")
         with open(output_file, "w") as outfile:
@@ -110,29 +94,23 @@ def write_recent_logs(log_dir: str):
         raise FileNotFoundError("logs directory not found")
 
 def create_markdown_index(docs_dir: str):
-    """Creates an index file mapping markdown filenames to their first H1 heading."""
-    index = {}
-    for filename in os.listdir(docs_dir):
-        if filename.endswith(".md"):
-            filepath = os.path.join(docs_dir, filename)
-            try:
-                with open(filepath, "r") as f:
-                    for line in f:
-                        if line.startswith("# "):
-                            title = line[2:].strip()
-                            index[filename] = title
-                            break  # Only take the first H1
-            except Exception as e:
-                print(f"Error processing {filename}: {e}") # Log and continue
-
+    """
+    Creates an index file mapping markdown files (paths relative to docs_dir, recursively)
+    to their first H1 heading. Unchanged files are skipped using a manifest next to the index.
+    """
     output_file = os.path.join(DATA_DIR, "docs", "index.json")
+    manifest_file = os.path.join(DATA_DIR, "docs", "index.manifest.json")
     # Ensure the output dir exists:
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
 
+    index, updates = build_markdown_index(docs_dir, manifest_file)
+    if not updates and os.path.exists(output_file):
+        return  # Nothing new since the last build
+
     with open(output_file, "w") as outfile:
         json.dump(index, outfile, indent=4)
 
-def extract_email_from_llm(email_file: str):
+async def extract_email_from_llm(email_file: str):
     """Extract email address from email message."""
     try:
         with open(email_file, "r") as f:
@@ -142,8 +120,7 @@ def extract_email_from_llm(email_file: str):
         {email_content}
         Return ONLY the email address.
         """
-        from agent import call_llm # avoid circular import
-        email_address = call_llm(prompt).strip() # get email from LLM
+        email_address = (await call_llm(prompt)).strip() # get email from LLM
         output_file = os.path.join(DATA_DIR, "email-sender.txt")
         with open(output_file, "w") as outfile:
             outfile.write(email_address)
@@ -151,25 +128,25 @@ def extract_email_from_llm(email_file: str):
     except FileNotFoundError:
         raise FileNotFoundError("email.txt not found")
 
-def extract_credit_card_from_llm(image_file: str):
-    """Extract credit card number from image using LLM."""
+async def extract_credit_card_from_llm(image_file: str):
+    """
+    Extract credit card number from image using LLM. The image is cropped, grayscaled
+    and shrunk first; a larger version is sent only if the answer fails the Luhn check.
+    """
     try:
-        install_package("Pillow") #Install pillow for image processing
-        from PIL import Image
-        image = Image.open(image_file)
-        # Convert the image to base64
-        import io
-        buffered = io.BytesIO()
-        image.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
-        prompt = f"""
-        Extract the credit card number from the following image in base64 format:
-        {img_str}
-        Return ONLY the credit card number without spaces.
-        """
-
-        from agent import call_llm
-        card_number = call_llm(prompt).strip().replace(" ", "") # get card number from LLM
+        await offload(ensure_package, "Pillow")  # May run uv pip install on a cold worker
+        prompt = "Extract the credit card number from this image. Return ONLY the credit card number without spaces."
+        card_number = ""
+        for width in CARD_IMAGE_WIDTHS:
+            max_bytes = int(CARD_IMAGE_MAX_BYTES * (width / CARD_IMAGE_WIDTHS[0]) ** 2)  # Budget scales with area
+            image = await offload(prepare_image, image_file, width, max_bytes)
+            request_bytes = len(llm_client.request_body(prompt, [image["url"]]))
+            print(f"Credit card request: {image['size'][0]}x{image['size'][1]} {image['mime_type']}, "
+                  f"{image['bytes']} image bytes, {request_bytes} request bytes")
+            card_number = re.sub(r"\D", "", await call_llm(prompt, images=[image["url"]]))  # get card number from LLM
+            if luhn_valid(card_number):
+                break
+            print(f"Card number {card_number!r} failed the Luhn check")  # Log and retry larger
         output_file = os.path.join(DATA_DIR, "credit-card.txt")
         with open(output_file, "w") as outfile:
             outfile.write(card_number)
@@ -180,28 +157,18 @@ def extract_credit_card_from_llm(image_file: str):
 def find_similar_comments(comments_file: str):
     """Finds the most similar pair of comments using embeddings."""
     try:
-        install_package("sentence-transformers")
-        from sentence_transformers import SentenceTransformer, util
-
+        ensure_package("sentence-transformers")
         with open(comments_file, "r") as f:
             comments = [line.strip() for line in f]
 
-        model = SentenceTransformer('all-MiniLM-L6-v2')  # Or another suitable model
-        embeddings = model.encode(comments, convert_to_tensor=True)
-
-        # Compute cosine similarity between all pairs
-        cosine_scores = util.cos_sim(embeddings, embeddings)
+        with model_registry.use(SENTENCE_MODEL) as model:  # Loaded once per process
+            # Only lines that are not in the embedding cache yet get encoded
+            embeddings = embedding_cache.encode(
+                SENTENCE_MODEL, comments, lambda texts: model.encode(texts, convert_to_numpy=True)
+            )
 
-        # Find the pair with the highest similarity (excluding self-similarity)
-        max_score = -1
-        comment1_idx, comment2_idx = -1, -1
-
-        for i in range(len(comments)):
-            for j in range(i + 1, len(comments)):
-                score = cosine_scores[i][j]
-                if score > max_score:
-                    max_score = score
-                    comment1_idx, comment2_idx = i, j
+        # Find the pair with the highest cosine similarity (excluding self-similarity)
+        comment1_idx, comment2_idx, _ = most_similar_pair(embeddings)
 
         output_file = os.path.join(DATA_DIR, "comments-similar.txt")
         with open(output_file, "w") as outfile:
@@ -214,91 +181,124 @@ def find_similar_comments(comments_file: str):
 def calculate_gold_ticket_sales(db_file: str):
     """Calculates the total sales of "Gold" tickets from the SQLite database."""
     try:
-        conn = sqlite3.connect(db_file)
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT SUM(units * price) FROM tickets WHERE type = 'Gold'")
-        result = cursor.fetchone()[0]  # Get the sum
-
-        conn.close()
+        totals = aggregate_totals(db_file, "tickets", "units * price", "type", ["Gold"])
 
         output_file = os.path.join(DATA_DIR, "ticket-sales-gold.txt")
         with open(output_file, "w") as outfile:
-            outfile.write(str(result or 0))  # Write 0 if result is None
+            outfile.write(str(totals["Gold"] or 0))  # Write 0 if result is None
 
     except FileNotFoundError:
         raise FileNotFoundError("ticket-sales.db not found")
     except sqlite3.Error as e:
         raise Exception(f"Database error: {e}")
 
+def aggregate_by_filter(db_file: str, table: str, value_expr: str, filter_column: str, filter_values: list,
+                        output_file: str, aggregate: str = "SUM", create_index: bool = False):
+    """
+    Aggregates value_expr per filter value of a SQLite table column in one pass and writes
+    {value: total} as JSON, e.g. SUM(units * price) of tickets for Gold, Silver and Bronze.
+    """
+    try:
+        totals = aggregate_totals(db_file, table, value_expr, filter_column, filter_values, aggregate, create_index)
+        with open(output_file, "w") as outfile:
+            json.dump(totals, outfile, indent=4)
+
+    except FileNotFoundError:
+        raise FileNotFoundError("Database file not found")
+    except sqlite3.Error as e:
+        raise Exception(f"Database error: {e}")
+
 # Phase B Tasks
 def fetch_data_from_api(api_url: str, output_file: str):
-    """Fetches data from an API and saves it to a file."""
+    """Fetches data from an API and saves it to a file, reusing a cached copy while it is fresh or unchanged."""
     try:
-        response = requests.get(api_url)
-        response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
-        with open(output_file, "w") as f:
-            f.write(response.text)
+        return fetch_to_file(api_url, output_file)
     except requests.exceptions.RequestException as e:
         raise Exception(f"API request failed: {e}")
 
-def clone_git_repo(repo_url: str, destination_dir: str):
-    """Clones a Git repository to the specified directory."""
+def clone_git_repo(repo_url: str, destination_dir: str, depth: int = None, branch: str = None,
+                   single_branch: bool = False, sparse_paths: list = None, blob_filter: str = None,
+                   use_mirror: bool = True):
+    """Clones a Git repository to the specified directory, from a local mirror cache when possible."""
     try:
-        git.Repo.clone_from(repo_url, destination_dir)
+        report = clone_repo(repo_url, destination_dir, depth, branch, single_branch, sparse_paths, blob_filter, use_mirror)
+        print(f"Cloned {repo_url} in {report['seconds']:.2f}s, saved {report['bytes_saved']} bytes "
+              f"and ~{report['seconds_saved']:.2f}s using the mirror")
+        return report
     except git.exc.GitCommandError as e:
         raise Exception(f"Git clone failed: {e}")
 
-def run_sql_query(db_file: str, query: str, output_file: str):
-    """Runs a SQL query on a SQLite database and saves the results to a file."""
+def run_sql_query(db_file: str, query: str, output_file: str, output_format: str = None):
+    """
+    Runs a read-only SQL query on a SQLite database and streams the results to a file
+    as CSV, JSON Lines or Arrow (by output_format or the output file's extension).
+    """
     try:
-        conn = sqlite3.connect(db_file)
-        cursor = conn.cursor()
-        cursor.execute(query)
-        results = cursor.fetchall()
-
-        with open(output_file, "w", newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([col[0] for col in cursor.description])  # Write header
-            writer.writerows(results)  # Write data
-
-        conn.close()
+        export_query(db_file, query, output_file, output_format)
+    except FileNotFoundError:
+        raise FileNotFoundError("Database file not found")
     except sqlite3.Error as e:
         raise Exception(f"Database error: {e}")
 
-def scrape_website(url: str, output_file: str):
-    """Scrapes data from a website and saves it to a file."""
+def scrape_website(url: str, output_file: str, parser: str = "html.parser", selector: str = None):
+    """
+    Scrapes text from a website and saves it to a file. parser may be "lxml" for speed;
+    selector limits the text to elements matching a CSS selector.
+    """
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
-        text = soup.get_text()  # Extract all text
+        fd, html_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_file)), suffix=".html")
+        os.close(fd)
+        try:
+            fetch_to_file(url, html_file)
+            text = extract_text(html_file, parser, selector)
+        finally:
+            os.remove(html_file)
         with open(output_file, "w") as f:
             f.write(text)
     except requests.exceptions.RequestException as e:
         raise Exception(f"Web scraping failed: {e}")
 
-def compress_resize_image(image_file: str, output_file: str, width: int = 200, height: int = 200):
-    """Compresses or resizes an image and saves it to a file."""
+def compress_resize_image(image_file: str, output_file: str, width: int = 200, height: int = 200,
+                          quality: int = 60, output_format: str = None):
+    """Compresses and shrinks an image to fit within width x height, keeping its aspect ratio."""
     try:
-        install_package("Pillow")  # Ensure Pillow is installed
-
-        image = Image.open(image_file)
-        image = image.resize((width, height))  # Resize
-        image.save(output_file, optimize=True, quality=60)  # Compress and save
+        ensure_package("Pillow")  # Ensure Pillow is installed
+        shrink_image(image_file, output_file, (width, height), output_format, quality)
 
     except FileNotFoundError:
         raise FileNotFoundError("Image file not found")
     except Exception as e:
         raise Exception(f"Image processing failed: {e}")
 
-def transcribe_audio(audio_file: str, output_file: str):
-    """Transcribes audio from an MP3 file and saves the text to a file."""
+def compress_resize_images(source: str, output_dir: str, max_dimension: int = 200, output_format: str = None,
+                           quality: int = 60):
+    """Compresses and shrinks every image in a directory or glob into output_dir, skipping up-to-date outputs."""
+    try:
+        ensure_package("Pillow")
+        report = batch_shrink_images(source, output_dir, max_dimension, output_format, quality)
+        print(
+            f"Images: {report['processed']} processed, {report['skipped']} up to date, {report['failed']} failed, "
+            f"{report['images_per_second']:.1f} images/s, {report['bytes_saved']} bytes saved"
+        )
+        return report
+
+    except Exception as e:
+        raise Exception(f"Image processing failed: {e}")
+
+def transcribe_audio(audio_file: str, output_file: str, chunked: bool = False, timestamps: bool = False):
+    """
+    Transcribes audio from an MP3 file and saves the text to a file. In chunked mode the
+    audio is split on silence and transcribed in parallel, writing the text as it is ready.
+    """
     try:
-        install_package("openai-whisper")
-        import whisper
-        model = whisper.load_model("tiny")  # Use a smaller model
-        result = model.transcribe(audio_file)
+        ensure_package("openai-whisper")
+        if chunked:
+            report = transcribe_chunked(audio_file, output_file, timestamps)
+            print(f"Transcribed {report['audio_seconds']:.0f}s of audio in {report['chunks']} chunks, "
+                  f"{report['realtime_factor']:.1f}x real time")
+            return
+        with model_registry.use(WHISPER_MODEL) as model:  # Loaded once per process
+            result = model.transcribe(audio_file)
         with open(output_file, "w") as f:
             f.write(result["text"])
 
@@ -308,11 +308,10 @@ def transcribe_audio(audio_file: str, output_file: str):
 def convert_markdown_to_html(markdown_file: str, output_file: str):
     """Converts Markdown to HTML and saves it to a file."""
     try:
-        install_package("markdown")
-        import markdown
+        ensure_package("markdown")
         with open(markdown_file, "r") as f:
             markdown_text = f.read()
-        html = markdown.markdown(markdown_text)
+        html = markdown_to_html(markdown_text)  # Reuses one converter per process
         with open(output_file, "w") as f:
             f.write(html)
     except FileNotFoundError:
@@ -320,22 +319,42 @@ def convert_markdown_to_html(markdown_file: str, output_file: str):
     except Exception as e:
         raise Exception(f"Markdown conversion failed: {e}")
 
-def create_api_endpoint(csv_file: str, output_file: str):
-    """Creates an API endpoint that filters a CSV file and returns JSON data (placeholder)."""
-    print("Placeholder: Creating API endpoint...") # This is not fully implemented
-    # This task is very complex and out of the scope for this project.
-    # The "output_file" could contain instructions on how to create such an API.
-
+def convert_markdown_dir(source_dir: str, output_dir: str, extensions: list = None):
+    """Converts every Markdown file under source_dir to HTML, skipping files unchanged since the last build."""
     try:
-      with open(csv_file, 'r') as file:
-        csv_data = list(csv.reader(file))
-
-      # Convert CSV data to JSON format
-      json_data = json.dumps(csv_data, indent=4)
-
-      # Write the JSON data to the output file
-      with open(output_file, 'w') as file:
-          file.write(json_data)
+        ensure_package("markdown")
+        report = build_html(source_dir, output_dir, extensions)
+        print(f"Markdown: {report['converted']} converted, {report['skipped']} unchanged, {report['failed']} failed, "
+              f"{report['files_per_second']:.0f} files/s")
+        return report
+    except Exception as e:
+        raise Exception(f"Markdown conversion failed: {e}")
 
+def create_api_endpoint(csv_file: str, output_file: str, name: str = None):
+    """
+    Serves a CSV file as a queryable API at GET /datasets/{name}, backed by an indexed
+    SQLite copy of the file, and writes the endpoint's description to output_file.
+    """
+    try:
+        if not is_within_data_dir(csv_file):
+            raise ValueError("CSV file must be within /data/")
+        name = name or re.sub(r"[^A-Za-z0-9_-]", "_", os.path.splitext(os.path.basename(csv_file))[0])
+        dataset = dataset_registry.register(name, csv_file)
+        description = {
+            "endpoint": f"/datasets/{name}",
+            "columns": dataset.columns,
+            "parameters": {
+                "<column>[__eq|__ne|__gt|__gte|__lt|__lte|__contains]": "filter rows",
+                "fields": "comma-separated columns to return",
+                "sort": "comma-separated columns, prefix with - for descending",
+                "limit": f"rows per page, at most {DATASET_MAX_LIMIT}",
+                "offset": "rows to skip",
+            },
+        }
+        with open(output_file, "w") as file:
+            json.dump(description, file, indent=4)
+
+    except ValueError:
+        raise
     except Exception as e:
-        raise Exception(f"Unable to Create API Endpoint: {e}")
\ No newline at end of file
+        raise Exception(f"Unable to Create API Endpoint: {e}")
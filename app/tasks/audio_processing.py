@@ -0,0 +1,193 @@
+# app/tasks/audio_processing.py
+import os
+import time
+import tempfile
+import subprocess
+from concurrent.futures import wait, FIRST_COMPLETED
+
+# Constants
+AUDIO_WORKERS = int(os.environ.get("AUDIO_WORKERS", str(os.cpu_count() or 2)))
+CHUNK_MAX_SECONDS = float(os.environ.get("CHUNK_MAX_SECONDS", "30"))  # Whisper's own window size
+SILENCE_MIN_MS = 700  # Pauses at least this long may split the audio
+SILENCE_OFFSET_DB = 16  # Quieter than the file's average loudness by this much counts as silence
+CHUNK_PAD_MS = 200  # Kept around speech so words at the edges are not clipped
+SAMPLE_RATE = 16000  # What whisper expects
+BYTES_PER_MS = SAMPLE_RATE * 2 // 1000  # 16-bit mono PCM
+FRAME_MS = 10  # Loudness resolution of the silence detector
+DECODE_BLOCK_MS = 10_000  # PCM read from the decoder at a time
+
+
+def decode_audio(audio_file: str, pcm_file: str):
+    """
+    Streams an audio file through ffmpeg as 16 kHz mono 16-bit PCM into pcm_file, one
+    block at a time, and returns the mean square level of every FRAME_MS frame. Only a
+    block of samples is held in memory, however long the recording is.
+    """
+    import numpy as np
+    frame_bytes = FRAME_MS * BYTES_PER_MS
+    command = [
+        "ffmpeg", "-nostdin", "-v", "error", "-i", audio_file, "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-",
+    ]
+    levels, pending = [], b""
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process, open(pcm_file, "wb") as out:
+        while True:
+            block = process.stdout.read(DECODE_BLOCK_MS * BYTES_PER_MS)
+            if not block:
+                break
+            out.write(block)
+            data = pending + block
+            whole = len(data) - len(data) % frame_bytes
+            frames = np.frombuffer(data[:whole], dtype="<i2").astype(np.float32).reshape(-1, frame_bytes // 2)
+            levels.append((frames ** 2).mean(axis=1))
+            pending = data[whole:]
+        errors = process.stderr.read().decode("utf-8", errors="replace").strip()
+    if process.returncode:
+        raise Exception(f"ffmpeg could not decode {audio_file}: {errors}")
+    if len(pending) >= 2:
+        tail = np.frombuffer(pending[:len(pending) - len(pending) % 2], dtype="<i2").astype(np.float32)
+        levels.append([(tail ** 2).mean()])
+    return np.concatenate(levels) if levels else np.zeros(0, dtype=np.float32)
+
+
+def nonsilent_ranges(levels, min_silence_ms: int = SILENCE_MIN_MS, offset_db: float = SILENCE_OFFSET_DB) -> list:
+    """
+    Returns [start, end] millisecond ranges between silences of at least min_silence_ms,
+    where silence is offset_db quieter than the recording's average loudness.
+    """
+    import numpy as np
+    average = float(np.mean(levels)) if len(levels) else 0.0
+    if average <= 0:
+        return []  # Empty or digitally silent
+    silent = levels < average * 10 ** (-offset_db / 10)
+    min_frames = max(1, min_silence_ms // FRAME_MS)
+    boundaries = [0, *(np.flatnonzero(np.diff(silent.astype(np.int8))) + 1), len(silent)]
+    ranges, speech_start = [], None
+    for run_start, run_end in zip(boundaries, boundaries[1:]):
+        if silent[run_start] and run_end - run_start >= min_frames:
+            if speech_start is not None:
+                ranges.append([speech_start * FRAME_MS, int(run_start) * FRAME_MS])
+                speech_start = None
+        elif not silent[run_start] and speech_start is None:
+            speech_start = int(run_start)
+    if speech_start is not None:
+        ranges.append([speech_start * FRAME_MS, len(silent) * FRAME_MS])
+    return ranges
+
+
+def plan_chunks(ranges: list, total_ms: int, max_ms: int, pad_ms: int = CHUNK_PAD_MS) -> list:
+    """
+    Groups non-silent [start, end] millisecond ranges into chunks of at most max_ms,
+    cutting only in silences except when a single stretch of speech is longer than max_ms.
+    """
+    chunks = []
+    for start, end in ranges:
+        start, end = max(0, start - pad_ms), min(total_ms, end + pad_ms)
+        if chunks and end - chunks[-1][0] <= max_ms:
+            chunks[-1][1] = max(chunks[-1][1], end)
+            continue
+        while end - start > max_ms:
+            chunks.append([start, start + max_ms])
+            start += max_ms
+        chunks.append([start, end])
+    return chunks
+
+
+def _samples(pcm_file: str, start_ms: int, end_ms: int):
+    import numpy as np
+    with open(pcm_file, "rb") as f:
+        f.seek(start_ms * BYTES_PER_MS)
+        data = f.read((end_ms - start_ms) * BYTES_PER_MS)
+    return np.frombuffer(data[:len(data) - len(data) % 2], dtype="<i2").astype(np.float32) / 32768.0
+
+
+def _transcribe_chunk(samples, offset: float) -> list:
+    # Runs in a worker process; the registry keeps one loaded model per process.
+    from model_registry import model_registry, WHISPER_MODEL
+    with model_registry.use(WHISPER_MODEL) as model:
+        result = model.transcribe(samples)
+    return [
+        {"start": segment["start"] + offset, "end": segment["end"] + offset, "text": segment["text"]}
+        for segment in result["segments"]
+    ]
+
+
+def _timestamp(seconds: float) -> str:
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}"
+
+
+def _format_segments(segments: list, timestamps: bool) -> str:
+    if timestamps:
+        return "".join(f"[{_timestamp(s['start'])} --> {_timestamp(s['end'])}] {s['text'].strip()}\n" for s in segments)
+    return "".join(segment["text"] for segment in segments)
+
+
+def transcribe_chunked(audio_file: str, output_file: str, timestamps: bool = False, workers: int = AUDIO_WORKERS,
+                       max_seconds: float = CHUNK_MAX_SECONDS) -> dict:
+    """
+    Splits audio on silence and transcribes the chunks in parallel worker processes.
+    The audio is decoded once into a temporary PCM file, so only frame levels and the
+    chunks in flight are held in memory. Segment timestamps are shifted back to positions
+    in the whole file, and finished chunks are appended to output_file in order as soon
+    as all earlier ones are done.
+    Returns chunk count, audio and wall-clock seconds, and the stitched segments.
+    """
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="audio-") as tmp_dir:
+        pcm_file = os.path.join(tmp_dir, "audio.pcm")
+        levels = decode_audio(audio_file, pcm_file)
+        total_ms = os.path.getsize(pcm_file) // BYTES_PER_MS
+        chunks = plan_chunks(nonsilent_ranges(levels), total_ms, int(max_seconds * 1000))
+        segments = _transcribe_chunks(pcm_file, chunks, output_file, timestamps, workers)
+
+    audio_seconds = total_ms / 1000
+    seconds = time.perf_counter() - start
+    return {
+        "chunks": len(chunks),
+        "audio_seconds": audio_seconds,
+        "seconds": seconds,
+        "realtime_factor": audio_seconds / seconds if seconds else 0.0,
+        "segments": segments,
+    }
+
+
+def _transcribe_chunks(pcm_file: str, chunks: list, output_file: str, timestamps: bool, workers: int) -> list:
+    # Chunk samples are read from the PCM file only when the chunk is submitted.
+    finished = {}
+    segments = []
+    with open(output_file, "w") as f:
+        next_chunk = 0
+
+        def flush():
+            nonlocal next_chunk
+            while next_chunk in finished:
+                chunk_segments = finished.pop(next_chunk)
+                segments.extend(chunk_segments)
+                f.write(_format_segments(chunk_segments, timestamps))
+                f.flush()  # Readers can follow the transcript while later chunks run
+                next_chunk += 1
+
+        if workers <= 1 or len(chunks) <= 1:
+            for index, (chunk_start, chunk_end) in enumerate(chunks):
+                finished[index] = _transcribe_chunk(_samples(pcm_file, chunk_start, chunk_end), chunk_start / 1000)
+                flush()
+        else:
+            from executors import process_pool
+            with process_pool(min(workers, len(chunks))) as pool:
+                pending = {}
+                queued = iter(enumerate(chunks))
+                while True:
+                    # Only a couple of chunks per worker are read and in flight at once.
+                    for index, (chunk_start, chunk_end) in queued:
+                        samples = _samples(pcm_file, chunk_start, chunk_end)
+                        pending[pool.submit(_transcribe_chunk, samples, chunk_start / 1000)] = index
+                        if len(pending) >= workers * 2:
+                            break
+                    if not pending:
+                        break
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finished[pending.pop(future)] = future.result()
+                    flush()
+    return segments
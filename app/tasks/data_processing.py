@@ -0,0 +1,364 @@
+# app/tasks/data_processing.py
+import os
+import json
+import heapq
+import shutil
+import tempfile
+from datetime import date, datetime
+from itertools import islice
+import numpy as np
+
+# Constants
+SIMILARITY_DENSE_LIMIT = int(os.environ.get("SIMILARITY_DENSE_LIMIT", "4096"))  # Max N for the full N x N matrix
+SIMILARITY_BLOCK_SIZE = int(os.environ.get("SIMILARITY_BLOCK_SIZE", "2048"))  # Tile edge for the blockwise search
+
+
+def normalize_rows(embeddings) -> np.ndarray:
+    """Returns float32 unit-length rows so that dot products are cosine similarities."""
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1  # Leave all-zero rows as they are
+    return vectors / norms
+
+
+def most_similar_pair(embeddings, dense_limit: int = SIMILARITY_DENSE_LIMIT, block_size: int = SIMILARITY_BLOCK_SIZE):
+    """
+    Returns (i, j, score) with i < j for the most cosine-similar pair of rows.
+    Small inputs use one vectorized argmax over the upper triangle; larger inputs
+    are tiled so that at most block_size x block_size scores exist at a time.
+    Ties resolve to the smallest (i, j), matching a row-major scan.
+    """
+    vectors = normalize_rows(embeddings)
+    n = len(vectors)
+    if n < 2:
+        raise ValueError("At least two embeddings are needed to find a similar pair.")
+    if n <= dense_limit:
+        return _dense_most_similar_pair(vectors)
+    return _blockwise_most_similar_pair(vectors, block_size)
+
+
+def _dense_most_similar_pair(vectors: np.ndarray):
+    n = len(vectors)
+    scores = vectors @ vectors.T
+    scores[np.tri(n, dtype=bool)] = -np.inf  # Mask the diagonal and lower triangle
+    i, j = divmod(int(np.argmax(scores)), n)
+    return i, j, float(scores[i, j])
+
+
+def _blockwise_most_similar_pair(vectors: np.ndarray, block_size: int):
+    n = len(vectors)
+    best_score, best_i, best_j = -np.inf, n, n
+    for row_start in range(0, n, block_size):
+        rows = vectors[row_start:row_start + block_size]
+        for col_start in range(row_start, n, block_size):  # Upper-triangle tiles only
+            block = rows @ vectors[col_start:col_start + block_size].T
+            if col_start == row_start:
+                block[np.tri(*block.shape, dtype=bool)] = -np.inf
+            bi, bj = divmod(int(np.argmax(block)), block.shape[1])
+            score = float(block[bi, bj])
+            i, j = row_start + bi, col_start + bj
+            if score > best_score or (score == best_score and score != -np.inf and (i, j) < (best_i, best_j)):
+                best_score, best_i, best_j = score, i, j
+    return best_i, best_j, best_score
+
+
+# Date analytics
+
+DATE_BATCH_LINES = int(os.environ.get("DATE_BATCH_LINES", "65536"))  # Lines parsed per batch
+
+# The formats app/datagen.py emits, most common first.
+DATE_FORMATS = ["%Y-%m-%d", "%d-%b-%Y", "%b %d, %Y", "%Y/%m/%d %H:%M:%S"]
+
+_MONTHS = {name.encode(): number for number, name in enumerate(  # Lowercase; %b ignores case
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Maps every digit to b"9" and every ASCII letter to b"a", so "14-Mar-2024" has the shape "99-aaa-9999".
+_SHAPE_TABLE = bytes(
+    ord("9") if chr(byte).isdigit() else ord("a") if chr(byte).isalpha() else byte for byte in range(256)
+)
+
+
+# Column layouts of the fixed-width shapes, parsed for a whole batch at once with numpy.
+# Lines of any other shape are matched against DATE_FORMATS with strptime.
+_SHAPE_LAYOUTS = {
+    b"9999-99-99": ("%Y-%m-%d", {"year": (0, 4), "month": (5, 7), "day": (8, 10)}),
+    b"99-aaa-9999": ("%d-%b-%Y", {"year": (7, 11), "month_name": (3, 6), "day": (0, 2)}),
+    b"aaa 99, 9999": ("%b %d, %Y", {"year": (8, 12), "month_name": (0, 3), "day": (4, 6)}),
+    b"9999/99/99 99:99:99": (
+        "%Y/%m/%d %H:%M:%S",
+        {"year": (0, 4), "month": (5, 7), "day": (8, 10), "time": (11, 14, 17)},
+    ),
+}
+_MONTH_KEYS = np.array([int.from_bytes(name, "big") for name in _MONTHS], dtype=np.int64)
+_MONTH_NUMBERS = np.array(list(_MONTHS.values()), dtype=np.int64)
+
+
+def _columns_to_int(chars: np.ndarray, start: int, end: int) -> np.ndarray:
+    digits = chars[:, start:end].astype(np.int64) - ord("0")
+    return digits @ (10 ** np.arange(end - start - 1, -1, -1, dtype=np.int64))
+
+
+def _vectorized_days(lines: list, layout: dict):
+    """Returns (days since epoch, valid mask) for same-shape lines."""
+    chars = np.array(lines).view(np.uint8).reshape(len(lines), -1)
+    years = _columns_to_int(chars, *layout["year"])
+    days_of_month = _columns_to_int(chars, *layout["day"])
+    valid = np.ones(len(lines), dtype=bool)
+    if "month_name" in layout:
+        start, end = layout["month_name"]
+        name = chars[:, start:end].astype(np.int64) | 0x20  # Lowercases the ASCII letters the shape guarantees
+        keys = name[:, 0] << 16 | name[:, 1] << 8 | name[:, 2]  # Same packing as _MONTH_KEYS
+        matches = keys[:, None] == _MONTH_KEYS[None, :]
+        valid &= matches.any(axis=1)
+        months = _MONTH_NUMBERS[matches.argmax(axis=1)]
+    else:
+        months = _columns_to_int(chars, *layout["month"])
+        valid &= (months >= 1) & (months <= 12)
+    if "time" in layout:
+        hour, minute, second = (_columns_to_int(chars, start, start + 2) for start in layout["time"])
+        valid &= (hour < 24) & (minute < 60) & (second < 60)
+
+    month_index = (years - 1970) * 12 + np.clip(months, 1, 12) - 1
+    month_start = month_index.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    month_length = (month_index + 1).astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) - month_start
+    valid &= (days_of_month >= 1) & (days_of_month <= month_length)
+    return month_start + days_of_month - 1, valid
+
+
+class DateParser:
+    """
+    Parses date lines in any of DATE_FORMATS. Each line's format is guessed from
+    its shape and the guess is memoized per shape, so strptime probing happens
+    once per unseen shape. Known fixed-width shapes are parsed a batch at a time.
+    """
+
+    def __init__(self, formats: list = DATE_FORMATS):
+        self.formats = formats
+        self.format_counts = {fmt: 0 for fmt in formats}
+        self._shapes = {shape: entry for shape, entry in _SHAPE_LAYOUTS.items() if entry[0] in formats}
+
+    def _detect(self, lines: list, shape: bytes):
+        for line in lines[:8]:  # A few samples, in case the first line is an invalid date
+            for fmt in self.formats:
+                try:
+                    datetime.strptime(line.decode(), fmt)
+                except (ValueError, UnicodeDecodeError):
+                    continue
+                self._shapes[shape] = (fmt, None)
+                return self._shapes[shape]
+        return None
+
+    def to_days(self, lines: list) -> np.ndarray:
+        """Returns days since 1970-01-01 for each parseable line; unparseable lines are dropped."""
+        groups = {}
+        for line in lines:
+            line = line.strip()
+            groups.setdefault(line.translate(_SHAPE_TABLE), []).append(line)
+
+        parsed = []
+        for shape, group in groups.items():
+            entry = self._shapes.get(shape) or self._detect(group, shape)
+            if entry is None:
+                continue  # Not a date in any known format
+            fmt, layout = entry
+            if layout is not None:
+                days, valid = _vectorized_days(group, layout)
+                days = days[valid]
+            else:
+                days = [self._strptime_days(line, fmt) for line in group]
+                days = np.array([value for value in days if value is not None], dtype=np.int64)
+            self.format_counts[fmt] += len(days)
+            parsed.append(days)
+        return np.concatenate(parsed) if parsed else np.empty(0, dtype=np.int64)
+
+    @staticmethod
+    def _strptime_days(line: bytes, fmt: str):
+        try:
+            return datetime.strptime(line.decode(), fmt).date().toordinal() - _EPOCH_ORDINAL
+        except (ValueError, UnicodeDecodeError):
+            return None
+
+
+def _to_days(value) -> int:
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return value.toordinal() - _EPOCH_ORDINAL
+
+
+def analyze_dates(file_path: str, ranges: list = None, batch_lines: int = DATE_BATCH_LINES) -> dict:
+    """
+    Streams a file of dates in one pass and constant memory, returning:
+      weekdays: counts Monday..Sunday
+      months: counts January..December
+      ranges: counts per inclusive (start, end) pair of ISO strings or dates
+      total / invalid: non-blank lines seen and lines that did not parse
+      formats: lines parsed per format
+    """
+    parser = DateParser()
+    ranges = [(_to_days(start), _to_days(end)) for start, end in ranges or []]
+    weekdays = np.zeros(7, dtype=np.int64)
+    months = np.zeros(12, dtype=np.int64)
+    range_counts = [0] * len(ranges)
+    total = parsed = 0
+
+    with open(file_path, "rb") as f:
+        while True:
+            batch = list(islice(f, batch_lines))
+            if not batch:
+                break
+            lines = [line for line in batch if line.strip()]
+            total += len(lines)
+            days = parser.to_days(lines)
+            parsed += len(days)
+            weekdays += np.bincount((days + 3) % 7, minlength=7)  # 1970-01-01 was a Thursday
+            months += np.bincount(days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) % 12, minlength=12)
+            for index, (start, end) in enumerate(ranges):
+                range_counts[index] += int(np.count_nonzero((days >= start) & (days <= end)))
+
+    return {
+        "total": total,
+        "invalid": total - parsed,
+        "weekdays": weekdays.tolist(),
+        "months": months.tolist(),
+        "ranges": range_counts,
+        "formats": parser.format_counts,
+    }
+
+
+# Out-of-core JSON array sort
+
+SORT_MEMORY_BUDGET_MB = float(os.environ.get("SORT_MEMORY_BUDGET_MB", "256"))
+_OBJECT_OVERHEAD = 6  # Rough ratio of Python object memory to raw JSON bytes for small dicts
+_JSON_READ_CHUNK = 1024 * 1024
+
+
+def _iter_json_array(f):
+    """
+    Yields (element, raw size in characters) for each element of the top-level
+    JSON array in a text file, reading it in chunks instead of all at once.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = f.read(_JSON_READ_CHUNK)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk  # Drop consumed text so the buffer stays about one chunk long
+        pos = 0
+
+    def skip(chars: str):
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    fill()
+    skip(" \t\r\n")
+    if buffer[pos:pos + 1] != "[":
+        raise ValueError("Expected a JSON array.")
+    pos += 1
+    while True:
+        skip(" \t\r\n,")
+        if pos >= len(buffer):
+            raise ValueError("Unterminated JSON array.")
+        if buffer[pos] == "]":
+            return
+        try:
+            element, end = decoder.raw_decode(buffer, pos)
+            if end == len(buffer) and not eof:
+                raise json.JSONDecodeError("Element may continue in the next chunk", buffer, end)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        yield element, end - pos
+        pos = end
+
+
+def _field_key(value) -> tuple:
+    # Missing or null fields sort last; otherwise numbers, then strings, then anything else
+    # (as JSON), so mixed types never raise on comparison and falsy values keep their place.
+    if value is None:
+        return (1, 0, 0)
+    if isinstance(value, (int, float)):
+        return (0, 0, value)
+    if isinstance(value, str):
+        return (0, 1, value)
+    return (0, 2, json.dumps(value, sort_keys=True))
+
+
+def _sort_key(keys: tuple):
+    def key(element):
+        return tuple(_field_key(element.get(name)) for name in keys)
+    return key
+
+
+def _write_json_array(elements, output_file: str, indent: int = None):
+    if indent is not None:  # Pretty-printing needs the whole list, which only the in-memory path has
+        with open(output_file, "w") as outfile:
+            json.dump(elements, outfile, indent=indent)
+        return
+    with open(output_file, "w") as outfile:
+        outfile.write("[")
+        for index, element in enumerate(elements):
+            if index:
+                outfile.write(",")
+            outfile.write(json.dumps(element, separators=(",", ":")))
+        outfile.write("]")
+
+
+def _iter_run(path: str):
+    with open(path, "r") as run:
+        for line in run:
+            yield json.loads(line)
+
+
+def external_sort_json_array(input_file: str, output_file: str, keys: tuple, memory_budget_mb: float = SORT_MEMORY_BUDGET_MB,
+                             tmp_dir: str = None, indent: int = None) -> int:
+    """
+    Stably sorts the objects of a JSON array file by the given fields using bounded memory.
+    Sorted runs that fill the memory budget are spilled as JSON lines to a temporary directory
+    (under tmp_dir) and combined with a k-way merge into compact JSON. Inputs that fit the
+    budget are sorted in memory and written with indent, if given. Returns the number of runs.
+    """
+    key = _sort_key(tuple(keys))
+    budget = memory_budget_mb * 1024 * 1024
+    spill_dir = None
+    runs, batch, batch_size = [], [], 0
+    try:
+        with open(input_file, "r") as f:
+            for element, size in _iter_json_array(f):
+                batch.append(element)
+                batch_size += size * _OBJECT_OVERHEAD
+                if batch_size >= budget:
+                    spill_dir = spill_dir or tempfile.mkdtemp(prefix="sort-", dir=tmp_dir)
+                    runs.append(_spill_run(sorted(batch, key=key), spill_dir, len(runs)))
+                    batch, batch_size = [], 0
+
+        batch.sort(key=key)
+        if not runs:
+            _write_json_array(batch, output_file, indent)  # Everything fit in memory
+            return 1
+        if batch:
+            runs.append(_spill_run(batch, spill_dir, len(runs)))
+        batch = None
+        # heapq.merge takes ties from earlier runs first, so the merge stays stable.
+        _write_json_array(heapq.merge(*(_iter_run(run) for run in runs), key=key), output_file)
+        return len(runs)
+    finally:
+        if spill_dir:
+            shutil.rmtree(spill_dir, ignore_errors=True)  # Our own spill files only
+
+
+def _spill_run(elements: list, spill_dir: str, number: int) -> str:
+    path = os.path.join(spill_dir, f"run-{number:05d}.jsonl")
+    with open(path, "w") as run:
+        for element in elements:
+            run.write(json.dumps(element, separators=(",", ":")) + "\n")
+    return path
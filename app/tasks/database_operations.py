@@ -0,0 +1,319 @@
+# app/tasks/database_operations.py
+import os
+import re
+import csv
+import json
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import quote
+from dependency_manager import ensure_package
+
+# Constants
+SQLITE_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", "4"))  # Idle connections kept per database
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # Bytes
+SQLITE_CACHE_KB = int(os.environ.get("SQLITE_CACHE_KB", str(64 * 1024)))  # Page cache per connection
+SQLITE_STATEMENT_CACHE = 256  # Prepared statements kept per connection
+SQL_FETCH_BATCH = int(os.environ.get("SQL_FETCH_BATCH", "10000"))  # Rows per fetchmany
+
+AGGREGATE_CACHE_SIZE = int(os.environ.get("AGGREGATE_CACHE_SIZE", "256"))
+
+OUTPUT_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".arrow": "arrow", ".feather": "arrow"}
+
+
+class ConnectionPool:
+    """
+    Small per-database pool of read-only SQLite connections. Reusing connections
+    keeps their page cache, memory map and prepared statement cache warm.
+    """
+
+    def __init__(self, size: int = SQLITE_POOL_SIZE):
+        self.size = size
+        self._idle = {}  # realpath -> (inode, [connections])
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"file:{quote(path)}?mode=ro",
+            uri=True,
+            check_same_thread=False,  # Connections move between worker threads, one at a time
+            cached_statements=SQLITE_STATEMENT_CACHE,
+        )
+        conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_KB}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    @contextmanager
+    def connection(self, db_file: str):
+        """Yields a read-only connection to db_file and returns it to the pool afterwards."""
+        path = os.path.realpath(db_file)
+        inode = os.stat(path).st_ino  # Raises FileNotFoundError for missing databases
+        with self._lock:
+            pooled_inode, idle = self._idle.get(path, (inode, []))
+            if pooled_inode != inode:  # The file was replaced; pooled connections see the old one
+                for stale in idle:
+                    stale.close()
+                idle = []
+            self._idle[path] = (inode, idle)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            conn = self._open(path)
+
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                pooled_inode, idle = self._idle.get(path, (inode, []))
+                if pooled_inode == inode and len(idle) < self.size and not conn.in_transaction:
+                    idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def close_all(self):
+        """Closes every idle connection."""
+        with self._lock:
+            for _, idle in self._idle.values():
+                for conn in idle:
+                    conn.close()
+            self._idle.clear()
+
+
+connection_pool = ConnectionPool()
+
+
+def _write_csv(cursor, columns: list, f, batch_size: int) -> int:
+    writer = csv.writer(f)
+    writer.writerow(columns)  # Write header
+    count = 0
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return count
+        writer.writerows(rows)
+        count += len(rows)
+
+
+def _write_jsonl(cursor, columns: list, f, batch_size: int) -> int:
+    count = 0
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return count
+        f.writelines(
+            json.dumps(dict(zip(columns, row)), default=lambda value: value.hex()) + "\n" for row in rows
+        )  # BLOBs are written as hex
+        count += len(rows)
+
+
+def _to_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    return value.hex() if isinstance(value, bytes) else str(value)  # BLOBs are written as hex, as in jsonl
+
+
+def _batch_arrays(pa, values: list) -> list:
+    # SQLite columns are dynamically typed; a column mixing text, numbers or BLOBs becomes text.
+    arrays = []
+    for column in values:
+        try:
+            arrays.append(pa.array(column))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+            arrays.append(pa.array([_to_text(value) for value in column], type=pa.string()))
+    return arrays
+
+
+def _widen(pa, current, new):
+    """
+    Returns a type that holds values of both: NULL takes the other type, INTEGER and REAL
+    give float64, anything else string. Integers already widened to float64 read as "1.0"
+    if the column later widens to string.
+    """
+    if current == new or pa.types.is_null(new):
+        return current
+    if pa.types.is_null(current):
+        return new
+    if {current, new} == {pa.int64(), pa.float64()}:
+        return pa.float64()
+    return pa.string()
+
+
+def _conform(pa, array, target):
+    if array.type == target:
+        return array
+    if target == pa.string():
+        return pa.array([_to_text(value) for value in array.to_pylist()], type=pa.string())
+    return array.cast(target)  # null -> anything, int64 -> float64
+
+
+def _rewrite_arrow(pa, path: str, schema):
+    # Copies the batches written so far into a new file with the widened schema. Each
+    # column widens at most twice (null -> number -> string), so this happens rarely.
+    old_path = path + ".old"
+    os.replace(path, old_path)
+    writer = pa.ipc.new_file(path, schema)
+    try:
+        with pa.memory_map(old_path) as source:
+            reader = pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                batch = reader.get_batch(index)
+                arrays = [_conform(pa, column, field.type) for column, field in zip(batch.columns, schema)]
+                writer.write_batch(pa.record_batch(arrays, schema=schema))
+    except BaseException:
+        writer.close()
+        raise
+    finally:
+        os.remove(old_path)
+    return writer
+
+
+def _write_arrow(cursor, columns: list, output_file: str, batch_size: int) -> int:
+    ensure_package("pyarrow")
+    import pyarrow as pa
+
+    # Written to a temporary file first, so a failed export never leaves a truncated file behind.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_file)), suffix=".arrow.tmp")
+    os.close(fd)
+    count, schema, writer = 0, None, None
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            arrays = _batch_arrays(pa, list(zip(*rows)))  # Row batch -> columns
+            if schema is None:
+                # The first batch sets the schema; later batches only widen it when they disagree.
+                schema = pa.schema([pa.field(name, array.type) for name, array in zip(columns, arrays)])
+                writer = pa.ipc.new_file(tmp_path, schema)
+            else:
+                widened = pa.schema([pa.field(field.name, _widen(pa, field.type, array.type))
+                                     for field, array in zip(schema, arrays)])
+                if not widened.equals(schema):
+                    writer.close()
+                    writer = None
+                    writer = _rewrite_arrow(pa, tmp_path, widened)
+                    schema = widened
+            arrays = [_conform(pa, array, field.type) for array, field in zip(arrays, schema)]
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            count += len(rows)
+        if writer is None:  # No rows: write an empty file with string columns
+            writer = pa.ipc.new_file(tmp_path, pa.schema([pa.field(name, pa.string()) for name in columns]))
+        writer.close()
+        writer = None
+        os.replace(tmp_path, output_file)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
+
+
+def export_query(db_file: str, query: str, output_file: str, output_format: str = None,
+                 batch_size: int = SQL_FETCH_BATCH) -> int:
+    """
+    Streams the result of a read-only query to output_file in fetchmany batches, so
+    memory stays flat regardless of result size. output_format is csv, jsonl or arrow
+    (an Arrow IPC file), defaulting to the output file's extension, then csv.
+    Returns the number of rows written.
+    """
+    output_format = output_format or OUTPUT_FORMATS.get(os.path.splitext(output_file)[1].lower(), "csv")
+    if output_format not in ("csv", "jsonl", "arrow"):
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+    with connection_pool.connection(db_file) as conn:
+        cursor = conn.execute(query)
+        try:
+            if cursor.description is None:
+                raise ValueError("Query does not return any rows.")
+            columns = [col[0] for col in cursor.description]
+            if output_format == "arrow":
+                return _write_arrow(cursor, columns, output_file, batch_size)
+            with open(output_file, "w", newline="") as f:
+                if output_format == "jsonl":
+                    return _write_jsonl(cursor, columns, f, batch_size)
+                return _write_csv(cursor, columns, f, batch_size)
+        finally:
+            cursor.close()
+
+
+# Aggregates
+
+AGGREGATES = {"SUM", "COUNT", "AVG", "MIN", "MAX"}
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_EXPRESSION = re.compile(r"^[A-Za-z0-9_\s.+\-*/()]+$")  # Column arithmetic only, no quotes or semicolons
+
+_aggregate_cache = OrderedDict()  # (path, mtime_ns, size, query...) -> totals
+_aggregate_lock = threading.Lock()
+
+
+def _table_columns(db_file: str, table: str) -> list:
+    with connection_pool.connection(db_file) as conn:
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def ensure_covering_index(db_file: str, table: str, filter_column: str, value_columns: list) -> str:
+    """Creates (once) an index on filter_column plus value_columns so the aggregate never touches the table."""
+    name = f"{table}_{filter_column}_covering"
+    columns = ", ".join([filter_column, *[column for column in value_columns if column != filter_column]])
+    conn = sqlite3.connect(db_file)  # The pool is read-only; index creation needs a writer
+    try:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+        conn.commit()
+    finally:
+        conn.close()
+    return name
+
+
+def aggregate_totals(db_file: str, table: str, value_expr: str, filter_column: str, filter_values: list,
+                     aggregate: str = "SUM", create_index: bool = False) -> dict:
+    """
+    Computes aggregate(value_expr) for each of filter_values of filter_column in one
+    pass over the table, e.g. SUM(units * price) for type in Gold, Silver and Bronze.
+    Results are cached by the database file's path, mtime and size, so unchanged
+    databases are answered without a query. Values with no rows map to 0 for SUM
+    and COUNT, None otherwise.
+    """
+    aggregate = aggregate.upper()
+    if aggregate not in AGGREGATES:
+        raise ValueError(f"Unsupported aggregate: {aggregate}")
+    if not _IDENTIFIER.match(table) or not _IDENTIFIER.match(filter_column):
+        raise ValueError("Table and column names must be plain identifiers.")
+    if not _EXPRESSION.match(value_expr):
+        raise ValueError(f"Unsupported value expression: {value_expr}")
+    filter_values = list(filter_values)
+    if not filter_values:
+        raise ValueError("At least one filter value is required.")
+
+    if create_index:
+        columns = set(_table_columns(db_file, table))
+        value_columns = [name for name in dict.fromkeys(re.findall(r"[A-Za-z_][A-Za-z0-9_]*", value_expr)) if name in columns]
+        ensure_covering_index(db_file, table, filter_column, value_columns)
+
+    path = os.path.realpath(db_file)
+    stat_result = os.stat(path)  # After index creation, which changes the file
+    key = (path, stat_result.st_mtime_ns, stat_result.st_size, table, value_expr, filter_column,
+           tuple(filter_values), aggregate)
+    with _aggregate_lock:
+        if key in _aggregate_cache:
+            _aggregate_cache.move_to_end(key)
+            return dict(_aggregate_cache[key])
+
+    # One conditional aggregate per value: a single scan (or index range scan) with no GROUP BY sort.
+    placeholders = ",".join("?" * len(filter_values))
+    columns = ", ".join(f"{aggregate}(CASE WHEN {filter_column} = ? THEN {value_expr} END)" for _ in filter_values)
+    query = f"SELECT {columns} FROM {table} WHERE {filter_column} IN ({placeholders})"
+    empty = 0 if aggregate in ("SUM", "COUNT") else None
+    with connection_pool.connection(db_file) as conn:
+        row = conn.execute(query, filter_values + filter_values).fetchone()
+    totals = {value: total if total is not None else empty for value, total in zip(filter_values, row)}
+
+    with _aggregate_lock:
+        _aggregate_cache[key] = totals
+        while len(_aggregate_cache) > AGGREGATE_CACHE_SIZE:
+            _aggregate_cache.popitem(last=False)
+    return dict(totals)
@@ -0,0 +1,139 @@
+# app/tasks/file_operations.py
+import os
+import json
+import heapq
+from fnmatch import fnmatch
+from concurrent.futures import ThreadPoolExecutor
+
+# Constants
+DATA_DIR = "/data/"
+READ_WORKERS = int(os.environ.get("READ_WORKERS", "8"))  # Threads for concurrent small reads
+
+
+def _scan_mtimes(directory: str, pattern: str):
+    # scandir yields names without extra syscalls; only matching files are stat'ed.
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if fnmatch(entry.name, pattern) and entry.is_file():
+                yield entry.stat().st_mtime, entry.path
+
+
+def recent_files(directory: str, k: int = 10, pattern: str = "*") -> list:
+    """Returns the paths of the k most recently modified matching files, most recent first."""
+    return [path for _, path in heapq.nlargest(k, _scan_mtimes(directory, pattern))]  # O(n log k) instead of a full sort
+
+
+def _first_line(path: str):
+    try:
+        with open(path, "r") as f:
+            return f.readline().strip()
+    except Exception as e:
+        print(f"Error reading {path}: {e}") # log and continue
+        return None
+
+
+def read_first_lines(paths: list, workers: int = READ_WORKERS) -> list:
+    """Reads the first line of each file concurrently, keeping the input order and skipping unreadable files."""
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(paths)))) as pool:
+        return [line for line in pool.map(_first_line, paths) if line is not None]
+
+
+# Markdown index
+
+H1_SCAN_BYTES = int(os.environ.get("H1_SCAN_BYTES", str(1024 * 1024)))  # Stop looking for a heading after this
+_READ_CHUNK = 64 * 1024
+
+
+def _scan_directory(directory: str):
+    # Returns (markdown files as (path, size, mtime_ns), subdirectories) for one directory.
+    files, subdirs = [], []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.name.endswith(".md") and entry.is_file():
+                stat_result = entry.stat()
+                files.append((entry.path, stat_result.st_size, stat_result.st_mtime_ns))
+    return files, subdirs
+
+
+def walk_markdown_files(root: str, workers: int = READ_WORKERS) -> list:
+    """Lists every .md file under root as (path, size, mtime_ns), scanning directories in parallel."""
+    found = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(_scan_directory, root)}
+        while pending:
+            future = pending.pop()
+            files, subdirs = future.result()
+            found.extend(files)
+            pending.update(pool.submit(_scan_directory, subdir) for subdir in subdirs)
+    return found
+
+
+def find_h1(path: str, max_scan_bytes: int = H1_SCAN_BYTES):
+    """
+    Returns the first "# " heading of a Markdown file, or None. Reading stops at the
+    heading or after max_scan_bytes, rounded up to whole read chunks.
+    """
+    scanned, carry = 0, b""
+    with open(path, "rb") as f:
+        while scanned < max_scan_bytes:
+            chunk = f.read(_READ_CHUNK)
+            if not chunk:
+                break
+            scanned += len(chunk)
+            lines = (carry + chunk).split(b"\n")
+            carry = lines.pop()  # Possibly incomplete; completed by the next chunk
+            title = next((line[2:] for line in lines if line.startswith(b"# ")), None)
+            if title is not None:
+                return title.decode("utf-8", errors="replace").strip()
+        if carry.startswith(b"# ") and not f.read(1):
+            return carry[2:].decode("utf-8", errors="replace").strip()  # Heading on the last line, without a newline
+    return None
+
+
+def build_markdown_index(docs_dir: str, manifest_path: str, workers: int = READ_WORKERS):
+    """
+    Maps each .md file under docs_dir (relative path) to its first H1 heading.
+    A manifest of (size, mtime_ns, title) per file is kept at manifest_path so that
+    only new or changed files are read again, and those only up to their heading.
+    Returns (index, number of added, changed or removed files).
+    """
+    try:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    previous = manifest.get("files", {}) if manifest.get("docs_dir") == docs_dir else {}
+
+    current, changed = {}, []
+    for path, size, mtime_ns in walk_markdown_files(docs_dir, workers):
+        relpath = os.path.relpath(path, docs_dir).replace(os.sep, "/")
+        entry = previous.get(relpath)
+        if entry is not None and len(entry) == 3 and entry[0] == size and entry[1] == mtime_ns:
+            current[relpath] = entry
+        else:
+            changed.append((relpath, path, size, mtime_ns))
+
+    def parse(item):
+        relpath, path, size, mtime_ns = item
+        try:
+            title = find_h1(path)
+        except OSError as e:
+            print(f"Error processing {relpath}: {e}") # Log and continue
+            return relpath, None
+        return relpath, [size, mtime_ns, title]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for relpath, entry in pool.map(parse, changed):
+            if entry is not None:
+                current[relpath] = entry
+
+    updates = len(changed) + len(previous.keys() - current.keys())  # Changed, added and removed files
+    if updates:
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(manifest_path, "w") as f:
+            json.dump({"docs_dir": docs_dir, "files": current}, f)
+
+    index = {relpath: entry[2] for relpath, entry in sorted(current.items()) if entry[2] is not None}
+    return index, updates
@@ -0,0 +1,242 @@
+# app/tasks/image_processing.py
+import io
+import os
+import glob
+import time
+import json
+import base64
+
+# Constants
+CARD_IMAGE_WIDTHS = [int(w) for w in os.environ.get("CARD_IMAGE_WIDTHS", "512,1024").split(",")]  # Retry widths, in order
+CARD_IMAGE_MAX_BYTES = int(os.environ.get("CARD_IMAGE_MAX_BYTES", "40000"))  # Budget at the first width
+CROP_EDGE_THRESHOLD = 40  # Edge strength (0-255) that counts as text or artwork
+CROP_MARGIN = 0.03  # Padding around the detected region, as a fraction of the image size
+
+LOSSY_QUALITIES = (90, 80, 70, 60, 50)
+
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", str(os.cpu_count() or 2)))
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff"}
+OUTPUT_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+MANIFEST_NAME = ".image-manifest.json"
+
+
+def autocrop(image, threshold: int = CROP_EDGE_THRESHOLD, margin: float = CROP_MARGIN):
+    """Crops a grayscale image to the bounding box of its edges, i.e. where the text is."""
+    from PIL import ImageFilter
+    edges = image.filter(ImageFilter.FIND_EDGES).point(lambda value: 255 if value >= threshold else 0)
+    # The filter leaves the 1-pixel border unprocessed, so it is excluded from the search.
+    box = edges.crop((1, 1, image.width - 1, image.height - 1)).getbbox()
+    if box is None:
+        return image  # Blank image, nothing to crop to
+    pad_x, pad_y = int(image.width * margin), int(image.height * margin)
+    left, top, right, bottom = (coordinate + 1 for coordinate in box)
+    return image.crop((
+        max(0, left - pad_x), max(0, top - pad_y), min(image.width, right + pad_x), min(image.height, bottom + pad_y)
+    ))
+
+
+def _encode(image, fmt: str, **options) -> bytes:
+    buffered = io.BytesIO()
+    image.save(buffered, format=fmt, **options)
+    return buffered.getvalue()
+
+
+def _encodings(image):
+    # Lossless candidates first, then lossy ones from best to worst quality.
+    yield "image/png", True, _encode(image, "PNG", optimize=True)
+    yield "image/webp", True, _encode(image, "WEBP", lossless=True, method=6)
+    for quality in LOSSY_QUALITIES:
+        yield "image/webp", False, _encode(image, "WEBP", quality=quality, method=6)
+        yield "image/jpeg", False, _encode(image, "JPEG", quality=quality, optimize=True)
+
+
+def smallest_encoding(image, max_bytes: int):
+    """
+    Returns (data, mime_type) for the image: the smallest lossless encoding if it fits
+    max_bytes, else the highest-quality lossy encoding that fits, else the smallest overall.
+    """
+    best_lossless, best_lossy, smallest = None, None, None
+    for mime_type, lossless, data in _encodings(image):
+        if smallest is None or len(data) < len(smallest[0]):
+            smallest = (data, mime_type)
+        if lossless and (best_lossless is None or len(data) < len(best_lossless[0])):
+            best_lossless = (data, mime_type)
+        if not lossless and best_lossy is None and len(data) <= max_bytes:
+            best_lossy = (data, mime_type)  # Qualities are tried in descending order
+    if len(best_lossless[0]) <= max_bytes:
+        return best_lossless
+    return best_lossy or smallest
+
+
+def prepare_image(image_file: str, width: int, max_bytes: int) -> dict:
+    """
+    Autocrops, grayscales and downsamples an image to at most width pixels wide, then
+    encodes it within max_bytes. Returns the data URL with its size and dimensions.
+    """
+    from PIL import Image
+    with Image.open(image_file) as image:
+        image = autocrop(image.convert("L"))
+    if image.width > width:
+        image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+    data, mime_type = smallest_encoding(image, max_bytes)
+    return {
+        "url": f"data:{mime_type};base64,{base64.b64encode(data).decode()}",
+        "bytes": len(data),
+        "mime_type": mime_type,
+        "size": image.size,
+    }
+
+
+def luhn_valid(number: str) -> bool:
+    """Returns True if number is 12-19 digits with a valid Luhn checksum."""
+    if not number.isdigit() or not 12 <= len(number) <= 19:
+        return False
+    total = 0
+    for position, digit in enumerate(int(d) for d in reversed(number)):
+        if position % 2:
+            digit = digit * 2 - 9 if digit > 4 else digit * 2
+        total += digit
+    return total % 10 == 0
+
+
+# Resizing
+
+def pillow_format(name: str) -> str:
+    """Maps a format name or extension such as "jpg" or ".webp" to Pillow's format name ("JPEG", "WEBP")."""
+    from PIL import Image
+    key = name.lower().lstrip(".")
+    return Image.registered_extensions().get("." + key, key.upper())
+
+
+def shrink_image(image_file: str, output_file: str, size: tuple = (200, 200), output_format: str = None,
+                 quality: int = 60) -> tuple:
+    """
+    Downscales an image to fit within size, keeping its aspect ratio, and saves it.
+    JPEGs are decoded at a reduced scale via draft mode instead of at full resolution.
+    Returns (input bytes, output bytes).
+    """
+    from PIL import Image
+    with Image.open(image_file) as image:
+        fmt = pillow_format(output_format) if output_format else (
+            Image.registered_extensions().get(os.path.splitext(output_file)[1].lower()) or image.format or "PNG")
+        if image.format == "JPEG":
+            image.draft("RGB", size)  # Let libjpeg decode at 1/2, 1/4 or 1/8 scale
+        image.thumbnail(size, Image.LANCZOS, reducing_gap=2.0)  # Cheap integer reduce, then resample
+        if fmt == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        options = {"quality": quality} if fmt in ("JPEG", "WEBP") else {}
+        tmp_file = output_file + ".tmp"
+        image.save(tmp_file, format=fmt, optimize=True, **options)
+    os.replace(tmp_file, output_file)  # Readers never see a half-written output
+    return os.path.getsize(image_file), os.path.getsize(output_file)
+
+
+def find_images(source: str) -> list:
+    """Returns the image files under a directory (recursively) or matching a glob pattern."""
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, "**", "*"), recursive=True)
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(path for path in paths if os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS and os.path.isfile(path))
+
+
+def _output_path(image_file: str, root: str, output_dir: str, output_format: str) -> str:
+    relative = os.path.relpath(image_file, root)
+    if output_format:
+        fmt = pillow_format(output_format)
+        relative = os.path.splitext(relative)[0] + OUTPUT_EXTENSIONS.get(fmt, "." + output_format.lower().lstrip("."))
+    return os.path.join(output_dir, relative)
+
+
+def _up_to_date(image_file: str, output_file: str, settings: str, previous: str) -> bool:
+    # Stale when the source is newer or the output was made with other size, format or quality settings.
+    if settings != previous:
+        return False
+    try:
+        return os.stat(output_file).st_mtime_ns >= os.stat(image_file).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def _shrink_batch(jobs: list, size: tuple, output_format: str, quality: int) -> list:
+    # Runs in a worker process; one call per chunk keeps the pickling overhead per image small.
+    results = []
+    for image_file, output_file in jobs:
+        try:
+            results.append((image_file, *shrink_image(image_file, output_file, size, output_format, quality), None))
+        except Exception as e:
+            results.append((image_file, 0, 0, str(e)))
+    return results
+
+
+def batch_shrink_images(source: str, output_dir: str, max_dimension: int = 200, output_format: str = None,
+                        quality: int = 60, workers: int = IMAGE_WORKERS) -> dict:
+    """
+    Downscales every image in a directory or glob into output_dir, mirroring the
+    source layout, across a process pool. Outputs newer than their source and made
+    with the same settings (recorded in a manifest in output_dir) are skipped.
+    Returns counts, images per second and bytes saved.
+    """
+    start = time.perf_counter()
+    output_root = os.path.abspath(output_dir) + os.sep
+    images = [path for path in find_images(source) if not os.path.abspath(path).startswith(output_root)]
+    if os.path.isdir(source):
+        root = source
+    else:
+        root = os.path.commonpath([os.path.dirname(path) for path in images]) if images else output_dir
+    settings = json.dumps([max_dimension, pillow_format(output_format) if output_format else None, quality])
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    jobs = []
+    for image_file in images:
+        output_file = _output_path(image_file, root, output_dir, output_format)
+        if not _up_to_date(image_file, output_file, settings, manifest.get(os.path.relpath(output_file, output_dir))):
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            jobs.append((image_file, output_file))
+
+    size = (max_dimension, max_dimension)
+    if len(jobs) <= 1 or workers <= 1:
+        results = _shrink_batch(jobs, size, output_format, quality)
+    else:
+        from executors import process_pool
+        results = []
+        chunk = max(1, min(64, len(jobs) // (workers * 4)))
+        with process_pool(min(workers, len(jobs))) as pool:
+            futures = [
+                pool.submit(_shrink_batch, jobs[offset:offset + chunk], size, output_format, quality)
+                for offset in range(0, len(jobs), chunk)
+            ]
+            for future in futures:
+                results.extend(future.result())
+
+    failed = [(image_file, error) for image_file, _, _, error in results if error]
+    if jobs:
+        outputs = dict(jobs)
+        for image_file, _, _, error in results:
+            if not error:
+                manifest[os.path.relpath(outputs[image_file], output_dir)] = settings
+        os.makedirs(output_dir, exist_ok=True)
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, manifest_path)
+    for image_file, error in failed[:10]:
+        print(f"Skipping {image_file}: {error}")  # Log and continue
+    bytes_in = sum(result[1] for result in results)
+    bytes_out = sum(result[2] for result in results)
+    seconds = time.perf_counter() - start
+    return {
+        "images": len(images),
+        "processed": len(results) - len(failed),
+        "skipped": len(images) - len(jobs),
+        "failed": len(failed),
+        "seconds": seconds,
+        "images_per_second": len(results) / seconds if seconds else 0.0,
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+        "bytes_saved": bytes_in - bytes_out,
+    }
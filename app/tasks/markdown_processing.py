@@ -0,0 +1,126 @@
+# app/tasks/markdown_processing.py
+import os
+import json
+import time
+import hashlib
+import threading
+from tasks.file_operations import walk_markdown_files
+
+# Constants
+MARKDOWN_EXTENSIONS = [name for name in os.environ.get("MARKDOWN_EXTENSIONS", "").split(",") if name.strip()]
+MARKDOWN_WORKERS = int(os.environ.get("MARKDOWN_WORKERS", str(os.cpu_count() or 2)))
+MANIFEST_NAME = ".markdown-manifest.json"
+BATCH_SIZE = 256  # Files per worker task
+
+_local = threading.local()  # Markdown instances keep per-conversion state, so each thread gets its own
+
+
+def _converter(extensions: tuple):
+    converters = getattr(_local, "converters", None)
+    if converters is None:
+        converters = _local.converters = {}  # Extensions -> configured Markdown instance
+    converter = converters.get(extensions)
+    if converter is None:
+        import markdown
+        converter = converters[extensions] = markdown.Markdown(extensions=list(extensions))
+    return converter
+
+
+def markdown_to_html(text: str, extensions=None) -> str:
+    """Converts Markdown text with a reused converter instead of building one per call."""
+    extensions = tuple(MARKDOWN_EXTENSIONS if extensions is None else extensions)
+    return _converter(extensions).reset().convert(text)
+
+
+def config_hash(extensions) -> str:
+    """Hashes the Markdown version and extension list; a change invalidates every output."""
+    import markdown
+    return hashlib.sha256(json.dumps([markdown.__version__, list(extensions)]).encode("utf-8")).hexdigest()
+
+
+def _write_text(path: str, text: str):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _convert_batch(jobs: list, extensions: tuple) -> list:
+    # Runs in a worker process. Each job is (relpath, source, output, previous sha256 or None).
+    results = []
+    for relpath, source, output, previous in jobs:
+        try:
+            with open(source, "rb") as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+            if digest == previous and os.path.exists(output):
+                results.append((relpath, digest, False, None))  # Touched but unchanged
+                continue
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            _write_text(output, markdown_to_html(data.decode("utf-8", errors="replace"), extensions))
+            results.append((relpath, digest, True, None))
+        except Exception as e:
+            results.append((relpath, None, False, str(e)))
+    return results
+
+
+def build_html(source_dir: str, output_dir: str, extensions=None, workers: int = MARKDOWN_WORKERS) -> dict:
+    """
+    Converts every .md file under source_dir to .html under output_dir, mirroring the
+    layout, across a process pool. A manifest in output_dir records (size, mtime_ns,
+    sha256) per file and the extension config hash; files that match it are skipped.
+    Returns counts and files per second.
+    """
+    start = time.perf_counter()
+    extensions = tuple(MARKDOWN_EXTENSIONS if extensions is None else extensions)
+    config = config_hash(extensions)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    same_build = manifest.get("source_dir") == source_dir and manifest.get("config") == config
+    previous = manifest.get("files", {}) if same_build else {}
+
+    files, jobs = {}, []
+    for path, size, mtime_ns in walk_markdown_files(source_dir):
+        relpath = os.path.relpath(path, source_dir).replace(os.sep, "/")
+        entry = previous.get(relpath)
+        if entry is not None and entry[0] == size and entry[1] == mtime_ns:
+            files[relpath] = entry
+            continue
+        output = os.path.join(output_dir, os.path.splitext(relpath)[0] + ".html")
+        jobs.append((relpath, path, output, entry[2] if entry else None, size, mtime_ns))
+
+    stats = {relpath: (size, mtime_ns) for relpath, _, _, _, size, mtime_ns in jobs}
+    batches = [[job[:4] for job in jobs[offset:offset + BATCH_SIZE]] for offset in range(0, len(jobs), BATCH_SIZE)]
+    if len(batches) <= 1 or workers <= 1:
+        results = [result for batch in batches for result in _convert_batch(batch, extensions)]
+    else:
+        from executors import process_pool
+        with process_pool(min(workers, len(batches))) as pool:
+            results = [result for batch in pool.map(_convert_batch, batches, [extensions] * len(batches)) for result in batch]
+
+    converted = failed = 0
+    for relpath, digest, was_converted, error in results:
+        if error:
+            failed += 1
+            print(f"Error converting {relpath}: {error}")  # Log and continue
+            continue
+        converted += was_converted
+        files[relpath] = [*stats[relpath], digest]
+
+    if jobs or len(files) != len(previous):
+        os.makedirs(output_dir, exist_ok=True)
+        _write_text(manifest_path, json.dumps({"source_dir": source_dir, "config": config, "files": files}))
+
+    seconds = time.perf_counter() - start
+    return {
+        "files": len(files) + failed,
+        "converted": converted,
+        "skipped": len(files) - converted,
+        "failed": failed,
+        "seconds": seconds,
+        "files_per_second": (len(files) + failed) / seconds if seconds else 0.0,
+    }
@@ -0,0 +1,201 @@
+# app/tasks/web_interaction.py
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dependency_manager import ensure_package
+
+# Constants
+DATA_DIR = "/data/"
+HTTP_CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", os.path.join(DATA_DIR, ".cache", "http"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))  # Seconds
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "30"))  # Seconds between received bytes
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))  # Keep-alive connections per host
+HTTP_CACHE_MAX_BYTES = int(os.environ.get("HTTP_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))  # LRU eviction above this
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+PARSERS = {"html.parser": None, "lxml": "lxml", "html5lib": "html5lib"}  # Parser -> package providing it
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Returns the shared session, whose keep-alive pool is reused by every request."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            retries = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retries)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def _cache_paths(url: str) -> tuple:
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(HTTP_CACHE_DIR, key + ".body"), os.path.join(HTTP_CACHE_DIR, key + ".json")
+
+
+def _load_meta(meta_path: str, body_path: str):
+    try:
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if os.path.exists(body_path) else None
+
+
+def _write_json(path: str, data: dict):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _seconds(value) -> int:
+    # Cache-Control and Age values from the wild are not always integers; treat junk as 0.
+    try:
+        return max(int(str(value).strip()), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _freshness(headers) -> tuple:
+    """Returns (expires timestamp, storable) from Cache-Control and Expires headers."""
+    directives = {}
+    for directive in headers.get("Cache-Control", "").lower().split(","):
+        name, _, value = directive.strip().partition("=")
+        if name:
+            directives[name] = value.strip('"')
+    if "no-store" in directives:
+        return 0.0, False
+    if "no-cache" in directives:
+        return 0.0, True  # Stored, but revalidated on every use
+    if "max-age" in directives:
+        return time.time() + _seconds(directives["max-age"]) - _seconds(headers.get("Age")), True
+    if "Expires" in headers:
+        try:
+            return parsedate_to_datetime(headers["Expires"]).timestamp(), True
+        except (TypeError, ValueError):
+            return 0.0, True  # An invalid Expires means already expired
+    return 0.0, True
+
+
+def _evict(max_bytes: int = HTTP_CACHE_MAX_BYTES):
+    """Removes the least recently used cached bodies until the cache fits max_bytes."""
+    bodies = []
+    with os.scandir(HTTP_CACHE_DIR) as entries:
+        for entry in entries:
+            if entry.name.endswith(".body"):
+                try:
+                    stat_result = entry.stat()
+                except FileNotFoundError:
+                    continue
+                bodies.append((stat_result.st_mtime, stat_result.st_size, entry.path))
+    total = sum(size for _, size, _ in bodies)
+    for _, size, path in sorted(bodies):
+        if total <= max_bytes:
+            break
+        for stale in (path, path[:-len(".body")] + ".json"):
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass  # Evicted by another worker
+        total -= size
+
+
+def _copy_cached(body_path: str, output_file: str):
+    shutil.copyfile(body_path, output_file)
+    os.utime(body_path)  # Marks the body as recently used for eviction
+
+
+def fetch_to_file(url: str, output_file: str, timeout: tuple = None) -> dict:
+    """
+    Downloads url to output_file through the shared session and an on-disk HTTP cache.
+    Fresh cached bodies are copied without a request, stale ones are revalidated with
+    If-None-Match/If-Modified-Since, and new bodies are streamed to disk in chunks.
+    Responses with neither validators nor freshness are not cached, and the least
+    recently used bodies are evicted once the cache exceeds HTTP_CACHE_MAX_BYTES.
+    Returns where the body came from ("cache", "revalidated" or "network") and its size.
+    """
+    timeout = timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+    body_path, meta_path = _cache_paths(url)
+    meta = _load_meta(meta_path, body_path)
+
+    if meta and time.time() < meta["expires"]:
+        _copy_cached(body_path, output_file)
+        return {"source": "cache", "bytes": os.path.getsize(output_file)}
+
+    headers = {}
+    if meta and meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta and meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    with get_session().get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304 and meta:
+            meta["expires"], _ = _freshness(response.headers)
+            _write_json(meta_path, meta)
+            _copy_cached(body_path, output_file)
+            return {"source": "revalidated", "bytes": os.path.getsize(output_file)}
+        response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
+
+        expires, storable = _freshness(response.headers)
+        # Without validators or freshness a stored copy could never be reused, only accumulate.
+        validators = response.headers.get("ETag") or response.headers.get("Last-Modified")
+        storable = storable and bool(validators or expires > time.time())
+        # Stream into a temporary file next to the destination, so partial downloads never replace anything.
+        target_dir = HTTP_CACHE_DIR if storable else os.path.dirname(os.path.abspath(output_file))
+        fd, tmp_path = tempfile.mkstemp(dir=target_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                    f.write(chunk)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    if not storable:
+        os.replace(tmp_path, output_file)
+        return {"source": "network", "bytes": os.path.getsize(output_file)}
+
+    os.replace(tmp_path, body_path)
+    _write_json(meta_path, {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_type": response.headers.get("Content-Type"),
+        "expires": expires,
+        "stored": time.time(),
+    })
+    shutil.copyfile(body_path, output_file)
+    _evict()
+    return {"source": "network", "bytes": os.path.getsize(output_file)}
+
+
+def extract_text(html_file: str, parser: str = "html.parser", selector: str = None) -> str:
+    """
+    Extracts text from an HTML file. With a CSS selector only the matching elements
+    are kept, one per line; otherwise the text of the whole document is returned.
+    """
+    if parser not in PARSERS:
+        raise ValueError(f"Unsupported parser: {parser}. Use one of {', '.join(PARSERS)}")
+    if PARSERS[parser]:
+        ensure_package(PARSERS[parser])
+    from bs4 import BeautifulSoup
+    with open(html_file, "rb") as f:
+        soup = BeautifulSoup(f, parser)
+    if selector:
+        return "\n".join(element.get_text(" ", strip=True) for element in soup.select(selector))
+    return soup.get_text()
@@ -0,0 +1,75 @@
+# app/tests/test_api.py
+import os
+import shutil
+import tempfile
+import pytest
+from fastapi.testclient import TestClient
+from api import app
+
+client = TestClient(app)  # Not used as a context manager, so startup preflight and job workers stay off
+
+
+@pytest.fixture
+def data_dir():
+    # /read only serves files under /data, so the fixtures live there.
+    if not os.access("/data", os.W_OK):
+        pytest.skip("/data is not writable")
+    path = tempfile.mkdtemp(dir="/data", prefix="test-api-")
+    yield path
+    shutil.rmtree(path)
+
+
+@pytest.fixture
+def text_file(data_dir):
+    path = os.path.join(data_dir, "notes.txt")
+    with open(path, "w") as f:
+        f.write("0123456789")
+    return path
+
+
+def test_read_streams_the_file_with_validators(text_file):
+    response = client.get("/read", params={"path": text_file})
+    assert response.status_code == 200
+    assert response.text == "0123456789"
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.headers["etag"] and response.headers["last-modified"]
+
+
+def test_read_returns_304_for_a_matching_etag(text_file):
+    etag = client.get("/read", params={"path": text_file}).headers["etag"]
+    response = client.get("/read", params={"path": text_file}, headers={"If-None-Match": f'"other", {etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_read_returns_200_after_the_file_changes(text_file):
+    etag = client.get("/read", params={"path": text_file}).headers["etag"]
+    with open(text_file, "a") as f:
+        f.write("more")
+    response = client.get("/read", params={"path": text_file}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.text == "0123456789more"
+
+
+def test_read_returns_304_for_if_modified_since(text_file):
+    last_modified = client.get("/read", params={"path": text_file}).headers["last-modified"]
+    response = client.get("/read", params={"path": text_file}, headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+
+def test_read_serves_a_range(text_file):
+    response = client.get("/read", params={"path": text_file}, headers={"Range": "bytes=2-5"})
+    assert response.status_code == 206
+    assert response.content == b"2345"
+    assert response.headers["content-range"] == "bytes 2-5/10"
+
+
+def test_read_returns_404_for_a_directory_or_missing_file(data_dir):
+    assert client.get("/read", params={"path": data_dir}).status_code == 404
+    assert client.get("/read", params={"path": os.path.join(data_dir, "missing.txt")}).status_code == 404
+
+
+@pytest.mark.parametrize("path", ["/etc/passwd", "/data/../etc/passwd", "data/notes.txt"])
+def test_read_rejects_paths_outside_data(path):
+    assert client.get("/read", params={"path": path}).status_code == 400
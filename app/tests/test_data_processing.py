@@ -0,0 +1,115 @@
+# app/tests/test_data_processing.py
+import json
+import random
+from datetime import datetime, timedelta
+import pytest
+from tasks import data_processing
+from tasks.data_processing import DATE_FORMATS, DateParser, analyze_dates, external_sort_json_array
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def _strptime(line: str):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(line, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _strptime_days(line: str):
+    parsed = _strptime(line)
+    return None if parsed is None else (parsed - EPOCH).days
+
+
+def _sample_lines(count: int = 5000) -> list:
+    # Random datagen-style dates in every format, plus case variants and near-misses.
+    rng = random.Random(0)
+    start = datetime(1999, 12, 25)
+    lines = []
+    for _ in range(count):
+        moment = start + timedelta(seconds=rng.randrange(30 * 365 * 86400))
+        line = moment.strftime(rng.choice(DATE_FORMATS))
+        lines.append(rng.choice([line, line.lower(), line.upper()]))
+    lines += [
+        "2024-02-30", "2023-02-29", "2024-02-29", "2024-13-01", "2024-00-10", "2024-01-00",
+        "31-Apr-2024", "30-Apr-2024", "15-Foo-2024", "jan 03, 2024", "JAN 31, 2024", "Feb 29, 2023",
+        "2024/01/01 24:00:00", "2024/01/01 23:59:60", "2024/01/01 23:59:59", "Jan 3, 2024", "not a date",
+    ]
+    return lines
+
+
+@pytest.mark.parametrize("batch", [1, 7, 100000])
+def test_parser_matches_strptime_for_every_format(batch):
+    lines = _sample_lines()
+    expected = sorted(days for days in map(_strptime_days, lines) if days is not None)
+    parser = DateParser()
+    parsed = []
+    for start in range(0, len(lines), batch):
+        parsed += parser.to_days([line.encode() for line in lines[start:start + batch]]).tolist()
+    assert sorted(parsed) == expected
+    assert all(parser.format_counts[fmt] > 0 for fmt in DATE_FORMATS)
+
+
+def test_lowercase_month_names_parse():
+    days = DateParser().to_days([b"jan 03, 2024", b"03-mar-2024", b"DEC 31, 1999"])  # Grouped by shape
+    assert sorted(days.tolist()) == sorted(_strptime_days(line) for line in ["jan 03, 2024", "03-mar-2024", "DEC 31, 1999"])
+
+
+def test_analyze_dates_counts_weekdays_months_and_ranges(tmp_path):
+    lines = _sample_lines(2000)
+    path = tmp_path / "dates.txt"
+    path.write_text("\n".join(lines) + "\n\n")
+    stats = analyze_dates(str(path), ranges=[("2000-01-01", "2009-12-31")], batch_lines=333)
+
+    parsed = [moment for moment in map(_strptime, lines) if moment is not None]
+    assert stats["total"] == len(lines)
+    assert stats["invalid"] == len(lines) - len(parsed)
+    assert stats["weekdays"] == [sum(1 for d in parsed if d.weekday() == day) for day in range(7)]
+    assert stats["months"] == [sum(1 for d in parsed if d.month == month) for month in range(1, 13)]
+    assert stats["ranges"] == [sum(1 for d in parsed if datetime(2000, 1, 1) <= d < datetime(2010, 1, 1))]
+
+
+
+def _contacts(count: int = 500) -> list:
+    rng = random.Random(1)
+    names = ["Ng", "Smith", "Ödegaard", "li", "Brown", "Zhang"]
+    return [{"first_name": rng.choice(names), "last_name": rng.choice(names), "id": i} for i in range(count)]
+
+
+def _by_name(contact):
+    return contact["last_name"], contact["first_name"]
+
+
+def test_external_sort_spills_merges_and_cleans_up(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_processing, "_JSON_READ_CHUNK", 37)  # Elements straddle chunk boundaries
+    contacts = _contacts()
+    input_file, output_file = tmp_path / "contacts.json", tmp_path / "sorted.json"
+    input_file.write_text(json.dumps(contacts, indent=2))
+    spill_root = tmp_path / "spill"
+    spill_root.mkdir()
+
+    runs = external_sort_json_array(str(input_file), str(output_file), ("last_name", "first_name"),
+                                    memory_budget_mb=0.005, tmp_dir=str(spill_root))
+    assert runs > 1
+    assert json.loads(output_file.read_text()) == sorted(contacts, key=_by_name)  # Stable: ties keep input order
+    assert list(spill_root.iterdir()) == []
+
+
+def test_external_sort_in_memory_keeps_indent(tmp_path):
+    contacts = _contacts(50)
+    input_file, output_file = tmp_path / "contacts.json", tmp_path / "sorted.json"
+    input_file.write_text(json.dumps(contacts))
+
+    runs = external_sort_json_array(str(input_file), str(output_file), ("last_name", "first_name"), indent=4)
+    assert runs == 1
+    expected = sorted(contacts, key=_by_name)
+    assert output_file.read_text() == json.dumps(expected, indent=4)
+
+
+def test_external_sort_puts_missing_fields_last(tmp_path):
+    input_file, output_file = tmp_path / "contacts.json", tmp_path / "sorted.json"
+    input_file.write_text(json.dumps([{"age": None}, {"age": 0}, {}, {"age": -1}, {"age": "x"}]))
+    external_sort_json_array(str(input_file), str(output_file), ("age",), memory_budget_mb=0.0001, tmp_dir=str(tmp_path))
+    assert json.loads(output_file.read_text()) == [{"age": -1}, {"age": 0}, {"age": "x"}, {"age": None}, {}]
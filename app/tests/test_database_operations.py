@@ -0,0 +1,73 @@
+# app/tests/test_database_operations.py
+import os
+import json
+import sqlite3
+import pytest
+from tasks.database_operations import export_query
+
+pa = pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = str(tmp_path / "test.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE items (id INTEGER, late, mixed, amount, data BLOB, label TEXT)")
+    conn.executemany(
+        "INSERT INTO items VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (1, None, 1, 10, b"\x00\x01", "a"),
+            (2, None, 2, 20, b"\x02", "b"),
+            (3, 7, "three", 30, b"\x03", "c"),   # late: NULL -> integer; mixed: integer -> text
+            (4, 8, 4.5, 40.5, None, None),      # amount: integer -> real
+            (5, None, b"\xff", 50, b"\x05", "e"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _read_arrow(path: str):
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 1000])
+def test_arrow_schema_widens_when_later_batches_disagree(db_file, tmp_path, batch_size):
+    output_file = str(tmp_path / "items.arrow")
+    assert export_query(db_file, "SELECT * FROM items ORDER BY id", output_file, batch_size=batch_size) == 5
+    table = _read_arrow(output_file)
+    assert table.schema.field("id").type == pa.int64()
+    assert table.schema.field("late").type == pa.int64()
+    assert table.schema.field("mixed").type == pa.string()
+    assert table.schema.field("amount").type == pa.float64()
+    assert table.schema.field("data").type == pa.binary()
+    assert table.column("late").to_pylist() == [None, None, 7, 8, None]
+    assert table.column("mixed").to_pylist() == ["1", "2", "three", "4.5", "ff"]
+    assert table.column("amount").to_pylist() == [10.0, 20.0, 30.0, 40.5, 50.0]
+    assert table.column("data").to_pylist() == [b"\x00\x01", b"\x02", b"\x03", None, b"\x05"]
+    assert sorted(os.listdir(tmp_path)) == ["items.arrow", "test.db"]  # No temporary files left
+
+
+def test_arrow_empty_result_has_string_columns(db_file, tmp_path):
+    output_file = str(tmp_path / "empty.arrow")
+    assert export_query(db_file, "SELECT id, label FROM items WHERE id > 99", output_file) == 0
+    table = _read_arrow(output_file)
+    assert table.num_rows == 0 and table.schema.types == [pa.string(), pa.string()]
+
+
+def test_jsonl_and_csv_exports(db_file, tmp_path):
+    jsonl_file, csv_file = str(tmp_path / "items.jsonl"), str(tmp_path / "items.csv")
+    assert export_query(db_file, "SELECT id, data FROM items WHERE id <= 2 ORDER BY id", jsonl_file) == 2
+    with open(jsonl_file) as f:
+        assert [json.loads(line) for line in f] == [{"id": 1, "data": "0001"}, {"id": 2, "data": "02"}]
+    export_query(db_file, "SELECT id, label FROM items ORDER BY id LIMIT 2", csv_file)
+    with open(csv_file) as f:
+        assert f.read().splitlines() == ["id,label", "1,a", "2,b"]
+
+
+def test_export_is_read_only(db_file, tmp_path):
+    with pytest.raises(sqlite3.OperationalError):
+        export_query(db_file, "DELETE FROM items RETURNING id", str(tmp_path / "out.csv"))
+
@@ -0,0 +1,107 @@
+# app/tests/test_dataset_registry.py
+import os
+import json
+import pytest
+from fastapi.testclient import TestClient
+import api
+from dataset_registry import DatasetRegistry, DATASET_MAX_LIMIT
+
+CSV = """name,city,age,score
+Asha,Pune,34,8.5
+Bilal,Delhi,29,7.0
+Chen,Pune,41,9.25
+Dana,Mumbai,,6.5
+Eve,Pune,29,5.0
+"""
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    registry = DatasetRegistry(str(tmp_path / "datasets"))
+    monkeypatch.setattr(api, "dataset_registry", registry)
+    (tmp_path / "people.csv").write_text(CSV)
+    registry.register("people", str(tmp_path / "people.csv"))
+    return registry
+
+
+@pytest.fixture
+def client(registry):
+    return TestClient(api.app)
+
+
+def _rows(client, **params) -> list:
+    response = client.get("/datasets/people", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()["rows"]
+
+
+def test_infers_column_types(registry):
+    assert registry.get("people").columns == {"name": "TEXT", "city": "TEXT", "age": "INTEGER", "score": "REAL"}
+    assert registry.names() == ["people"]
+
+
+@pytest.mark.parametrize("params, names", [
+    ({"city": "Pune"}, ["Asha", "Chen", "Eve"]),
+    ({"city__ne": "Pune"}, ["Bilal", "Dana"]),
+    ({"age__gte": "34"}, ["Asha", "Chen"]),
+    ({"age__gt": "34"}, ["Chen"]),
+    ({"age__lte": "29"}, ["Bilal", "Eve"]),
+    ({"age__lt": "30", "city": "Pune"}, ["Eve"]),
+    ({"score__gte": "8.5"}, ["Asha", "Chen"]),
+    ({"name__contains": "e"}, ["Chen", "Eve"]),
+    ({"name__contains": "%"}, []),  # LIKE wildcards are matched literally
+])
+def test_filter_operators(client, params, names):
+    assert [row["name"] for row in _rows(client, **params)] == names
+
+
+def test_fields_sort_limit_and_offset(client):
+    response = client.get("/datasets/people", params={"fields": "name,age", "sort": "-age,name", "limit": 2, "offset": 1})
+    assert response.json() == {"offset": 1, "limit": 2, "rows": [{"name": "Asha", "age": 34}, {"name": "Bilal", "age": 29}]}
+    assert [row["name"] for row in _rows(client, sort="age,-name")] == ["Dana", "Eve", "Bilal", "Asha", "Chen"]
+
+
+def test_empty_numeric_cells_are_null(client):
+    assert _rows(client, name="Dana") == [{"name": "Dana", "city": "Mumbai", "age": None, "score": 6.5}]
+
+
+@pytest.mark.parametrize("params", [
+    {"country": "IN"},
+    {"age__between": "1"},
+    {"fields": "name,salary"},
+    {"sort": "-salary"},
+    {"limit": DATASET_MAX_LIMIT + 1},
+    {"limit": -1},
+    {"offset": -1},
+])
+def test_bad_queries_return_400(client, params):
+    assert client.get("/datasets/people", params=params).status_code == 400
+
+
+def test_unknown_dataset_returns_404(client):
+    assert client.get("/datasets/nobody").status_code == 404
+    assert client.get("/datasets").json() == {"datasets": ["people"]}
+
+
+def test_refreshes_after_the_csv_changes(client, registry, tmp_path):
+    dataset = registry.get("people")
+    assert len(_rows(client)) == 5
+    path = tmp_path / "people.csv"
+    stat_result = os.stat(path)
+
+    path.write_text(CSV + "Farah,Delhi,52,9.0\n")  # Size changes
+    assert [row["name"] for row in _rows(client, city="Delhi")] == ["Bilal", "Farah"]
+
+    path.write_text(CSV.replace("Asha", "Amir") + "Farah,Delhi,52,9.0\n")  # Same size, new mtime
+    os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 10**9))
+    assert _rows(client, fields="name", limit=1) == [{"name": "Amir"}]
+    assert dataset.refresh() is False  # Already up to date
+
+
+def test_registry_is_shared_through_its_json_file(registry, tmp_path):
+    with open(registry.path) as f:
+        assert json.load(f) == {"people": {"csv_file": os.path.realpath(tmp_path / "people.csv")}}
+    other_worker = DatasetRegistry(registry.directory)
+    assert other_worker.get("people").prepare_query({"city": "Pune"})["parameters"] == ["Pune", 100, 0]
+    with pytest.raises(ValueError):
+        registry.register("bad name", str(tmp_path / "people.csv"))
@@ -0,0 +1,78 @@
+# app/tests/test_git_operations.py
+import os
+import git
+import pytest
+from tasks import git_operations
+
+
+@pytest.fixture
+def upstream(tmp_path, monkeypatch):
+    monkeypatch.setattr(git_operations, "GIT_MIRROR_DIR", str(tmp_path / "mirrors"))
+    repo = git.Repo.init(tmp_path / "upstream", initial_branch="main")
+    _commit(repo, "README.md", "first\n")
+    return repo, f"file://{tmp_path / 'upstream'}"
+
+
+def _commit(repo: git.Repo, name: str, text: str):
+    with open(os.path.join(repo.working_tree_dir, name), "w") as f:
+        f.write(text)
+    repo.index.add([name])
+    author = git.Actor("Test", "test@example.com")
+    repo.index.commit(f"Update {name}", author=author, committer=author)
+
+
+def _read(path) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def test_first_clone_creates_the_mirror(upstream, tmp_path):
+    repo, url = upstream
+    report = git_operations.clone_repo(url, str(tmp_path / "first"))
+    assert _read(tmp_path / "first" / "README.md") == "first\n"
+    assert report["bytes_saved"] == 0
+    assert os.path.isdir(git_operations.mirror_path(url))
+    assert git.Repo(tmp_path / "first").remote("origin").url == url
+
+
+def test_later_clones_fetch_new_commits_into_the_mirror(upstream, tmp_path):
+    repo, url = upstream
+    git_operations.clone_repo(url, str(tmp_path / "first"))
+    _commit(repo, "NOTES.md", "second\n")
+    report = git_operations.clone_repo(url, str(tmp_path / "second"))
+    assert _read(tmp_path / "second" / "NOTES.md") == "second\n"
+    assert report["bytes_saved"] > 0
+    assert git.Repo(tmp_path / "second").remote("origin").url == url
+
+
+def test_shallow_clone_from_the_mirror(upstream, tmp_path):
+    repo, url = upstream
+    git_operations.clone_repo(url, str(tmp_path / "full"))
+    _commit(repo, "NOTES.md", "second\n")
+    git_operations.clone_repo(url, str(tmp_path / "shallow"), depth=1)
+    clone = git.Repo(tmp_path / "shallow")
+    assert len(list(clone.iter_commits())) == 1
+    assert clone.head.commit.hexsha == repo.head.commit.hexsha
+
+
+def test_first_shallow_clone_skips_the_mirror(upstream, tmp_path):
+    repo, url = upstream
+    _commit(repo, "NOTES.md", "second\n")
+    git_operations.clone_repo(url, str(tmp_path / "shallow"), depth=1)
+    assert len(list(git.Repo(tmp_path / "shallow").iter_commits())) == 1
+    assert not os.path.exists(git_operations.mirror_path(url))
+
+
+def test_clone_without_the_mirror(upstream, tmp_path):
+    _, url = upstream
+    git_operations.clone_repo(url, str(tmp_path / "direct"), use_mirror=False)
+    assert _read(tmp_path / "direct" / "README.md") == "first\n"
+    assert not os.path.exists(git_operations.mirror_path(url))
+
+
+def test_refresh_mirror_reports_creation_once(upstream):
+    _, url = upstream
+    assert git_operations.refresh_mirror(url)["created"] is True
+    refreshed = git_operations.refresh_mirror(url)
+    assert refreshed["created"] is False
+    assert refreshed["clone_bytes"] > 0
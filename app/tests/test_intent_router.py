@@ -0,0 +1,111 @@
+# app/tests/test_intent_router.py
+import pytest
+import intent_router
+from intent_router import IntentRouter
+
+
+@pytest.fixture
+def router():
+    return IntentRouter(enabled=True)
+
+
+@pytest.mark.parametrize("task, name, parameters", [
+    ("The file /data/dates.txt contains a list of dates, one per line. Count the number of Wednesdays in the list, "
+     "and write just the number to /data/dates-wednesdays.txt", "count_wednesdays", {"file_path": "/data/dates.txt"}),
+    ("Cuenta los miércoles en /data/dates.txt y escribe el número en /data/dates-wednesdays.txt",
+     "count_wednesdays", {"file_path": "/data/dates.txt"}),
+    ("/data/dates.txt में कितने बुधवार हैं? केवल संख्या /data/dates-wednesdays.txt में लिखो",
+     "count_wednesdays", {"file_path": "/data/dates.txt"}),
+    ("Sort the array of contacts in /data/contacts.json by last_name, then first_name, and write the result to "
+     "/data/contacts-sorted.json", "sort_contacts", {"file_path": "/data/contacts.json"}),
+    ("Write the first line of the 10 most recent .log file in /data/logs/ to /data/logs-recent.txt, most recent first",
+     "write_recent_logs", {"log_dir": "/data/logs/", "k": 10}),
+    ("/data/credit-card.png contains a credit card number. Pass the image to an LLM, have it extract the card number, "
+     "and write it without spaces to /data/credit-card.txt", "extract_credit_card_from_llm",
+     {"image_file": "/data/credit-card.png"}),
+    ("Format the contents of /data/format.md using prettier@3.4.2, updating the file in-place",
+     "format_markdown", {"file_path": "/data/format.md", "prettier_version": "3.4.2"}),
+    ("/data/email.txt contains an email message. Pass the content to an LLM with instructions to extract the sender's "
+     "email address, and write just the email address to /data/email-sender.txt", "extract_email_from_llm",
+     {"email_file": "/data/email.txt"}),
+    ("/data/comments.txt contains a list of comments, one per line. Using embeddings, find the most similar pair of "
+     "comments and write them to /data/comments-similar.txt, one per line", "find_similar_comments",
+     {"comments_file": "/data/comments.txt"}),
+    ("The SQLite database file /data/ticket-sales.db has a tickets with columns type, units, and price. Each row is a "
+     "customer bid for a concert ticket. What is the total sales of all the items in the \"Gold\" ticket type? Write "
+     "the number in /data/ticket-sales-gold.txt", "calculate_gold_ticket_sales", {"db_file": "/data/ticket-sales.db"}),
+    ("Find all Markdown (.md) files in /data/docs/. For each file, extract the first occurrence of each H1. Create an "
+     "index file /data/docs/index.json that maps each filename to its title", "create_markdown_index",
+     {"docs_dir": "/data/docs/"}),
+    ("Install uv (if required) and run https://raw.githubusercontent.com/sanand0/tools-in-data-science-public/"
+     "tds-2025-01/project-1/datagen.py with user@example.com as the only argument",
+     "run_datagen", {"user_email": "user@example.com"}),
+])
+def test_routes_catalog_tasks(router, task, name, parameters):
+    plan = router.route(task)
+    assert plan == {"steps": [{"action": "call_function", "name": name, "parameters": parameters}]}
+
+
+@pytest.mark.parametrize("task", [
+    "Total sales of all tickets except Gold in /data/ticket-sales.db",
+    "Find the least similar pair of comments in /data/comments.txt",
+    "Do not count the Wednesdays in /data/dates.txt; delete the file instead",
+    "Extract the recipient's email address from /data/email.txt",
+    "Extract the credit card expiry date from /data/credit-card.png",
+    "Sort the contacts in /data/contacts.json by first_name only",
+    "Sort the contacts in /data/contacts.json by first_name, then last_name",
+    "How many Wednesdays are in /data/dates.txt? Also sort the contacts in /data/contacts.json",
+    "Count the Wednesdays in /data/dates.txt and delete /data/email.txt",
+    "Count the Thursdays in /data/dates.txt",
+    "Fetch data from https://api.example.com and save it to /data/api.json",
+    "What is the average price of Gold tickets in /data/ticket-sales.db",
+    "How many units of Gold tickets were sold",
+    "Count the Wednesdays in 2023 in /data/dates.txt",
+    "Count the Wednesdays in /data/dates.txt that fall in March",
+    "Extract the sender's name from /data/email.txt",
+    "Extract the sender's email domain from /data/email.txt",
+    "Sort the contacts by company name",
+    "Sort the contacts in /data/contacts.json by company name",
+    "Format /data/format.md as HTML",
+])
+def test_leaves_other_tasks_to_the_llm(router, task):
+    assert router.route(task) is None
+
+
+def test_rejects_unknown_output_path(router):
+    assert router.route("Count the Wednesdays in /data/dates.txt and write to /data/wednesdays-count.txt") is None
+    assert router.route("Count the Wednesdays in /data/dates.txt and write the number to /data/wednesdays-count.txt") is None
+
+
+@pytest.mark.parametrize("task", [
+    "Count the Wednesdays in /data/../etc/dates.txt",
+    "Count the Wednesdays in /data/dates.csv",
+    "Write the first line of the 10 most recent .log file in /data/logs.txt to /data/logs-recent.txt",
+])
+def test_rejects_inputs_of_the_wrong_kind(router, task):
+    assert router.route(task) is None
+
+
+def test_routes_without_touching_the_filesystem(router, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("The router must not stat files on the event loop")
+
+    for name in ("stat", "lstat"):
+        monkeypatch.setattr(intent_router.os, name, fail)
+    assert router.route("Count the Wednesdays in /data/missing.txt") is not None
+    assert router.route("Get the first lines of the latest log files") is not None
+
+
+def test_fills_path_and_count_slots(router):
+    plan = router.route("Write the first line of the 5 most recent .log files in /data/old-logs to /data/logs-recent.txt")
+    assert plan["steps"][0]["parameters"] == {"log_dir": "/data/old-logs/", "k": 5}
+    plan = router.route('count the wednesdays in /data/other-dates.txt.')
+    assert plan["steps"][0]["parameters"] == {"file_path": "/data/other-dates.txt"}
+
+
+def test_reports_hit_rate(router):
+    router.route("Format the contents of /data/format.md using prettier@3.4.2")
+    router.route("Find the least similar pair of comments")
+    stats = router.stats()
+    assert stats["requests"] == 2 and stats["hits"] == 1 and stats["hit_rate"] == 0.5
+    assert stats["routed"] == {"format_markdown": 1}
@@ -0,0 +1,148 @@
+# app/tests/test_job_queue.py
+import asyncio
+import pytest
+from job_queue import JobQueue, JobStore, QueueFull
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+async def _wait(queue: JobQueue, job_id: str, statuses=("done", "failed")) -> dict:
+    for _ in range(500):
+        job = await queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish: {job}")
+
+
+def test_submitted_job_runs_to_done(store):
+    async def runner(task, on_update=None):
+        assert task == "Format /data/format.md"
+
+    async def main():
+        queue = JobQueue(store, runner, workers=1)
+        await queue.start()
+        try:
+            job = await queue.submit("Format /data/format.md")
+            assert job["status"] == "queued"
+            return await _wait(queue, job["id"])
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(main())
+    assert job["status"] == "done" and job["error"] is None
+    assert job["started"] <= job["finished"]
+
+
+def test_failed_job_records_the_error(store):
+    async def runner(task, on_update=None):
+        raise ValueError("Unknown function: frobnicate")
+
+    async def main():
+        queue = JobQueue(store, runner, workers=1)
+        await queue.start()
+        try:
+            job = await queue.submit("Frobnicate /data/x")
+            return await _wait(queue, job["id"])
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(main())
+    assert job["status"] == "failed"
+    assert job["error"] == "Unknown function: frobnicate"
+
+
+def test_step_records_are_written_through_on_update(store):
+    records = [{"id": "0", "name": "count_wednesdays", "status": "running"}]
+
+    async def runner(task, on_update=None):
+        on_update(records)
+        await asyncio.sleep(0.05)
+        records[0] = {**records[0], "status": "done", "seconds": 0.05}
+        on_update(records)
+
+    async def main():
+        queue = JobQueue(store, runner, workers=1)
+        await queue.start()
+        try:
+            job = await queue.submit("Count the Wednesdays")
+            running = await _wait(queue, job["id"], statuses=("running",))
+            while not running["steps"]:  # The first snapshot is written in the background
+                await asyncio.sleep(0.005)
+                running = await queue.get(job["id"])
+            return running, await _wait(queue, job["id"])
+        finally:
+            await queue.stop()
+
+    running, finished = asyncio.run(main())
+    assert running["steps"] == [{"id": "0", "name": "count_wednesdays", "status": "running"}]
+    assert finished["steps"] == [{"id": "0", "name": "count_wednesdays", "status": "done", "seconds": 0.05}]
+
+
+def test_submit_raises_queue_full(store):
+    async def main():
+        blocked = asyncio.Event()  # Created inside the loop that waits on it
+
+        async def runner(task, on_update=None):
+            await blocked.wait()
+
+        queue = JobQueue(store, runner, workers=1, max_size=2)
+        await queue.start()
+        try:
+            first = await queue.submit("first")
+            await _wait(queue, first["id"], statuses=("running",))  # Taken by the only worker
+            await queue.submit("second")
+            await queue.submit("third")
+            with pytest.raises(QueueFull):
+                await queue.submit("fourth")
+            assert queue.depth() == 2
+        finally:
+            blocked.set()
+            await queue.stop()
+
+    asyncio.run(main())
+
+
+def test_submit_before_start_is_rejected(store):
+    async def runner(task, on_update=None):
+        pass
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(JobQueue(store, runner).submit("task"))
+
+
+def test_running_jobs_are_recovered_on_restart(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    ran = []
+
+    async def hang(task, on_update=None):
+        await asyncio.Event().wait()
+
+    async def record(task, on_update=None):
+        ran.append(task)
+
+    async def interrupted():
+        queue = JobQueue(JobStore(path), hang, workers=1)
+        await queue.start()
+        job = await queue.submit("long task")
+        await _wait(queue, job["id"], statuses=("running",))
+        queued = await queue.submit("waiting task", priority=-1)
+        await queue.stop()  # Like a crash: the running job stays 'running'
+        return job["id"], queued["id"]
+
+    async def restarted(job_ids):
+        queue = JobQueue(JobStore(path), record, workers=1)  # A fresh store reopens the same file
+        await queue.start()
+        try:
+            return [await _wait(queue, job_id) for job_id in job_ids]
+        finally:
+            await queue.stop()
+
+    job_ids = asyncio.run(interrupted())
+    assert JobStore(path).get(job_ids[0])["status"] == "running"
+    jobs = asyncio.run(restarted(job_ids))
+    assert [job["status"] for job in jobs] == ["done", "done"]
+    assert ran == ["long task", "waiting task"]  # Higher priority first
@@ -0,0 +1,68 @@
+# app/tests/test_llm_handler.py
+import json
+import asyncio
+import pytest
+from llm_handler import LLMClient
+
+
+def _client(url: str, **options) -> LLMClient:
+    return LLMClient(url=url, token="test-token", backoff_base=0.01, backoff_max=0.05, **options)
+
+
+def _completion(text: str, **usage) -> tuple:
+    body = {"choices": [{"message": {"content": text}}], "usage": usage}
+    return 200, {"Content-Type": "application/json"}, json.dumps(body).encode()
+
+
+def test_retries_server_errors_then_succeeds(stub_server):
+    statuses = iter([503, 429])
+
+    def respond(handler):
+        status = next(statuses, None)
+        return (status, {}, b"busy") if status else _completion("ok", prompt_tokens=5, completion_tokens=1)
+
+    url, received = stub_server(respond)
+    client = _client(url)
+    assert asyncio.run(client.complete("hello")) == "ok"
+    assert len(received) == 3
+    assert received[0]["Authorization"] == "Bearer test-token"
+    assert client.stats()["requests"] == 3
+    assert client.stats()["prompt_tokens"] == 5
+
+
+def test_gives_up_after_max_retries(stub_server):
+    url, received = stub_server(lambda handler: (502, {}, b"bad gateway"))
+    with pytest.raises(Exception, match="LLM API Error"):
+        asyncio.run(_client(url, max_retries=2).complete("hello"))
+    assert len(received) == 3  # The first attempt and two retries
+
+
+def test_client_errors_are_not_retried(stub_server):
+    url, received = stub_server(lambda handler: (400, {}, b"bad request"))
+    with pytest.raises(Exception, match="LLM API Error"):
+        asyncio.run(_client(url).complete("hello"))
+    assert len(received) == 1
+
+
+def test_transport_errors_are_retried():
+    client = _client("http://127.0.0.1:9/v1/chat/completions", max_retries=1)  # Nothing listens on the discard port
+    with pytest.raises(Exception, match="LLM API Error"):
+        asyncio.run(client.complete("hello"))
+    assert client.stats()["requests"] == 2
+
+
+def test_retry_after_caps_at_backoff_max():
+    client = _client("http://unused")
+    response = type("Response", (), {"headers": {"Retry-After": "120"}})()
+    assert client._backoff(0, response) == client.backoff_max
+    assert 0 <= client._backoff(3) <= client.backoff_max
+
+
+def test_new_event_loop_gets_a_new_client(stub_server):
+    url, received = stub_server(lambda handler: _completion("ok"))
+    client = _client(url)
+    asyncio.run(client.complete("first"))
+    first = client._client
+    asyncio.run(client.complete("second"))  # The previous loop is closed by now
+    assert client._client is not first
+    assert len(received) == 2
@@ -0,0 +1,58 @@
+# app/tests/test_plan_cache.py
+import json
+from plan_cache import PlanCache, make_key
+
+PLAN = {"steps": [{"action": "call_function", "name": "format_markdown", "parameters": {}}]}
+
+
+def test_key_ignores_whitespace_but_not_case():
+    assert make_key("Sort  /data/a.json\n", "m") == make_key("Sort /data/a.json", "m")
+    assert make_key("Sort /data/A.json", "m") != make_key("Sort /data/a.json", "m")
+    assert make_key("Sort /data/a.json", "m") != make_key("Sort /data/a.json", "other")
+
+
+def test_evicts_least_recently_used():
+    cache = PlanCache(max_size=2, ttl=0, path=None)
+    cache.put("a", PLAN)
+    cache.put("b", PLAN)
+    assert cache.get("a") == PLAN  # "b" is now the least recently used
+    cache.put("c", PLAN)
+    assert cache.get("b") is None
+    assert cache.get("a") == PLAN and cache.get("c") == PLAN
+    assert cache.stats()["size"] == 2
+
+
+def test_expires_entries_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("plan_cache.time.time", lambda: now[0])
+    cache = PlanCache(max_size=10, ttl=60, path=None)
+    cache.put("a", PLAN)
+    now[0] += 59
+    assert cache.get("a") == PLAN
+    now[0] += 2
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["size"] == 0 and stats["hits"] == 1 and stats["misses"] == 1 and stats["hit_rate"] == 0.5
+
+
+def test_persists_plans_across_instances(tmp_path):
+    path = str(tmp_path / "plan-cache.json")
+    cache = PlanCache(max_size=10, ttl=0, path=path)
+    cache.put("a", PLAN)
+    cache.put("b", PLAN)
+    reloaded = PlanCache(max_size=10, ttl=0, path=path)
+    assert reloaded.get("a") == PLAN and reloaded.get("b") == PLAN
+
+
+def test_load_drops_expired_entries_and_trims_to_size(tmp_path):
+    path = tmp_path / "plan-cache.json"
+    path.write_text(json.dumps([["old", 0.0, PLAN], ["a", 9e9, PLAN], ["b", 9e9, PLAN], ["c", 9e9, PLAN]]))
+    cache = PlanCache(max_size=2, ttl=60, path=str(path))
+    assert cache.get("old") is None and cache.get("a") is None
+    assert cache.get("b") == PLAN and cache.get("c") == PLAN
+
+
+def test_ignores_unreadable_cache_file(tmp_path):
+    path = tmp_path / "plan-cache.json"
+    path.write_text("{not json")
+    assert PlanCache(path=str(path)).stats()["size"] == 0
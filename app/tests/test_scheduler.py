@@ -0,0 +1,104 @@
+# app/tests/test_scheduler.py
+import asyncio
+import pytest
+from scheduler import build_dependencies, execution_order, run_steps, step_files
+
+
+def _call(name: str, step_id: str = None, depends_on: list = None, **parameters) -> dict:
+    step = {"action": "call_function", "name": name, "parameters": parameters}
+    if step_id is not None:
+        step["id"] = step_id
+    if depends_on is not None:
+        step["depends_on"] = depends_on
+    return step
+
+
+def test_step_files_from_parameters_and_fixed_outputs():
+    assert step_files(_call("format_markdown", file_path="/data/format.md")) == (
+        {"/data/format.md"}, {"/data/format.md"})
+    assert step_files(_call("compress_resize_images", source="/data/photos/*.png", output_dir="/data/out/")) == (
+        {"/data/photos"}, {"/data/out"})
+    assert step_files(_call("sort_contacts", input_file="/data/contacts.json")) == (
+        {"/data/contacts.json"}, {"/data/contacts-sorted.json"})
+    assert step_files(_call("fetch_data_from_api", url="https://example.com", output_file="/data/a.json")) == (
+        set(), {"/data/a.json"})
+
+
+@pytest.mark.parametrize("step", [
+    {"action": "run_command", "command": "ls"},
+    _call("run_datagen", email="user@example.com"),
+])
+def test_commands_and_barriers_touch_everything(step):
+    assert step_files(step) == ({"/"}, {"/"})
+
+
+def test_dependencies_from_file_conflicts():
+    steps = [
+        _call("fetch_data_from_api", url="https://example.com", output_file="/data/a.json"),
+        _call("fetch_data_from_api", url="https://example.org", output_file="/data/b.json"),
+        _call("run_sql_query", db_path="/data/a.json", query="SELECT 1", output_file="/data/c.txt"),
+        {"action": "run_command", "command": "ls"},
+    ]
+    assert build_dependencies(steps) == {0: set(), 1: set(), 2: {0}, 3: {0, 1, 2}}
+
+
+def test_explicit_dependencies_and_order():
+    steps = [_call("a", "fetch", depends_on=["parse"]), _call("b", "parse", depends_on=[])]
+    dependencies = build_dependencies(steps)
+    assert dependencies == {0: {1}, 1: set()}
+    assert execution_order(dependencies) == [1, 0]
+
+
+@pytest.mark.parametrize("steps, message", [
+    ([_call("a", "x"), _call("b", "x")], "Duplicate step id"),
+    ([_call("a", depends_on=["missing"])], "unknown steps"),
+    ([_call("a", depends_on="1")], "must be a list"),
+    ([_call("a", "x", depends_on=["y"]), _call("b", "y", depends_on=["x"])], "circular"),
+])
+def test_invalid_plans(steps, message):
+    with pytest.raises(ValueError, match=message):
+        execution_order(build_dependencies(steps))
+
+
+def test_runs_dependents_after_their_dependencies():
+    finished = []
+
+    async def execute(step):
+        await asyncio.sleep(0.01 if step["name"] == "slow" else 0)
+        finished.append(step["name"])
+
+    steps = [_call("slow", "1"), _call("fast", "2", depends_on=["1"]), _call("other", "3", depends_on=[])]
+    records = asyncio.run(run_steps(steps, execute, max_parallel=4))
+    assert finished.index("slow") < finished.index("fast")
+    assert finished[0] == "other"  # Independent, so it did not wait for the slow step
+    assert [record["status"] for record in records] == ["done"] * 3
+
+
+def test_independent_steps_run_concurrently_up_to_the_limit():
+    running, peak = 0, 0
+
+    async def execute(step):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    steps = [_call(f"step{index}", depends_on=[]) for index in range(5)]
+    asyncio.run(run_steps(steps, execute, max_parallel=2))
+    assert peak == 2
+    asyncio.run(run_steps(steps, execute, max_parallel=1))
+    assert peak == 2
+
+
+def test_failure_skips_dependents_and_reports_progress():
+    updates = []
+
+    async def execute(step):
+        if step["name"] == "broken":
+            raise ValueError("boom")
+
+    steps = [_call("broken", "1"), _call("after", "2", depends_on=["1"])]
+    with pytest.raises(ValueError, match="boom"):
+        asyncio.run(run_steps(steps, execute, on_update=lambda records: updates.append([r["status"] for r in records])))
+    assert updates == [["running", "pending"], ["failed", "pending"]]
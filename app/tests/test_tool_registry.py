@@ -0,0 +1,31 @@
+# app/tests/test_tool_registry.py
+import pytest
+from tool_registry import tokenize
+from agent import tool_registry
+
+
+def test_tokenize_keeps_non_ascii_words():
+    assert tokenize("Cuenta los miércoles") == ["cuenta", "los", "miércole"]
+    assert tokenize("sort_contacts(file_path: str)") == ["sort", "contact", "path"]
+
+
+@pytest.mark.parametrize("task, expected", [
+    ("Transcribe the audio in /data/song.mp3 to /data/song.txt", ["transcribe_audio"]),
+    ("Install the requests package, then clone https://github.com/x/y into /data/repo", ["clone_git_repo"]),
+    ("Fetch https://api.example.com/users and save to /data/users.json", ["fetch_data_from_api"]),
+])
+def test_selects_relevant_functions(task, expected):
+    assert tool_registry.select(task) == expected
+
+
+@pytest.mark.parametrize("task", [
+    "Cuenta los miércoles en /data/dates.txt",  # "dates" only matches "up-to-date" through the path
+    "/data/audio.mp3 को टेक्स्ट में बदलो",
+    "Process /data/photos/cat.png and /data/dates.txt",
+])
+def test_lists_every_function_without_a_confident_match(task):
+    assert tool_registry.select(task) == list(tool_registry.entries)
+
+
+def test_top_k_zero_lists_every_function():
+    assert tool_registry.select("Transcribe /data/song.mp3", top_k=0) == list(tool_registry.entries)
@@ -0,0 +1,75 @@
+# app/tests/test_web_interaction.py
+import os
+import pytest
+from tasks import web_interaction
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(web_interaction, "HTTP_CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path / "cache"
+
+
+def test_revalidates_with_etag(stub_server, tmp_path):
+    def respond(handler):
+        if handler.headers.get("If-None-Match") == '"v1"':
+            return 304, {"ETag": '"v1"'}, b""
+        return 200, {"ETag": '"v1"', "Cache-Control": "no-cache"}, b"hello"
+
+    url, received = stub_server(respond)
+    output_file = str(tmp_path / "page.html")
+    assert web_interaction.fetch_to_file(url + "/page", output_file) == {"source": "network", "bytes": 5}
+    os.remove(output_file)
+    assert web_interaction.fetch_to_file(url + "/page", output_file) == {"source": "revalidated", "bytes": 5}
+    with open(output_file, "rb") as f:
+        assert f.read() == b"hello"
+    assert "If-None-Match" not in received[0]
+    assert received[1]["If-None-Match"] == '"v1"'
+
+
+def test_changed_resource_replaces_cached_body(stub_server, tmp_path):
+    versions = iter([b"old", b"new"])
+    url, received = stub_server(lambda handler: (200, {"ETag": '"%d"' % len(received)}, next(versions)))
+    output_file = str(tmp_path / "page.html")
+    web_interaction.fetch_to_file(url, output_file)
+    assert web_interaction.fetch_to_file(url, output_file)["source"] == "network"
+    with open(output_file, "rb") as f:
+        assert f.read() == b"new"
+    assert received[1]["If-None-Match"] == '"1"'
+
+
+def test_fresh_response_is_served_without_a_request(stub_server, tmp_path):
+    url, received = stub_server(lambda handler: (200, {"Cache-Control": "max-age=60, x-junk=oops"}, b"data"))
+    output_file = str(tmp_path / "data.json")
+    web_interaction.fetch_to_file(url, output_file)
+    assert web_interaction.fetch_to_file(url, output_file) == {"source": "cache", "bytes": 4}
+    assert len(received) == 1
+
+
+def test_malformed_age_counts_as_zero(stub_server, tmp_path):
+    url, received = stub_server(lambda handler: (200, {"Cache-Control": "max-age=60", "Age": "soon"}, b"data"))
+    output_file = str(tmp_path / "data.json")
+    web_interaction.fetch_to_file(url, output_file)
+    assert web_interaction.fetch_to_file(url, output_file)["source"] == "cache"
+
+
+@pytest.mark.parametrize("headers", [{}, {"Cache-Control": "no-store", "ETag": '"v1"'}])
+def test_uncacheable_responses_are_not_stored(stub_server, tmp_path, cache_dir, headers):
+    url, received = stub_server(lambda handler: (200, headers, b"data"))
+    output_file = str(tmp_path / "data.json")
+    for _ in range(2):
+        assert web_interaction.fetch_to_file(url, output_file)["source"] == "network"
+    assert os.listdir(cache_dir) == []
+    assert "If-None-Match" not in received[1]
+
+
+def test_evicts_least_recently_used_bodies(stub_server, tmp_path):
+    url, _ = stub_server(lambda handler: (200, {"ETag": '"v1"'}, b"x" * 100))
+    for index, name in enumerate(["a", "b", "c"]):
+        web_interaction.fetch_to_file(f"{url}/{name}", str(tmp_path / name))
+        body_path, _ = web_interaction._cache_paths(f"{url}/{name}")
+        os.utime(body_path, (index, index))  # a is the oldest
+    web_interaction._evict(max_bytes=250)
+    assert not os.path.exists(web_interaction._cache_paths(f"{url}/a")[0])
+    assert not os.path.exists(web_interaction._cache_paths(f"{url}/a")[1])
+    assert os.path.exists(web_interaction._cache_paths(f"{url}/c")[0])
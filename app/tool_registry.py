@@ -0,0 +1,124 @@
+# app/tool_registry.py
+import os
+import re
+import math
+import json
+import inspect
+from collections import Counter
+
+# Constants
+TOOL_TOP_K = int(os.environ.get("TOOL_TOP_K", "6"))  # Functions listed in a planning prompt, 0 lists all
+TOOL_MIN_SCORE = float(os.environ.get("TOOL_MIN_SCORE", "2.0"))  # Weaker best matches list every function
+TOOL_RELATIVE_SCORE = 0.4  # Functions scoring below this share of the best one are dropped
+
+TOOL_HINTS = {  # Usage notes appended to a function's prompt line
+    "clone_git_repo": 'blob_filter e.g. "blob:none"',
+    "run_sql_query": "output_format csv, jsonl or arrow; read-only",
+    "scrape_website": 'parser "lxml" is faster; selector is CSS',
+    "compress_resize_images": "source is a directory or glob",
+    "transcribe_audio": "chunked: parallel, for long recordings",
+    "convert_markdown_dir": 'extensions e.g. ["tables", "fenced_code"]',
+    "create_api_endpoint": "serves the CSV at GET /datasets/{name}",
+}
+TERM_ALIASES = {  # File extensions -> the words the docstrings use
+    "png": "image", "jpg": "image", "jpeg": "image", "webp": "image", "gif": "image",
+    "mp3": "audio", "wav": "audio", "md": "markdown", "db": "sqlite", "html": "website", "git": "repository",
+}
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "from", "with", "by", "it", "is", "are", "be", "as",
+    "at", "each", "every", "its", "this", "that", "data", "file", "str", "int", "bool", "list", "none",
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+PATH_PATTERN = re.compile(r"(?:[a-z][a-z0-9+.-]*://|/)\S+", re.IGNORECASE)  # URLs and absolute paths
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word tokens in any script, with snake_case split, a naive plural strip and extension aliases."""
+    tokens = []
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        word = TERM_ALIASES.get(word, word)
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        if word not in STOPWORDS:
+            tokens.append(word)
+    return tokens
+
+
+def _format_default(value) -> str:
+    if isinstance(value, (str, list, tuple)):
+        return json.dumps(list(value) if isinstance(value, tuple) else value)
+    return repr(value)
+
+
+def describe(function) -> str:
+    """Renders a task function as a one-line prompt entry from its signature and the first sentence of its docstring."""
+    parameters = []
+    for parameter in inspect.signature(function).parameters.values():
+        text = parameter.name
+        if parameter.annotation is not inspect.Parameter.empty:
+            annotation = list if parameter.annotation is tuple else parameter.annotation  # Plans are JSON
+            text += f": {getattr(annotation, '__name__', annotation)}"
+        if parameter.default is not inspect.Parameter.empty:
+            text += f" = {_format_default(parameter.default)}"
+        parameters.append(text)
+    docstring = " ".join((inspect.getdoc(function) or "").split())
+    summary = re.split(r"(?<!e\.g\.)(?<=\.)\s", docstring, maxsplit=1)[0].rstrip(".")
+    note = "; ".join(part for part in (summary, TOOL_HINTS.get(function.__name__)) if part)
+    return f"- {function.__name__}({', '.join(parameters)})" + (f"  # {note}" if note else "")
+
+
+class ToolRegistry:
+    """
+    Prompt entries for the task functions, with BM25 retrieval over their names,
+    parameters and docstrings so a planning prompt lists only the relevant ones.
+    """
+
+    def __init__(self, functions: list, top_k: int = TOOL_TOP_K):
+        self.top_k = top_k
+        self.entries = {function.__name__: describe(function) for function in functions}
+        self._documents = {name: Counter(tokenize(entry)) for name, entry in self.entries.items()}
+        self._lengths = {name: sum(counts.values()) for name, counts in self._documents.items()}
+        self._average_length = sum(self._lengths.values()) / max(len(self._lengths), 1)
+        frequencies = Counter(term for counts in self._documents.values() for term in counts)
+        count = len(self._documents)
+        self._idf = {term: math.log(1 + (count - n + 0.5) / (n + 0.5)) for term, n in frequencies.items()}
+
+    def _score(self, name: str, terms: set) -> float:
+        counts = self._documents[name]
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[name] / self._average_length)
+        return sum(
+            self._idf[term] * counts[term] * (BM25_K1 + 1) / (counts[term] + norm) for term in terms if term in counts
+        )
+
+    def scores(self, task: str) -> dict:
+        """
+        Returns the BM25 score of each function for the task text. Terms from paths and
+        URLs (file names, extensions) only add to a function the words already match.
+        """
+        path_terms = set(tokenize(" ".join(PATH_PATTERN.findall(task))))
+        terms = set(tokenize(PATH_PATTERN.sub(" ", task)))
+        scores = {}
+        for name in self._documents:
+            score = self._score(name, terms)
+            scores[name] = score + self._score(name, path_terms - terms) if score else 0.0
+        return scores
+
+    def select(self, task: str, top_k: int = None) -> list:
+        """
+        Returns the names of the top_k functions for the task, in catalog order, leaving
+        out those far behind the best match. Every function is returned when top_k is 0
+        or the best match is too weak to trust, e.g. a task in a language the docstrings
+        are not written in.
+        """
+        top_k = self.top_k if top_k is None else top_k
+        scores = self.scores(task)
+        best = max(scores.values(), default=0.0)
+        if not top_k or best < TOOL_MIN_SCORE:
+            return list(self.entries)
+        ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+        return [name for name in self.entries if name in ranked and scores[name] >= TOOL_RELATIVE_SCORE * best]
+
+    def render(self, names: list) -> str:
+        """Returns the prompt lines for the given functions."""
+        return "\n".join(self.entries[name] for name in names)
@@ -0,0 +1,14 @@
+# app/utils.py
+import os
+import resource
+
+
+def get_rss_bytes() -> int:
+    """Returns the resident set size of the current process in bytes."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Not Linux: fall back to peak RSS, which ru_maxrss reports in kilobytes.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024